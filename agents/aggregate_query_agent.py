@@ -1,61 +1,190 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
-from pathlib import Path
-from typing import List, Optional, Dict, Any
 from llm.client import get_llm_client
+from tools.repo_retriever import get_repo_retriever
+from utils.cancellation import check_cancelled
+from utils.node_cache import NodeCache, hash_inputs
+from utils.prompt_registry import PromptTemplate, get_prompt_registry
 from utils.config_loader import load_config
-from utils.logger import get_logger
-from jinja2 import Template
+from utils.logger import get_logger, log_prompt
 
 logger = get_logger(__name__)
 
 class AggregateQueryAgent:
+    """
+    Answers a user query across any number of project analyses by map-reduce.
+
+    Map: each analysis (with the excerpts of its repository most relevant to the query) is
+    reduced to the findings that bear on the query, several at a time. Reduce: the findings
+    are combined in as few prompts as fit `aggregate_query.max_reduce_chars`; when they do not
+    fit one prompt, groups are answered separately and their answers combined again, until one
+    answer is left. Every map and reduce step is cached by its inputs (analysis hash, query,
+    prompt version and model), so re-asking over mostly the same repositories reruns only
+    the steps whose inputs changed.
+    """
+
     def __init__(self, llm_type: str = "local", model_name: Optional[str] = None, config_file: str = "config/config.yaml"):
         self.config = load_config(config_file)
         self.llm = get_llm_client(
             llm_type=llm_type,
-            model_name=model_name or self.config.get("llm", {}).get("model_name")
+            model_name=model_name or self.config.get("llm", {}).get("model_name"),
+            node="aggregate_query"
         )
-        self.prompt_template = self._load_prompt_template()
-    
-    def _load_prompt_template(self) -> Template:
-        prompt_path = Path(self.config["paths"].get("aggregate_prompt", "config/prompts/aggregate_query.txt"))
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"Prompt not found at {prompt_path}")
-        content = prompt_path.read_text(encoding="utf-8")
-        return Template(content)
-    
-    def run(self, query: str, analyses: List[str]) -> str:
-        logger.info("Running aggregate query: {query}")
-        prompt = self.prompt_template.render(query=query, analyses=analyses)
-        logger.debug(f"Prompt for aggregation:\n{prompt}")
-        response = self.llm.generate(prompt, temperature=0.2, max_tokens=600)
-        return response.strip()
+        query_config = self.config.get("aggregate_query", {})
+        self.map_workers = query_config.get("map_workers", 4)
+        self.map_max_tokens = query_config.get("map_max_tokens", 300)
+        self.max_tokens = query_config.get("max_tokens", 600)
+        self.max_reduce_chars = query_config.get("max_reduce_chars", 12000)
+
+        self.map_template = self._load_prompt_template("aggregate_map_prompt", "config/prompts/aggregate_query_map.txt")
+        self.prompt_template = self._load_prompt_template("aggregate_prompt", "config/prompts/aggregate_query.txt")
+        self.llm.warm_prefix(self.map_template.prefix)
+        self.cache = NodeCache(config_file=config_file)
+
+    def _load_prompt_template(self, path_key: str, default_path: str) -> PromptTemplate:
+        prompt_path = self.config.get("paths", {}).get(path_key, default_path)
+        try:
+            return get_prompt_registry().get(prompt_path)
+        except FileNotFoundError:
+            logger.error("Aggregate query prompt not found at %s", prompt_path)
+            raise
+
+    def _cached(self, step: str, inputs: Dict[str, Any], produce: Callable[[], str]) -> str:
+        if not self.cache.enabled:
+            return produce()
+        key = hash_inputs({"node": step, **inputs, "model": self.config.get("llm", {})})
+        outputs = self.cache.get(step, key)
+        if outputs is not None:
+            logger.debug("Skipping %s step: inputs unchanged (%s)", step, key[:12])
+            return outputs["text"]
+        text = produce()
+        self.cache.put(step, key, {"text": text})
+        return text
+
+    def _parallel(self, fn: Callable[..., str], items: List[tuple]) -> List[str]:
+        """Runs fn over items on up to map_workers threads, in the caller's context (session, cancel token)."""
+        if len(items) <= 1 or self.map_workers <= 1:
+            return [fn(*item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.map_workers, len(items)), thread_name_prefix="aggregate-query") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, fn, *item) for item in items]
+            return [future.result() for future in futures]
+
+    def map_one(self, query: str, analysis: str, repo_path: str = "") -> str:
+        """The findings of one analysis (and its repository's excerpts) relevant to the query."""
+        check_cancelled()
+        retriever = get_repo_retriever()
+        inputs = {
+            "query": query,
+            "analysis": hashlib.sha256(analysis.encode("utf-8")).hexdigest(),
+            "retrieval": retriever.cache_inputs(repo_path),
+            "prompt": self.map_template.version,
+            "max_tokens": self.map_max_tokens,
+        }
+
+        def produce() -> str:
+            prompt = self.map_template.render(query=query, analysis=analysis, context=retriever.context(repo_path, query))
+            response = self.llm.generate(prompt, temperature=0.2, max_tokens=self.map_max_tokens)
+            log_prompt("aggregate_query_map", prompt, response)
+            return response.strip()
+
+        return self._cached("aggregate_query_map", inputs, produce)
+
+    def _reduce_once(self, query: str, notes: List[str], merged: bool) -> str:
+        check_cancelled()
+        inputs = {
+            "query": query,
+            "notes": notes,
+            "merged": merged,
+            "prompt": self.prompt_template.version,
+            "max_tokens": self.max_tokens,
+        }
+
+        def produce() -> str:
+            prompt = self.prompt_template.render(query=query, analyses=notes, merged=merged)
+            response = self.llm.generate(prompt, temperature=0.2, max_tokens=self.max_tokens)
+            log_prompt("aggregate_query", prompt, response)
+            return response.strip()
+
+        return self._cached("aggregate_query_reduce", inputs, produce)
+
+    def _reduce_groups(self, query: str, notes: List[str]) -> List[List[str]]:
+        """Consecutive notes packed into groups whose prompt fits max_reduce_chars, at least two per group."""
+        budget = max(self.max_reduce_chars - len(self.prompt_template.source) - len(query), 2000)
+        # Capped so any two notes fit together and every level at least halves their number
+        cap = budget // 2 - 40
+        notes = [note if len(note) <= cap else note[:cap] + "..." for note in notes]
+        groups: List[List[str]] = [[]]
+        used = 0
+        for note in notes:
+            cost = len(note) + 32  # heading and spacing
+            if groups[-1] and used + cost > budget:
+                groups.append([])
+                used = 0
+            groups[-1].append(note)
+            used += cost
+        return groups
+
+    def reduce(self, query: str, notes: List[str]) -> str:
+        """Combines per-project findings into one answer, hierarchically when they do not fit one prompt."""
+        merged = False
+        level = 0
+        while True:
+            groups = self._reduce_groups(query, notes)
+            if len(groups) == 1:
+                return self._reduce_once(query, groups[0], merged)
+            level += 1
+            logger.info("Reducing %d findings in %d groups (level %d)", len(notes), len(groups), level)
+            # A lone trailing note has nothing to be combined with at this level
+            notes = self._parallel(
+                lambda group: group[0] if len(group) == 1 and merged else self._reduce_once(query, group, merged),
+                [(group,) for group in groups]
+            )
+            merged = True
+
+    def run(self, query: str, analyses: List[str], repo_paths: Optional[List[str]] = None) -> str:
+        """
+        Answers the query across the analyses.
+
+        Args:
+            query (str): The user's cross-repository question.
+            analyses (List[str]): One analysis per project.
+            repo_paths (Optional[List[str]]): Local path of each analysis' repository; adds the
+                excerpts most relevant to the query to its map step.
+        """
+        logger.info("Running aggregate query over %d analyses: %s", len(analyses), query)
+        repo_paths = list(repo_paths or [])
+        repo_paths += [""] * (len(analyses) - len(repo_paths))
+        notes = self._parallel(self.map_one, [(query, analysis, path) for analysis, path in zip(analyses, repo_paths)])
+        return self.reduce(query, notes)
 
 def run(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answers state['user_query'] over the primary analysis and every comparison target
+    (state['comparison_targets'], or the single state['comparison_target']).
+    """
     logger.info("Running AggregateQueryAgent...")
     query = state.get("user_query", "").strip()
-    comparison = state.get("comparison_target", {})
+    targets = state.get("comparison_targets")
+    if targets is None:
+        targets = [state["comparison_target"]] if state.get("comparison_target") else []
     analyses = [state.get("analysis_result", "")]
-    
-    if comparison:
-        comp_analysis = comparison.get("analysis_result", "")
+    repo_paths = [state.get("repo_path", "")]
+
+    for target in targets:
+        comp_analysis = target.get("analysis_result", "")
         if comp_analysis:
             analyses.append(comp_analysis)
-        
+            repo_paths.append(target.get("repo_path", ""))
+
     if not query:
         logger.warning("No user_query provided. Skipping aggregation.")
         state["aggregate_query_result"] = "No aggregate query provided"
         return state
-        
+
     agent = AggregateQueryAgent()
-    result = agent.run(query = query, analyses = analyses)
+    result = agent.run(query = query, analyses = analyses, repo_paths = repo_paths)
     state["aggregate_query_result"] = result
     return state
-    
-    
-
-
-
-     
\ No newline at end of file
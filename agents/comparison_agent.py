@@ -1,6 +1,3 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
 from typing import Dict, List
 from utils.logger import get_logger
 from tools.comparison_tool import run_comparison_tool
@@ -27,6 +24,6 @@ def run(state: Dict) -> Dict:
     )
 
     state["comparison_result"] = result
-    logger.info(f"Comparison result:\n: + {result}")
+    logger.debug("Comparison result:\n%s", result)
     return state
 
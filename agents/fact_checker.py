@@ -1,12 +1,10 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
-from pathlib import Path
 from typing import Optional
 
 from llm.client import get_llm_client
+from utils.prompt_registry import PromptTemplate, get_prompt_registry
 from tools.repo_parser import parse_repository, condense_repo_summary
-from utils.logger import get_logger
+from tools.claim_verifier import verify_claims
+from utils.logger import get_logger, log_prompt
 from utils.config_loader import load_config
 
 logger = get_logger(__name__)
@@ -16,44 +14,62 @@ class FactCheckerAgent:
         self.config = load_config(config_file)
         self.llm = get_llm_client(
             llm_type=llm_type,
-            model_name=model_name or self.config.get("llm", {}).get("model_name")
+            model_name=model_name or self.config.get("llm", {}).get("model_name"),
+            node="fact_check"
         )
+        self.deterministic = self.config.get("fact_check", {}).get("deterministic", True)
         self.prompt_template = self._load_prompt_template()
-    def _load_prompt_template(self) -> str:
-        prompt_rel_path = self.config.get("paths", {}).get("fact_checker_prompt", "config/prompts/fact_checker_prompt.txt")
-        prompt_path = Path(prompt_rel_path)
-
-        logger.debug("Loading fact checker prompt from: {prompt_path}")
-        if not prompt_path.exists():
-            logger.error(f"Prompt template not found at {prompt_path}")
-            raise FileNotFoundError(f"Prompt template not found at {prompt_path}")
-        
+        self.escalation_template = self._load_prompt_template(
+            "fact_check_escalation_prompt", "config/prompts/fact_check_escalation.txt"
+        )
+        self.llm.warm_prefix(self.prompt_template.prefix)
+
+    def _load_prompt_template(
+        self,
+        key: str = "fact_checker_prompt",
+        default: str = "config/prompts/fact_checker_prompt.txt"
+    ) -> PromptTemplate:
+        prompt_path = self.config.get("paths", {}).get(key, default)
         try:
-            return prompt_path.read_text(encoding="utf-8")
-        except Exception as e:
-            logger.exception(f"Failed to read prompt: {e}")
-            raise e
-    
+            return get_prompt_registry().get(prompt_path)
+        except FileNotFoundError:
+            logger.error("Fact checker prompt not found at %s", prompt_path)
+            raise
+
     def fact_check(self, analysis: str, repo_path: str) -> str:
-        logger.info(f"Fact-checking analysis result for repo: {repo_path}")
+        logger.info("Fact-checking analysis result for repo: %s", repo_path)
 
         repo_summary = parse_repository(repo_path)
         if "error" in repo_summary:
-            logger.error(f"Repo parsing failed during fact-check: {repo_summary['error']}")
+            logger.error("Repo parsing failed during fact-check: %s", repo_summary["error"])
             return "Error parsing repository during fact check."
         
         condensed_repo = condense_repo_summary(repo_summary)
 
-        prompt = self.prompt_template.format(
+        if self.deterministic:
+            report = verify_claims(analysis, repo_summary)
+            if not report.needs_llm:
+                logger.info("All %d claims verified without the LLM.", len(report.claims))
+                return report.format()
+            if report.claims:
+                # Only what the rules could not settle goes to the LLM, in a short prompt
+                prompt = self.escalation_template.render(claims=report.escalated, repo_summary=condensed_repo)
+                response = self.llm.generate(prompt)
+                log_prompt("fact_check_escalation", prompt, response)
+                logger.info("Escalated %d of %d claims to the LLM.", len(report.escalated), len(report.claims))
+                return f"{report.format()}\n\nReview of unconfirmed claims:\n{response}"
+
+        # Nothing checkable was found: fall back to a full LLM review of the analysis
+        prompt = self.prompt_template.render(
             analysis_result=analysis,
             repo_summary=condensed_repo
         )
 
-        logger.debug(f"Prompt sent to LLM:\n{prompt}")
         response = self.llm.generate(prompt)
 
-        logger.info(f"LLM response (fact check result): {response}")
         assert isinstance(response, str), "Expected string response from LLM"
+        log_prompt("fact_check", prompt, response)
+        logger.info("Fact check completed (%d chars).", len(response))
         
         return response
 
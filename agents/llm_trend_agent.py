@@ -1,11 +1,7 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
-from pathlib import Path
 from typing import Optional, Dict, Any
-from jinja2 import Template
 from llm.client import get_llm_client
-from utils.logger import get_logger
+from utils.prompt_registry import PromptTemplate, get_prompt_registry
+from utils.logger import get_logger, log_prompt
 from utils.config_loader import load_config
 
 from tools.semantic_trend_detector import SemanticTrendDetector
@@ -18,23 +14,25 @@ class LLMTrendInsightAgent:
         self.config = load_config(config_file)
         self.llm = get_llm_client(
             llm_type=llm_type,
-            model_name=model_name or self.config.get("llm", {}).get("model_name")
+            model_name=model_name or self.config.get("llm", {}).get("model_name"),
+            node="llm_trends"
         )
         self.prompt_template = self._load_prompt_template()
+        self.llm.warm_prefix(self.prompt_template.prefix)
     
-    def _load_prompt_template(self) -> Template:
-        prompt_path = Path(self.config["paths"].get("llm_trend_prompt", "config/prompts/llm_trend_extractor.txt"))
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"Prompt not found at {prompt_path}")
-        content = prompt_path.read_text(encoding="utf-8")
-        return Template(content)
-    
+    def _load_prompt_template(self) -> PromptTemplate:
+        prompt_path = self.config.get("paths", {}).get("llm_trend_prompt", "config/prompts/llm_trend_extractor.txt")
+        try:
+            return get_prompt_registry().get(prompt_path)
+        except FileNotFoundError:
+            logger.error("Trend prompt not found at %s", prompt_path)
+            raise
+
     def extract_trends(self, analysis: str) -> str:
         logger.info("Extracting trends using LLM...")
         prompt = self.prompt_template.render(analysis=analysis)
-        logger.info(f"Prompt to LLM:\n{prompt}")
         response = self.llm.generate(prompt)
-        logger.info(f"Trends respons from LLM:\n{response}")
+        log_prompt("llm_trends", prompt, response)
         return response.strip()
     
 def run(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -47,14 +45,14 @@ def run(state: Dict[str, Any]) -> Dict[str, Any]:
         agent = LLMTrendInsightAgent()
         trends = agent.extract_trends(analysis)
     except Exception as e:
-        logger.warning(f"LLM trend extraction failed. Falling back to semantic method: {e}")
+        logger.warning("LLM trend extraction failed. Falling back to semantic method: %s", e)
         # Fallback using semantic trend detector
         detector = SemanticTrendDetector()
         top_tags = detector.detect_trends(analysis)
         grouped_summary = SemanticTrendDetector.group_by_category(top_tags)
         trends = f"[Fallback] Semantic Trend Detection:\n{grouped_summary}"
 
-    logger.info(f"Extracted trends:\n{trends}")
+    logger.debug("Extracted trends:\n%s", trends)
     return {**state, "aggregated_trends": trends}
 
 
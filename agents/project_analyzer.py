@@ -1,12 +1,10 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
-from pathlib import Path
 from typing import Dict, Any, Optional
 
 from llm.client import get_llm_client
+from utils.prompt_registry import PromptTemplate, get_prompt_registry
 from tools.repo_parser import parse_repository, format_repo_summary,condense_repo_summary
-from utils.logger import get_logger
+from tools.repo_retriever import get_repo_retriever
+from utils.logger import get_logger, log_prompt
 from utils.malformed_readme_detector import is_malformed_readme
 from utils.config_loader import load_config
 
@@ -25,33 +23,25 @@ class ProjectAnalyzerAgent:
         self.config = load_config(config_file)
         self.llm = get_llm_client(
             llm_type=llm_type,
-            model_name=model_name or self.config.get("llm", {}).get("model_name")
+            model_name=model_name or self.config.get("llm", {}).get("model_name"),
+            node="analyze"
         )
         self.prompt_template = self._load_prompt_template()
+        self.llm.warm_prefix(self.prompt_template.prefix)
 
-    def _load_prompt_template(self) -> str:
+    def _load_prompt_template(self) -> PromptTemplate:
         """
-        Loads the LLM prompt template from file specified in configuration.
+        Returns the compiled prompt template configured for this agent from the shared registry.
 
         Returns:
-            str: The loaded prompt template as a string.
+            PromptTemplate: Template compiled once per process and reloaded when the file changes.
         """
-        prompt_rel_path = self.config.get("paths", {}).get("analyzer_prompt", "config/prompts/analyzer_prompt.txt")
-        prompt_path = Path(prompt_rel_path)
-
-        logger.debug(f"Attempting to load prompt template from: {prompt_path}")
-
-        if not prompt_path.exists():
-            logger.error(f"Prompt template not found at {prompt_path}")
-            raise FileNotFoundError(f"Prompt template not found at {prompt_path}")
-
+        prompt_path = self.config.get("paths", {}).get("analyzer_prompt", "config/prompts/analyzer_prompt.txt")
         try:
-            content = prompt_path.read_text(encoding="utf-8")
-            logger.info(f"Successfully loaded prompt template from: {prompt_path}")
-            return content
-        except Exception as e:
-            logger.exception(f"Error reading prompt template from {prompt_path}: {e}")
-            raise e
+            return get_prompt_registry().get(prompt_path)
+        except FileNotFoundError:
+            logger.error("Prompt template not found at %s", prompt_path)
+            raise
 
     def analyze_project(self, repo_path: str) -> str:
         """
@@ -63,31 +53,30 @@ class ProjectAnalyzerAgent:
         Returns:
             str: Generated analysis from the LLM.
         """
-        logger.info(f"Analyzing repository at: {repo_path}")
+        logger.info("Analyzing repository at: %s", repo_path)
         repo_summary = parse_repository(repo_path)
         readme_excerpt = repo_summary.get("readme_excerpt", "")
         if is_malformed_readme(readme_excerpt):
             logger.info("README appears malformed or low quality - summary quality may be limited.")
 
         if "error" in repo_summary:
-            logger.error(f"Repository parsing failed: {repo_summary['error']}")
+            logger.error("Repository parsing failed: %s", repo_summary["error"])
             return repo_summary["error"]
 
         # formatted_summary = format_repo_summary(repo_summary)
         condensed_summary = condense_repo_summary(repo_summary)
-        full_prompt = self.prompt_template.format(repo_summary=condensed_summary)
+        # The repository's own files most relevant to describing it, within rag_summarizer limits
+        context = get_repo_retriever().context(repo_path)
+        full_prompt = self.prompt_template.render(repo_summary=condensed_summary, context=context)
 
-       # logger.info("Condensed repo summary going into prompt:\n" + condensed_summary)
-        logger.info("Full prompt being sent to LLM:\n" + full_prompt)
+        logger.debug("Sending analysis prompt to LLM (%d chars)", len(full_prompt))
 
         response = self.llm.generate(full_prompt)
 
-        logger.info(f"Raw LLM response: {response}")
-        logger.info(f"LLM response type: {type(response)}")
-
         assert isinstance(response, str), f"LLM response was not a string! Got {type(response)}"
+        log_prompt("analyze", full_prompt, response)
 
-        logger.info(f"Generated analysis completed.")
+        logger.info("Generated analysis completed (%d chars).", len(response))
         return response
     
 def run(state: dict) -> dict:
@@ -1,12 +1,8 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
-from pathlib import Path
 from typing import Optional
 from llm.client import get_llm_client
+from utils.prompt_registry import PromptTemplate, get_prompt_registry
 from utils.config_loader import load_config
-from utils.logger import get_logger
-from jinja2 import Template
+from utils.logger import get_logger, log_prompt
 
 logger = get_logger(__name__)
 
@@ -23,34 +19,26 @@ class SummarizeAgent:
         self.config = load_config(config_file)
         self.llm = get_llm_client(
             llm_type=llm_type,
-            model_name=model_name or self.config.get("llm", {}).get("model_name")
+            model_name=model_name or self.config.get("llm", {}).get("model_name"),
+            node="summarize"
         )
         self.prompt_template = self._load_prompt_template()
+        self.llm.warm_prefix(self.prompt_template.prefix)
    
-    def _load_prompt_template(self) -> Template:
-       """
-       Loads the Jinja2 prompt template for summarization from path in config.
-
-       Returns:
-         Template: Compiled Jinja2 template object
+    def _load_prompt_template(self) -> PromptTemplate:
         """
-       prompt_rel_path = self.config.get("paths", {}).get("summarize_prompt", "config/prompts/summarize_project.txt")
-       prompt_path = Path(prompt_rel_path)
+        Returns the compiled prompt template configured for this agent from the shared registry.
 
-       logger.debug(f"Attempting to load summarization prompt from: {prompt_path}")
+        Returns:
+            PromptTemplate: Template compiled once per process and reloaded when the file changes.
+        """
+        prompt_path = self.config.get("paths", {}).get("summarize_prompt", "config/prompts/summarize_project.txt")
+        try:
+            return get_prompt_registry().get(prompt_path)
+        except FileNotFoundError:
+            logger.error("Summarization prompt not found at %s", prompt_path)
+            raise
 
-       if not prompt_path.exists():
-           logger.error(f"Summarization prompt not found at {prompt_path}")
-           raise FileNotFoundError(f"Summarization prompt not found at {prompt_path}")
-       
-       try:
-           content = prompt_path.read_text(encoding="utf-8")
-           logger.info(f"Successfully loaded summarization prompt from: {prompt_path}")
-           return Template(content)
-       except Exception as e:
-           logger.exception(f"Error reading summarization prompt from {prompt_path}: {e}")
-           raise e
-    
     def _assess_confidence(self, analysis: str, fact_check: str, trends: str, comparison: str) -> str:
         """
         Heuristically. assess confidence based on analysis, completeness and fact-check feedback.
@@ -101,13 +89,12 @@ class SummarizeAgent:
             comparison=comparison_section
         )
         
-        logger.debug(f"Generated prompt for LLM:\n: + {prompt}")
-
         response = self.llm.generate(
             prompt = prompt,
             temperature = 0.3,
             max_tokens = 800
         )
+        log_prompt("summarize", prompt, response)
 
         confidence = self._assess_confidence(
             analysis=primary_analysis,
@@ -141,7 +128,7 @@ class SummarizeAgent:
                 "--------------------------------------------------\n\n"
             )
             response = confidence_block + fact_check_block + response
-            logger.info(f"FINAL SUMMARY :\n: + {response}")
+            logger.debug("Final summary with fact check block: %d chars", len(response))
             state["final_summary"] = response
 
         return state
@@ -1,6 +1,3 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
 from tools.semantic_trend_detector import SemanticTrendDetector
 from utils.logger import get_logger
 
@@ -19,7 +16,7 @@ def run(state: dict) -> dict:
 
     grouped_summary = SemanticTrendDetector.group_by_category(top_tags)
     trends_summary = f"Detected Trends:\n{grouped_summary}"
-    logger.info(f"Detected Trends:\n{trends_summary}")
+    logger.debug("Detected Trends:\n%s", trends_summary)
     
     return {**state, "aggregated_trends": trends_summary}
    
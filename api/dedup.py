@@ -0,0 +1,107 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+from utils.node_cache import hash_inputs
+from utils.prompt_registry import get_prompt_registry
+from utils.repo_utils import normalize_repo_id, resolve_commit
+
+logger = get_logger(__name__)
+
+
+def request_fingerprint(
+    primary_repo: str,
+    comparison_repos: List[str],
+    user_query: str = "",
+    resolve_commits: bool = True,
+    commit_timeout_seconds: float = 10
+) -> str:
+    """
+    Content hash of an analysis request: normalized repo ids with the commit each points at,
+    the whitespace-normalized query, the llm config and every prompt template version.
+    Two requests with the same fingerprint produce the same results.
+    """
+    repos = [primary_repo] + list(comparison_repos)
+    return hash_inputs({
+        "repos": [
+            {
+                "repo": normalize_repo_id(repo),
+                "commit": resolve_commit(repo, commit_timeout_seconds) if resolve_commits else None,
+            }
+            for repo in repos
+        ],
+        "query": re.sub(r"\s+", " ", (user_query or "").strip()),
+        "llm": load_config().get("llm", {}),
+        "prompts": get_prompt_registry().versions(),
+    })
+
+
+class RequestDeduplicator:
+    """
+    Maps request fingerprints to the session computing them.
+
+    A request matching an in-flight job attaches to it; one matching a job that completed
+    within `ttl_seconds` reuses its results. Jobs that fail or are cancelled are forgotten
+    so the next identical request starts afresh.
+    """
+
+    def __init__(self, ttl_seconds: float = 900):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, dict] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            fingerprint for fingerprint, job in self._jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > self.ttl_seconds
+        ]
+        for fingerprint in expired:
+            self._fingerprints.pop(self._jobs.pop(fingerprint)["session_id"], None)
+
+    def attach_or_register(self, fingerprint: str, session_id: str) -> Optional[str]:
+        """
+        Returns the session id of a live or fresh job with this fingerprint, counting the
+        caller as attached to it; otherwise registers `session_id` as its job and returns None.
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(fingerprint)
+            if job is not None:
+                job["subscribers"] += 1
+                return job["session_id"]
+            self._jobs[fingerprint] = {"session_id": session_id, "finished_at": None, "subscribers": 1}
+            self._fingerprints[session_id] = fingerprint
+            return None
+
+    def subscribers(self, session_id: str) -> int:
+        """How many requests (the one that started it included) are attached to a job."""
+        with self._lock:
+            fingerprint = self._fingerprints.get(session_id)
+            return self._jobs[fingerprint]["subscribers"] if fingerprint is not None else 0
+
+    def detach(self, session_id: str) -> int:
+        """Drops one attached request from a running job; returns how many remain attached."""
+        with self._lock:
+            fingerprint = self._fingerprints.get(session_id)
+            if fingerprint is None:
+                return 0
+            job = self._jobs[fingerprint]
+            job["subscribers"] = max(0, job["subscribers"] - 1)
+            return job["subscribers"]
+
+    def finished(self, session_id: str, status: str) -> None:
+        """Records a job's terminal status: completed jobs stay reusable for the TTL."""
+        with self._lock:
+            fingerprint = self._fingerprints.get(session_id)
+            if fingerprint is None:
+                return
+            if status == "completed" and self.ttl_seconds > 0:
+                self._jobs[fingerprint]["finished_at"] = time.monotonic()
+            else:
+                self._jobs.pop(fingerprint, None)
+                self._fingerprints.pop(session_id, None)
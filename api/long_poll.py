@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class SessionWaiters:
+    """
+    Long-poll support: requests wait on a session until the result store reports a change.
+
+    `notify` is a ResultStore listener and may be called from any thread; waiting requests
+    are woken on their own event loop.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._lock = threading.Lock()
+
+    def notify(self, session_id: str, entry: Any = None) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(session_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def wait(self, session_id: str, current: Callable[[], Any],
+                   still_waiting: Callable[[Any], bool], timeout: float) -> Any:
+        """
+        Returns current() once still_waiting(current()) is false, or after timeout seconds.
+        The waiter is registered before each check, so a change in between is not missed.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            future = loop.create_future()
+            with self._lock:
+                self._waiters.setdefault(session_id, []).append((loop, future))
+            try:
+                state = current()
+                remaining = deadline - loop.time()
+                if not still_waiting(state) or remaining <= 0:
+                    return state
+                try:
+                    await asyncio.wait_for(future, remaining)
+                except asyncio.TimeoutError:
+                    return current()
+            finally:
+                self._discard(session_id, future)
+
+    def _discard(self, session_id: str, future: asyncio.Future) -> None:
+        with self._lock:
+            waiters = [w for w in self._waiters.get(session_id, []) if w[1] is not future]
+            if waiters:
+                self._waiters[session_id] = waiters
+            else:
+                self._waiters.pop(session_id, None)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -1,88 +1,362 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from uuid import uuid4
-from typing import List, Optional, Dict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Literal, Optional, Dict
 import asyncio
+import os
+import tempfile
 
-from utils.logger import get_logger
-from orchestrator.orchestrator import CrossPublicationInsightOrchestrator
-from agents.project_analyzer import ProjectAnalyzerAgent
-from agents.trend_aggregator import run as aggregate_trends
-from tools.repo_parser import parse_repository, condense_repo_summary
-from utils.repo_utils import clone_if_remote
+from utils.logger import get_logger, log_context
+from orchestrator.pipeline import AnalysisSession
+from api.dedup import RequestDeduplicator, request_fingerprint
+from api.long_poll import SessionWaiters
+from api.webhooks import WebhookDispatcher, WebhookURLRefused
+from utils.repo_utils import normalize_repo_id
+from utils.config_loader import load_config
+from utils.node_cache import hash_inputs
+from utils.model_manager import get_model_manager
+from utils.profiling import profile_summary, to_collapsed, to_speedscope
+from utils.result_export import FORMATS, ResultExporter, parse_timestamp
+from utils.result_store import ResultStore
+from tools.vector_index import get_repo_index
 
 logger = get_logger(__name__)
 
-session_store: Dict[str, Dict] = {}
+DEDUP_CONFIG = load_config().get("api", {}).get("dedup", {})
+deduplicator = RequestDeduplicator(ttl_seconds=DEDUP_CONFIG.get("ttl_seconds", 900))
 
-app = FastAPI()
+# Session ids of deduplicated requests, pointing at the session doing the work
+session_aliases: Dict[str, str] = {}
+
+# Every stored change wakes long-polling requests and may push webhook notifications
+LONG_POLL_MAX_SECONDS = load_config().get("api", {}).get("long_poll_max_seconds", 60)
+session_waiters = SessionWaiters()
+webhooks = WebhookDispatcher()
+
+# Session entries ({"status", "results", ...}), stored serialized and persisted to disk.
+# Opened when the app starts, not on import, so importing this module touches no files.
+session_store: Optional[ResultStore] = None
+
+def open_session_store(store_dir: Optional[str] = None) -> ResultStore:
+    """
+    Opens the result store (`result_store.dir` unless given) as the app's session table and
+    marks the sessions a previous run left unfinished as failed.
+    """
+    global session_store
+    store = ResultStore(store_dir=store_dir)
+    for stale_id in store:
+        # Runs and review checkpoints live in memory, so they did not survive a restart
+        if store.meta(stale_id)["status"] in ("processing", "cancelling", "awaiting_review"):
+            store[stale_id] = {**store[stale_id], "status": "failed", "error": "Interrupted by a server restart."}
+    store.subscribe(session_waiters.notify)
+    store.subscribe(webhooks.notify)
+    session_store = store
+    return store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if session_store is None:
+        open_session_store()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 class RepoRequest(BaseModel):
     primary_repo: str
     comparison_repos: List[str]
     user_query: Optional[str] = ""
     use_hitl: Optional[bool] = True
+    deadline_seconds: Optional[float] = None
+    profile: Optional[bool] = False
+    webhook_url: Optional[str] = None
 
-def run_orchestration(session_id, repo_path, comparison_repo_paths, user_query="", use_hitl=False):
-    logger.info("Running Orchestrator...")
+class ReviewRequest(BaseModel):
+    action: Literal["edit", "continue", "skip"]
+    analysis: Optional[str] = None
 
+# Sessions parked at a HITL checkpoint (or still running), kept so they can be resumed
+live_sessions: Dict[str, AnalysisSession] = {}
 
-    thread_id = str(uuid4())
-    config_override = {
-        "configurable": {"thread_id": thread_id},
-        "hitl_override": {"enabled": use_hitl}
-    }
+def _store_profile(session_id: str, session: Optional[AnalysisSession]) -> None:
+    if session is not None and session.profiler is not None:
+        session_store.put_artifact(session_id, "profile", session.profiler.export())
 
-    local_repo_paths = [clone_if_remote(repo) for repo in [repo_path] + comparison_repo_paths]
-    repo_path = local_repo_paths[0]
-    comparison_repo_paths = local_repo_paths[1:]
-
-    comparison_target_states = []
-    for comparison_repo_path in comparison_repo_paths:
-        comparison_analyzer = ProjectAnalyzerAgent(llm_type="local")
-        comparison_analysis = comparison_analyzer.analyze_project(comparison_repo_path)
-        trend_input = {
-            "repo_path": comparison_repo_path,
-            "analysis_result": comparison_analysis
-        }
-        trend_result = aggregate_trends(trend_input)
-        comparison_target_states.append({
-            "repo_path": comparison_repo_path,
-            "analysis_result": comparison_analysis,
-            "aggregated_trends": trend_result["aggregated_trends"]
-        })
-
-    orchestrator = CrossPublicationInsightOrchestrator(user_query=user_query)
-
-    results = []
-    for comparison_target in comparison_target_states:
-        initial_state = {
-            "repo_path": repo_path,
-            "comparison_target": comparison_target,
-            "user_query": user_query.strip()
-        }
-        result = orchestrator.run(initial_state, config=config_override)
-        results.append({
-            "comparison_repo": comparison_target["repo_path"],
-            "analysis_result": result.get("analysis_result","No analysis result found"),
-            "fact_check_result": result.get("fact_check_result", "No fact check result found."),
-            "aggregate_query_result": result.get("aggregate_query_result", "No aggregate query generated."),
-            "final_summary": result.get("final_summary", "No summary generated.")
-        })
-
-    logger.info(f"Complete Analysis result: {results}")
+def _record_session(session_id: str, session: AnalysisSession) -> None:
+    _store_profile(session_id, session)
+    entry = {"status": session.status, "results": session.results, "user_query": session.user_query}
+    if session.aggregate_query_result is not None:
+        entry["aggregate_query_result"] = session.aggregate_query_result
+    if session.error:
+        entry["error"] = session.error
+    if session.status == "awaiting_review":
+        entry["review"] = session.pending_review
+    else:
+        entry["finished_at"] = datetime.now(timezone.utc).isoformat()
+        logger.info("Session %s finished with %d comparison results", session_id, len(session.results))
+        live_sessions.pop(session_id, None)
+        deduplicator.finished(session_id, session.status)
+    session_store[session_id] = entry
+
+def _fail_session(session_id: str, error: Exception) -> None:
+    logger.exception("Session %s failed: %s", session_id, error)
+    session = live_sessions.pop(session_id, None)
+    _store_profile(session_id, session)
+    deduplicator.finished(session_id, "failed")
     session_store[session_id] = {
-        "status": "completed",
-        "results": results
+        "status": "failed",
+        "error": str(error),
+        "results": session.results if session else []
     }
 
+def run_orchestration(session_id: str):
+    session = live_sessions[session_id]
+    with log_context(session_id=session_id):
+        try:
+            session.start()
+            _record_session(session_id, session)
+        except Exception as e:
+            _fail_session(session_id, e)
+
+def resume_orchestration(session_id: str, decision: dict):
+    session = live_sessions[session_id]
+    with log_context(session_id=session_id):
+        try:
+            session.resume(decision)
+            _record_session(session_id, session)
+        except Exception as e:
+            _fail_session(session_id, e)
+
 @app.post("/run-analysis/")
 async def run_analysis(request: RepoRequest, background_tasks: BackgroundTasks):
     session_id = str(uuid4())
+    if request.webhook_url:
+        if not webhooks.enabled or not webhooks.secret:
+            raise HTTPException(status_code=400, detail="Webhooks are disabled or no signing secret is configured.")
+        try:
+            await asyncio.to_thread(webhooks.validate_url, request.webhook_url)
+        except WebhookURLRefused as e:
+            raise HTTPException(status_code=422, detail=f"'webhook_url' refused: {e}.")
+        except OSError:
+            raise HTTPException(status_code=422, detail="'webhook_url' host does not resolve.")
+
+    # HITL sessions each need their own reviewer and profiled ones their own run,
+    # so only plain unattended runs are shared
+    if DEDUP_CONFIG.get("enabled", True) and not request.use_hitl and not request.profile:
+        fingerprint = await asyncio.to_thread(
+            request_fingerprint, request.primary_repo, request.comparison_repos, request.user_query,
+            DEDUP_CONFIG.get("resolve_commits", True), DEDUP_CONFIG.get("commit_timeout_seconds", 10)
+        )
+        job_id = deduplicator.attach_or_register(fingerprint, session_id)
+        if job_id is not None:
+            logger.info("Request %s deduplicated onto session %s", session_id, job_id)
+            session_aliases[session_id] = job_id
+            if request.webhook_url:
+                webhooks.register(job_id, request.webhook_url, session_id)
+                # A job that already finished does not change again: notify right away
+                webhooks.notify(job_id, session_store[job_id])
+            return {"session_id": session_id, "status": session_store.meta(job_id)["status"], "deduplicated": True}
+
+    deadline = request.deadline_seconds or load_config().get("api", {}).get("session_deadline_seconds")
+    # Registered before it runs so it can be cancelled while still queued
+    live_sessions[session_id] = AnalysisSession(
+        request.primary_repo, request.comparison_repos, user_query=request.user_query,
+        use_hitl=request.use_hitl, deadline_seconds=deadline, profile=request.profile
+    )
+    if request.webhook_url:
+        webhooks.register(session_id, request.webhook_url)
     session_store[session_id] = {"status": "processing", "results": []}
-    background_tasks.add_task(run_orchestration, session_id, request.primary_repo, request.comparison_repos, request.user_query, request.use_hitl)
+    background_tasks.add_task(run_orchestration, session_id)
     return {"session_id": session_id, "status": "processing"}
 
+@app.post("/review/{session_id}")
+async def review_session(session_id: str, request: ReviewRequest, background_tasks: BackgroundTasks):
+    entry = session_store.get(session_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    if entry["status"] != "awaiting_review" or session_id not in live_sessions:
+        raise HTTPException(status_code=409, detail=f"Session is not awaiting review (status: {entry['status']}).")
+    if request.action == "edit" and not (request.analysis or "").strip():
+        raise HTTPException(status_code=422, detail="An 'edit' review requires a non-empty 'analysis'.")
+
+    session_store[session_id] = {"status": "processing", "results": entry["results"]}
+    background_tasks.add_task(resume_orchestration, session_id, request.model_dump())
+    return {"session_id": session_id, "status": "processing"}
+
+@app.delete("/sessions/{session_id}")
+async def cancel_session(session_id: str):
+    job_id = session_aliases.get(session_id, session_id)
+    entry = session_store.get(job_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    session = live_sessions.get(job_id)
+    if session is None:
+        raise HTTPException(status_code=409, detail=f"Session already finished (status: {entry['status']}).")
+
+    if session_id != job_id:
+        # Deduplicated onto another request's job: only this request stops following it
+        deduplicator.detach(job_id)
+        webhooks.unregister(job_id, session_id)
+        session_aliases.pop(session_id, None)
+        session_store[session_id] = {"status": "cancelled", "results": []}
+        return {"session_id": session_id, "status": "cancelled"}
+    attached = deduplicator.subscribers(job_id) - 1
+    if attached > 0:
+        # Its entry is the one the attached requests read, so it has to keep running for them
+        raise HTTPException(
+            status_code=409,
+            detail=f"{attached} other request(s) are attached to this session; it keeps running for them."
+        )
+
+    status = session.cancel()
+    if status == "cancelled":
+        # Parked or still queued: nothing is running, so it ends right away
+        _record_session(job_id, session)
+    elif status == "processing" and job_id in live_sessions:
+        # Running: it stops at its next checkpoint and records its partial results itself
+        status = "cancelling"
+        session_store[job_id] = {**entry, "status": status}
+    return {"session_id": session_id, "status": status}
+
 @app.get("/results/{session_id}")
-async def get_results(session_id: str):
-    return session_store.get(session_id, {"status": "not_found"})
+async def get_results(
+    session_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    wait: float = Query(0, ge=0)
+):
+    """
+    Session status and results. `fields` (comma-separated) selects result fields,
+    `offset`/`limit` page over comparisons. Polls sending the returned ETag in
+    If-None-Match get 304 until the session changes.
+
+    With `wait` (seconds, capped at api.long_poll_max_seconds) the request is held until
+    the session changes: until it leaves "processing"/"cancelling", or, with If-None-Match,
+    until its ETag differs. It answers as soon as that happens, or as usual on timeout.
+    """
+    job_id = session_aliases.get(session_id, session_id)
+    variant = hash_inputs({"fields": fields, "offset": offset, "limit": limit})[:8]
+    known = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+
+    def etag_of(meta: dict) -> str:
+        # Weak: the same entity may be sent gzip-encoded or not
+        return f'W/"{meta["etag"]}-{variant}"'
+
+    def unchanged(meta: Optional[dict]) -> bool:
+        if meta is None:
+            return False
+        if known != [""]:
+            return etag_of(meta) in known
+        return meta["status"] in ("processing", "cancelling")
+
+    meta = session_store.meta(job_id)
+    if wait and unchanged(meta):
+        meta = await session_waiters.wait(
+            job_id, lambda: session_store.meta(job_id), unchanged, min(wait, LONG_POLL_MAX_SECONDS)
+        )
+    if meta is None:
+        return {"status": "not_found"}
+
+    etag = etag_of(meta)
+    if etag in known:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    entry = session_store[job_id]
+    results = entry["results"]
+    page = results[offset:offset + limit] if limit else results[offset:]
+    if fields:
+        keep = {field.strip() for field in fields.split(",")} | {"comparison_repo", "partial"}
+        page = [{key: value for key, value in result.items() if key in keep} for result in page]
+
+    response.headers["ETag"] = etag
+    return {**entry, "results": page, "total": len(results), "offset": offset, "limit": limit}
+
+@app.get("/sessions/{session_id}/profile")
+async def get_profile(session_id: str, format: Literal["speedscope", "collapsed", "summary"] = "speedscope"):
+    """
+    Profile of a session started with "profile": true, recorded each time it finishes or
+    pauses for review. speedscope opens in https://www.speedscope.app; collapsed stacks
+    feed flamegraph.pl; summary gives per-phase and top self times.
+    """
+    job_id = session_aliases.get(session_id, session_id)
+    if job_id not in session_store:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    profile = session_store.get_artifact(job_id, "profile")
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile recorded for this session yet.")
+
+    if format == "summary":
+        return profile_summary(profile)
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(profile),
+            headers={"Content-Disposition": f'attachment; filename="{job_id}.collapsed.txt"'}
+        )
+    return JSONResponse(
+        to_speedscope(profile, name=f"session {job_id}"),
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.speedscope.json"'}
+    )
+
+@app.get("/export")
+async def export_results(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    format: Literal["parquet", "arrow"] = "parquet"
+):
+    """
+    Finished sessions in [since, until) (ISO dates or times, UTC unless given) as one
+    Parquet or Arrow file, one row per comparison. The file is streamed to disk a row group
+    at a time and sent from there; 204 when no session finished in the range.
+    """
+    try:
+        start, end = parse_timestamp(since), parse_timestamp(until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=FORMATS[format])
+    os.close(fd)
+    try:
+        report = await asyncio.to_thread(ResultExporter(store=session_store).export_file, path, start, end, format)
+    except RuntimeError as e:  # pyarrow not installed
+        os.remove(path)
+        raise HTTPException(status_code=501, detail=str(e))
+    except BaseException:
+        os.remove(path)
+        raise
+    if not report["rows"]:
+        os.remove(path)
+        return Response(status_code=204)
+    return FileResponse(
+        path,
+        media_type="application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file",
+        filename=f"sessions{FORMATS[format]}",
+        headers={"X-Export-Rows": str(report["rows"]), "X-Export-Sessions": str(report["sessions"])},
+        background=BackgroundTask(os.remove, path),
+    )
+
+@app.get("/models")
+async def get_models():
+    """Models resident in this process, their estimated footprint and the memory budget."""
+    return get_model_manager().report()
+
+@app.get("/similar")
+async def get_similar(repo: Optional[str] = None, text: Optional[str] = None, k: Optional[int] = None):
+    if not repo and not text:
+        raise HTTPException(status_code=400, detail="Provide either 'repo' or 'text'.")
+    k = k or load_config().get("vector_index", {}).get("default_k", 5)
+    # Loading the index and embedding the text block, so they run off the event loop
+    try:
+        neighbours = await asyncio.to_thread(
+            lambda: get_repo_index().query(repo_id=normalize_repo_id(repo) if repo else None, text=text, k=k)
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"query": repo or text, "k": k, "results": neighbours}
@@ -0,0 +1,314 @@
+"""
+Completion notifications for API sessions, pushed to webhook URLs registered with a request.
+
+Each notification is a JSON POST signed with HMAC-SHA256 over "<timestamp>.<body>" using
+the secret in the environment variable `webhooks.secret_env`, sent as
+
+    X-Webhook-Signature: t=<unix timestamp>,v1=<hex digest>
+
+Receivers check it with `verify_signature`. Deliveries answered with 429, 5xx or not at all
+are retried with jittered exponential backoff (honoring Retry-After) up to
+`webhooks.max_attempts`; other 4xx answers are final. Every attempt is appended to the
+JSONL delivery log. Pending retries live in memory and do not survive a restart.
+
+Webhook URLs are requester-supplied, so the server refuses to POST to loopback, private,
+link-local (e.g. cloud metadata at 169.254.169.254) and other non-public addresses: a URL's
+host is resolved when the request registers it and again before every attempt. Hosts in
+`webhooks.allowed_hosts` are trusted as-is (and, when the list is set, are the only ones
+accepted); `webhooks.allow_private_networks` turns the address check off.
+"""
+import hashlib
+import hmac
+import heapq
+import ipaddress
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses a client is told about: the session finished or needs a reviewer
+NOTIFY_STATUSES = ("completed", "failed", "cancelled", "timed_out", "awaiting_review")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+class WebhookURLRefused(ValueError):
+    """Raised for a webhook URL the server will not deliver to."""
+
+
+def sign_payload(secret: str, body: bytes, timestamp: Optional[int] = None) -> str:
+    """Signature header value for a payload body."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_signature(secret: str, body: bytes, header: str, tolerance_seconds: float = 300) -> bool:
+    """True when the header signs this body with the secret and is no older than tolerance_seconds."""
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance_seconds:
+        return False
+    expected = sign_payload(secret, body, timestamp).split("v1=", 1)[1]
+    return hmac.compare_digest(expected, parts.get("v1", ""))
+
+
+class WebhookDispatcher:
+    """
+    Delivers session notifications to registered webhook URLs from a few background threads.
+
+    `notify` is a ResultStore listener: once a session with registered webhooks reaches a
+    status in NOTIFY_STATUSES, one delivery per URL is queued, at most once per status
+    change. Registrations are dropped when the session ends.
+    """
+
+    def __init__(self, config_file: str = "config/config.yaml", secret: Optional[str] = None, transport=None):
+        """
+        Args:
+            config_file (str): Path to the configuration YAML file.
+            secret (Optional[str]): Signing secret; read from the `webhooks.secret_env` variable when None.
+            transport: Optional httpx transport for the delivery client (e.g. httpx.MockTransport).
+        """
+        webhook_config = load_config(config_file).get("webhooks", {})
+        self.enabled = webhook_config.get("enabled", True)
+        self.max_attempts = webhook_config.get("max_attempts", 6)
+        self.backoff_base = webhook_config.get("backoff_base_seconds", 1)
+        self.backoff_max = webhook_config.get("backoff_max_seconds", 300)
+        self.timeout_seconds = webhook_config.get("timeout_seconds", 10)
+        self.workers = webhook_config.get("workers", 2)
+        self.include_results = webhook_config.get("include_results", True)
+        self.log_path = Path(webhook_config.get("delivery_log", "output/webhook_deliveries.jsonl"))
+        self.secret_env = webhook_config.get("secret_env", "WEBHOOK_SECRET")
+        self.allowed_hosts = {host.lower() for host in webhook_config.get("allowed_hosts", [])}
+        self.allow_private_networks = webhook_config.get("allow_private_networks", False)
+        self._secret = secret
+        self._transport = transport
+
+        # job session id -> [{"url", "session_id" (the requester's id), "notified"}]
+        self._registrations: Dict[str, List[Dict[str, Any]]] = {}
+        self._queue: List[tuple] = []  # (due, seq, delivery)
+        self._seq = itertools.count()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._log_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._http = None
+
+    @property
+    def secret(self) -> Optional[str]:
+        """The signing secret, read from the environment (and .env) on first use."""
+        if self._secret is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            self._secret = os.getenv(self.secret_env) or ""
+        return self._secret or None
+
+    def validate_url(self, url: str) -> None:
+        """
+        Checks that url may receive webhooks. Resolves its host (blocking).
+
+        Raises:
+            WebhookURLRefused: Not http(s), not in `allowed_hosts`, or resolving to a non-public address.
+            OSError: The host does not resolve (socket.gaierror).
+        """
+        parts = urlsplit(url)
+        try:
+            port = parts.port
+        except ValueError:
+            raise WebhookURLRefused(f"invalid port in {url!r}")
+        host = (parts.hostname or "").rstrip(".").lower()
+        if parts.scheme not in ("http", "https") or not host:
+            raise WebhookURLRefused("must be an http(s) URL")
+        if self.allowed_hosts:
+            if host not in self.allowed_hosts:
+                raise WebhookURLRefused(f"host {host} is not in webhooks.allowed_hosts")
+            return
+        if self.allow_private_networks:
+            return
+        default_port = 443 if parts.scheme == "https" else 80
+        for *_, sockaddr in socket.getaddrinfo(host, port or default_port, type=socket.SOCK_STREAM):
+            address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+            if not address.is_global or address.is_multicast:
+                raise WebhookURLRefused(f"host {host} resolves to non-public address {address}")
+
+    def register(self, job_id: str, url: str, session_id: Optional[str] = None) -> None:
+        """Notifies url about job_id; session_id is the requester's id when it was deduplicated onto the job."""
+        with self._cond:
+            self._registrations.setdefault(job_id, []).append(
+                {"url": url, "session_id": session_id or job_id, "notified": None}
+            )
+
+    def unregister(self, job_id: str, session_id: str) -> None:
+        """Drops the webhooks a (deduplicated) requester registered on a job."""
+        with self._cond:
+            registrations = [r for r in self._registrations.get(job_id, []) if r["session_id"] != session_id]
+            if registrations:
+                self._registrations[job_id] = registrations
+            else:
+                self._registrations.pop(job_id, None)
+
+    def notify(self, job_id: str, entry: Dict[str, Any]) -> None:
+        """Queues a delivery to each URL registered on job_id whose last notified status differs."""
+        status = entry.get("status")
+        with self._cond:
+            registrations = self._registrations.get(job_id)
+            if not registrations:
+                return
+            due = []
+            for registration in registrations:
+                if registration["notified"] != status and status in NOTIFY_STATUSES:
+                    due.append(registration)
+                registration["notified"] = status
+            if status in TERMINAL_STATUSES:
+                self._registrations.pop(job_id, None)
+        for registration in due:
+            self.enqueue(registration["url"], self.payload(registration["session_id"], entry))
+
+    def payload(self, session_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {
+            "event": f"session.{entry.get('status')}",
+            "session_id": session_id,
+            "status": entry.get("status"),
+            "results_url": f"/results/{session_id}",
+            "num_results": len(entry.get("results", [])),
+            "sent_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for key in ("error", "aggregate_query_result", "review"):
+            if entry.get(key) is not None:
+                payload[key] = entry[key]
+        if self.include_results:
+            payload["results"] = entry.get("results", [])
+        return payload
+
+    def enqueue(self, url: str, payload: Dict[str, Any]) -> str:
+        """Queues one delivery and returns its id (the X-Webhook-Id header, stable across retries)."""
+        delivery = {"id": str(uuid4()), "url": url, "payload": payload, "attempt": 0}
+        with self._cond:
+            self._start_workers()
+            self._pending += 1
+            heapq.heappush(self._queue, (time.monotonic(), next(self._seq), delivery))
+            self._cond.notify_all()
+        return delivery["id"]
+
+    def _start_workers(self) -> None:
+        if self._threads:
+            return
+        for i in range(max(1, self.workers)):
+            thread = threading.Thread(target=self._work, name=f"webhook-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    self._cond.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                _, _, delivery = heapq.heappop(self._queue)
+            retry_in = None
+            try:
+                retry_in = self._attempt(delivery)
+            except Exception:
+                logger.exception("Webhook delivery %s crashed", delivery["id"])
+            with self._cond:
+                if retry_in is None:
+                    self._pending -= 1
+                else:
+                    heapq.heappush(self._queue, (time.monotonic() + retry_in, next(self._seq), delivery))
+                self._cond.notify_all()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.Client(timeout=self.timeout_seconds, transport=self._transport)
+        return self._http
+
+    def _attempt(self, delivery: Dict[str, Any]) -> Optional[float]:
+        """POSTs a delivery once; returns the delay before retrying it, or None when done with it."""
+        import httpx
+
+        delivery["attempt"] += 1
+        body = json.dumps(delivery["payload"], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": delivery["id"],
+            "X-Webhook-Event": delivery["payload"]["event"],
+            SIGNATURE_HEADER: sign_payload(self.secret or "", body),
+        }
+        status_code, error, retry_after, refused = None, None, None, False
+        try:
+            # Again at delivery time: the name may have been re-pointed since registration
+            self.validate_url(delivery["url"])
+            response = self._client().post(delivery["url"], content=body, headers=headers)
+            status_code = response.status_code
+            if status_code == 429 or status_code >= 500:
+                error = f"HTTP {status_code}: {response.text[:200]}"
+                retry_after = response.headers.get("Retry-After")
+            elif status_code >= 400:
+                error = f"HTTP {status_code}: {response.text[:200]}"
+        except WebhookURLRefused as e:
+            error, refused = f"Refused: {e}", True
+        except (httpx.HTTPError, OSError) as e:
+            error = f"{type(e).__name__}: {e}"
+
+        retryable = error is not None and not refused and (status_code is None or status_code == 429 or status_code >= 500)
+        retry_in = self._backoff(delivery["attempt"] - 1, retry_after) if retryable and delivery["attempt"] < self.max_attempts else None
+        outcome = "delivered" if error is None else "retrying" if retry_in is not None else "failed"
+        self._log(delivery, outcome, status_code, error, retry_in)
+        if outcome == "failed":
+            logger.warning("Webhook %s to %s failed after %d attempts: %s",
+                           delivery["id"], delivery["url"], delivery["attempt"], error)
+        return retry_in
+
+    def _log(self, delivery: Dict[str, Any], outcome: str, status_code: Optional[int],
+             error: Optional[str], retry_in: Optional[float]) -> None:
+        record = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "delivery_id": delivery["id"],
+            "session_id": delivery["payload"]["session_id"],
+            "event": delivery["payload"]["event"],
+            "url": delivery["url"],
+            "attempt": delivery["attempt"],
+            "outcome": outcome,
+            "status_code": status_code,
+            "error": error,
+            "retry_in_seconds": round(retry_in, 3) if retry_in is not None else None,
+        }
+        with self._log_lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("a", encoding="utf-8") as log:
+                log.write(json.dumps(record) + "\n")
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued delivery is delivered or given up; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
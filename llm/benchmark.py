@@ -0,0 +1,150 @@
+"""
+Micro-benchmark for the local llama.cpp backend.
+
+Measures prompt-processing and generation throughput for each combination of GGUF model
+(e.g. different quantizations of the same model), thread count and batch size on this
+host, and recommends the fastest settings for a typical analysis prompt.
+
+Usage:
+    python -m llm.benchmark [--models models/*.gguf] [--threads 4,8] [--batch 256,512]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.config_loader import load_config
+
+SAMPLE_PROMPT = (
+    "You are an AI assistant. Based only on the following repository summary, describe briefly "
+    "what the project does and which technologies it uses.\n\nRepository Summary:\n"
+    "Project: example-rag-service\nMain Languages: Python, Markdown, YAML\n"
+    "Top Keywords: retrieval, langchain, faiss, embeddings, evaluation\n"
+    "Project Summary: A retrieval-augmented generation service that indexes documentation "
+    "with FAISS and answers questions with a local Llama model. "
+) * 4
+
+
+def default_thread_counts() -> List[int]:
+    logical = os.cpu_count() or 4
+    return sorted({max(1, logical // 4), max(1, logical // 2), logical})
+
+
+def benchmark_model(
+    model_path: str,
+    n_threads: int,
+    n_batch: int,
+    prompt: str = SAMPLE_PROMPT,
+    gen_tokens: int = 64,
+    n_ctx: int = 4096
+) -> Dict[str, float]:
+    """Loads one configuration and times prompt processing and greedy generation."""
+    os.environ.setdefault("GGML_METAL_LOG_LEVEL", "0")
+    from llama_cpp import Llama
+
+    started = time.perf_counter()
+    llm = Llama(
+        model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, n_threads_batch=n_threads,
+        n_batch=n_batch, use_mmap=True, verbose=False
+    )
+    load_seconds = time.perf_counter() - started
+
+    tokens = llm.tokenize(prompt.encode("utf-8"), special=True)
+    started = time.perf_counter()
+    llm.eval(tokens)
+    prompt_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(gen_tokens):
+        token = llm.sample(top_k=1, temp=0.0)
+        llm.eval([token])
+    gen_seconds = time.perf_counter() - started
+
+    result = {
+        "model": model_path,
+        "size_mb": round(Path(model_path).stat().st_size / 1024 / 1024, 1),
+        "n_threads": n_threads,
+        "n_batch": n_batch,
+        "load_seconds": round(load_seconds, 3),
+        "prompt_tokens_per_second": round(len(tokens) / prompt_seconds, 1),
+        "gen_tokens_per_second": round(gen_tokens / gen_seconds, 1),
+    }
+    del llm
+    return result
+
+
+def estimated_seconds(result: Dict[str, float], prompt_tokens: int, gen_tokens: int) -> float:
+    """Wall time of a typical call: prefill of prompt_tokens plus gen_tokens of decoding."""
+    return prompt_tokens / result["prompt_tokens_per_second"] + gen_tokens / result["gen_tokens_per_second"]
+
+
+def run_benchmark(
+    models: List[str],
+    thread_counts: List[int],
+    batch_sizes: List[int],
+    workload_prompt_tokens: int = 1500,
+    workload_gen_tokens: int = 500
+) -> Dict[str, object]:
+    """
+    Benchmarks every (model, threads, batch) combination.
+
+    Returns:
+        Dict: 'results' sorted fastest first and the 'recommended' configuration.
+    """
+    results = []
+    for model_path, n_threads, n_batch in product(models, thread_counts, batch_sizes):
+        print(f"Benchmarking {Path(model_path).name} threads={n_threads} batch={n_batch}...", flush=True)
+        result = benchmark_model(model_path, n_threads, n_batch)
+        result["estimated_call_seconds"] = round(
+            estimated_seconds(result, workload_prompt_tokens, workload_gen_tokens), 2
+        )
+        results.append(result)
+
+    results.sort(key=lambda r: r["estimated_call_seconds"])
+    best = results[0] if results else None
+    recommended = None
+    if best:
+        recommended = {
+            "model_name": best["model"],
+            "n_threads": best["n_threads"],
+            "n_threads_batch": best["n_threads"],
+            "n_batch": best["n_batch"],
+        }
+    return {"results": results, "recommended": recommended}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    llm_config = load_config().get("llm", {})
+    model_dir = Path(llm_config.get("model_name", "models/model.gguf")).parent
+
+    parser = argparse.ArgumentParser(description="Find the fastest local LLM quantization and thread settings.")
+    parser.add_argument("--models", nargs="+", help="GGUF files to compare (default: every .gguf next to llm.model_name)")
+    parser.add_argument("--threads", help="Comma-separated thread counts (default: derived from CPU count)")
+    parser.add_argument("--batch", default="512", help="Comma-separated n_batch values")
+    parser.add_argument("--prompt-tokens", type=int, default=1500, help="Typical prompt length to optimise for")
+    parser.add_argument("--gen-tokens", type=int, default=500, help="Typical generation length to optimise for")
+    args = parser.parse_args(argv)
+
+    models = args.models or sorted(glob.glob(str(model_dir / "*.gguf")))
+    if not models:
+        parser.error(f"No GGUF models found in {model_dir}; pass --models.")
+    thread_counts = [int(t) for t in args.threads.split(",")] if args.threads else default_thread_counts()
+    batch_sizes = [int(b) for b in args.batch.split(",")]
+
+    report = run_benchmark(models, thread_counts, batch_sizes, args.prompt_tokens, args.gen_tokens)
+
+    print("\n===== LOCAL LLM BENCHMARK =====\n")
+    print(f"{'model':40} {'thr':>4} {'batch':>6} {'prompt t/s':>11} {'gen t/s':>8} {'est. call s':>12}")
+    for r in report["results"]:
+        print(f"{Path(r['model']).name:40} {r['n_threads']:>4} {r['n_batch']:>6} "
+              f"{r['prompt_tokens_per_second']:>11} {r['gen_tokens_per_second']:>8} {r['estimated_call_seconds']:>12}")
+    print("\nRecommended `llm` settings for config/config.yaml:")
+    print(json.dumps(report["recommended"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
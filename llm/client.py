@@ -1,51 +1,420 @@
 import os
 import sys
-from dotenv import load_dotenv
-from typing import Optional
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+from typing import Dict, Optional, Tuple
+
+from utils.cancellation import SessionCancelled, check_cancelled, current_token, remaining_time
+from utils.config_loader import load_config
+from utils.logger import get_logger
+from utils.model_manager import get_model_manager
+from utils.profiling import phase
+
+logger = get_logger(__name__)
+
+_env_loaded = False
+
+def _load_env() -> None:
+    """Reads .env into the environment once, when the first client is created."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
-load_dotenv()
 class BaseLLMClient:
     def generate(self, prompt: str, **kwargs) -> str:
         raise NotImplementedError("This method should be overridden by subclasses.")
+
+    def warm_prefix(self, prefix: str) -> None:
+        """Precomputes state for a prompt prefix many calls share. No-op unless the backend can reuse it."""
+        return None
+
+    def preload(self) -> None:
+        """Loads the model now instead of on the first call. No-op for remote backends."""
+        return None
     
-class OpenAIClient(BaseLLMClient):
+class LLMRequestError(RuntimeError):
+    """Raised when an HTTP LLM backend keeps failing after all retries."""
+
+# One concurrency limit per backend URL, shared by every client talking to it
+_backend_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_backend_semaphores_lock = threading.Lock()
+
+def _backend_semaphore(base_url: str, max_concurrency: int) -> threading.BoundedSemaphore:
+    with _backend_semaphores_lock:
+        if base_url not in _backend_semaphores:
+            _backend_semaphores[base_url] = threading.BoundedSemaphore(max_concurrency)
+        return _backend_semaphores[base_url]
+
+class OpenAICompatibleClient(BaseLLMClient):
+    """
+    Chat-completions client for OpenAI and OpenAI-compatible servers (e.g. llama.cpp's server mode).
+
+    Uses one pooled keep-alive HTTP connection set per client, retries 429/5xx and transport
+    errors with jittered exponential backoff, caps in-flight requests per backend, and
+    coalesces identical concurrent requests into a single call.
+    """
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        config_file: str = "config/config.yaml"
+    ):
+        """
+        Args:
+            model_name (Optional[str]): Model id sent with each request.
+            base_url (Optional[str]): API root such as "http://localhost:8080/v1"; falls back to config.
+            api_key (Optional[str]): Bearer token; optional for local servers.
+            config_file (str): Path to the configuration YAML file.
+        """
+        http_config = load_config(config_file).get("llm", {}).get("http", {})
+        self.model = model_name
+        self.base_url = (base_url or http_config.get("base_url", "http://localhost:8080/v1")).rstrip("/")
+        self.max_retries = http_config.get("max_retries", 4)
+        self.backoff_base = http_config.get("backoff_base_seconds", 0.5)
+        self.backoff_max = http_config.get("backoff_max_seconds", 20)
+
+        import httpx
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        max_connections = http_config.get("max_connections", 16)
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=httpx.Timeout(http_config.get("timeout_seconds", 120), connect=10),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._semaphore = _backend_semaphore(self.base_url, http_config.get("max_concurrency", 4))
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    @phase("llm")
+    def generate(self, prompt: str, **kwargs) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", 0.2),
+            "max_tokens": kwargs.get("max_tokens", 500),
+        }
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+        # Single-flight: the first caller makes the request, identical concurrent callers wait on it
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            try:
+                return future.result(timeout=remaining_time())
+            except (SessionCancelled, TimeoutError):
+                # Our deadline passed, or the leader's session was cancelled: retry on our own
+                check_cancelled()
+                return self.generate(prompt, **kwargs)
+
+        try:
+            text = self._post_with_retries(payload)
+        except Exception as e:
+            # Unregister before waking followers so a retrying follower starts a fresh request
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        future.set_result(text)
+        return text
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: spread retries from many sessions instead of retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _post_with_retries(self, payload: dict) -> str:
+        import httpx
+
+        last_error: Optional[str] = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            check_cancelled()
+            try:
+                with self._semaphore:
+                    response = self._http.post(
+                        "/chat/completions", json=payload,
+                        timeout=remaining_time(self._http.timeout.read)
+                    )
+            except httpx.TransportError as e:
+                last_error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 429 or response.status_code >= 500:
+                    last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                    retry_after = response.headers.get("Retry-After")
+                else:
+                    response.raise_for_status()
+                    return response.json()["choices"][0]["message"]["content"].strip()
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                logger.warning("LLM request to %s failed (%s); retry %d/%d in %.2fs",
+                               self.base_url, last_error, attempt + 1, self.max_retries, delay)
+                token = current_token()
+                if token is None:
+                    time.sleep(delay)
+                elif token.wait(delay):
+                    token.check()
+
+        raise LLMRequestError(f"LLM request to {self.base_url} failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def close(self) -> None:
+        self._http.close()
+
+class OpenAIClient(OpenAICompatibleClient):
     def __init__(self, model_name="gpt-3.5-turbo"):
-        import openai 
+        _load_env()
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        openai.api_key = self.api_key
-        self.client = openai
-        self.model = model_name
-    
-    def generate(self,prompt: str, **kwargs) -> str:
-        response = self.client.ChatCompletion.create(
-            model = self.model,
-            messages = [{"role": "user", "content": prompt}],
-            temperature = kwargs.get("temperature", 0.2),
-            max_tokens = kwargs.get("max_tokens", 500),
+        super().__init__(
+            model_name=model_name or "gpt-3.5-turbo",
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            api_key=self.api_key
         )
-        return response["choices"][0]["message"]["content"].strip()
+
+def llama_runtime_kwargs(llm_config: dict) -> dict:
+    """
+    Thread, batch and weight-loading options for llama.cpp from the `llm` config block.
+
+    With use_mmap the weights are mapped read-only from the GGUF file, so every worker
+    process loading the same model shares one copy through the OS page cache.
+    """
+    kwargs = {
+        "n_batch": llm_config.get("n_batch", 512),
+        "use_mmap": llm_config.get("use_mmap", True),
+        "use_mlock": llm_config.get("use_mlock", False),
+    }
+    # Left unset, llama.cpp picks the thread counts from the host's cores
+    for key in ("n_threads", "n_threads_batch"):
+        if llm_config.get(key):
+            kwargs[key] = llm_config[key]
+    return kwargs
+
+def estimate_llama_bytes(model_path: str, llm_config: dict, model=None) -> int:
+    """
+    Approximate memory of a llama.cpp model: its weights (the GGUF file) plus an f16 KV cache
+    for the full context, any draft model and a RAM prompt cache. The KV cache size comes from
+    the model's metadata once loaded, and from `model_manager.llm_kv_bytes_per_token` before.
+    """
+    n_ctx = llm_config.get("context_window", 36000)
+    kv_bytes_per_token = load_config().get("model_manager", {}).get("llm_kv_bytes_per_token", 131072)
+    metadata = getattr(model, "metadata", None) or {}
+    arch = metadata.get("general.architecture")
+    try:
+        layers = int(metadata[f"{arch}.block_count"])
+        embedding = int(metadata[f"{arch}.embedding_length"])
+        heads = int(metadata[f"{arch}.attention.head_count"])
+        kv_heads = int(metadata.get(f"{arch}.attention.head_count_kv", heads))
+        kv_bytes_per_token = 2 * layers * embedding * kv_heads // heads * 2  # K and V, 2 bytes each
+    except (KeyError, ValueError, ZeroDivisionError):
+        pass
+
+    total = os.path.getsize(model_path) + n_ctx * kv_bytes_per_token
+    draft_config = llm_config.get("draft", {})
+    if draft_config.get("type") == "model" and os.path.exists(draft_config.get("model_path", "")):
+        total += os.path.getsize(draft_config["model_path"])
+    cache_config = llm_config.get("prompt_cache", {})
+    if cache_config.get("enabled", False) and cache_config.get("type", "ram") == "ram":
+        total += int(cache_config.get("capacity_mb", 2048)) * 1024 * 1024
+    return total
+
+def _close_llama(model) -> None:
+    close = getattr(model, "close", None)
+    if close is not None:
+        close()
+
+# A llama.cpp context is not thread-safe: every client of the same model file shares one lock
+_model_locks: Dict[str, threading.Lock] = {}
+_model_locks_lock = threading.Lock()
 
 class LocalLlamaClient(BaseLLMClient):
-    def __init__(self, model_path: Optional[str] = None):
-        from llama_cpp import Llama
+    """
+    llama.cpp backend. The model itself is held by the process's ModelManager: it is loaded
+    on first use and may be unloaded while idle to keep the process within its memory budget.
+    """
+
+    def __init__(self, model_path: Optional[str] = None, config_file: str = "config/config.yaml"):
+        # Silences ggml's Metal backend logging; must be set before llama_cpp is first imported
+        os.environ.setdefault("GGML_METAL_LOG_LEVEL", "0")
+        _load_env()
+        self.llm_config = load_config(config_file).get("llm", {})
         self.model_path = model_path or os.getenv("LOCAL_LLM_PATH")
         if not self.model_path or not os.path.exists(self.model_path):
             raise ValueError("LOCAL_LLM_PATH is not set or file does not exist.")
-        self.model = Llama(model_path=self.model_path, n_ctx=36000)
+        self._model_key = f"llm:{Path(self.model_path).resolve()}"
+        with _model_locks_lock:
+            self._lock = _model_locks.setdefault(self._model_key, threading.Lock())
+        self._warmed = set()
+        self.cache = self._build_prompt_cache(self.llm_config.get("prompt_cache", {}))
+
+    def _load_model(self):
+        from llama_cpp import Llama
+
+        model = Llama(
+            model_path=self.model_path,
+            n_ctx=self.llm_config.get("context_window", 36000),
+            draft_model=self._build_draft_model(self.llm_config),
+            **llama_runtime_kwargs(self.llm_config)
+        )
+        if self.cache is not None:
+            # llama.cpp restores the saved KV state with the longest common token prefix
+            # before evaluating a prompt, so only the differing suffix is processed.
+            model.set_cache(self.cache)
+        return model
+
+    def _use_model(self):
+        return get_model_manager().use(
+            self._model_key,
+            self._load_model,
+            estimate_llama_bytes(self.model_path, self.llm_config),
+            kind="llm",
+            unloader=_close_llama,
+            footprint=lambda model: estimate_llama_bytes(self.model_path, self.llm_config, model),
+        )
+
+    def preload(self) -> None:
+        with self._use_model():
+            pass
+
+    def _build_draft_model(self, llm_config: dict):
+        """Optional speculative decoding: a draft proposes tokens the main model verifies in one batch."""
+        draft_config = llm_config.get("draft", {})
+        draft_type = draft_config.get("type", "none")
+        num_pred_tokens = draft_config.get("num_pred_tokens", 8)
+
+        if draft_type == "prompt_lookup":
+            from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+            return LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens)
+        if draft_type == "model":
+            from llm.speculative import SmallModelDraft
+            return SmallModelDraft(
+                model_path=draft_config["model_path"],
+                num_pred_tokens=num_pred_tokens,
+                n_ctx=draft_config.get("n_ctx", llm_config.get("context_window", 36000)),
+                **llama_runtime_kwargs(llm_config)
+            )
+        return None
+
+    def _build_prompt_cache(self, cache_config: dict):
+        if not cache_config.get("enabled", False):
+            return None
+        from llama_cpp import LlamaRAMCache, LlamaDiskCache
+
+        capacity = int(cache_config.get("capacity_mb", 2048)) * 1024 * 1024
+        if cache_config.get("type", "ram") == "disk":
+            model_name = Path(self.model_path).stem
+            cache_dir = Path(cache_config.get("cache_dir", "output/llama_cache")) / model_name
+            return LlamaDiskCache(cache_dir=str(cache_dir), capacity_bytes=capacity)
+        return LlamaRAMCache(capacity_bytes=capacity)
+
+    def warm_prefix(self, prefix: str) -> None:
+        """
+        Evaluates a shared prompt preamble once and stores its KV state in the prompt cache,
+        so every later prompt starting with it skips re-processing those tokens.
+        """
+        if self.cache is None or not prefix.strip():
+            return
+        with self._use_model() as model, self._lock:
+            tokens = model.tokenize(prefix.encode("utf-8"), special=True)
+            key = tuple(tokens)
+            if key in self._warmed:
+                return
+            model.reset()
+            model.eval(tokens)
+            self.cache[tokens] = model.save_state()
+            self._warmed.add(key)
+        logger.debug("Cached KV state for a %d-token prompt prefix", len(tokens))
     
+    @phase("llm")
     def generate(self, prompt: str, **kwargs) -> str:
-        response = self.model(prompt, max_tokens=kwargs.get("max_tokens",512))
+        token = current_token()
+        stopping_criteria = None
+        if token is not None:
+            from llama_cpp import StoppingCriteriaList
+            # Checked after every sampled token, so a cancelled session stops at the next token
+            stopping_criteria = StoppingCriteriaList([lambda input_ids, logits: token.cancelled])
+
+        with self._use_model() as model:
+            # Waiting behind another session's generation must not outlive our own deadline
+            while not self._lock.acquire(timeout=0.5):
+                check_cancelled()
+            try:
+                response = model(prompt, max_tokens=kwargs.get("max_tokens",512), stopping_criteria=stopping_criteria)
+            finally:
+                self._lock.release()
+        check_cancelled()
         return response["choices"][0]["text"].strip()
 
 
-def get_llm_client(llm_type: str = "local", model_name: Optional[str] = None) -> BaseLLMClient:
-    if llm_type == "openai":
-        return OpenAIClient(model_name=model_name)
-    elif llm_type == "local":
-        return LocalLlamaClient(model_path=model_name)
-    else:
-        raise ValueError(f"Unsupported LLM type: {llm_type}")
+# One client per (backend, model) per process, so agents created on every graph node
+# invocation reuse an already loaded model instead of loading it again.
+_clients: Dict[Tuple[str, Optional[str]], BaseLLMClient] = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(
+    llm_type: str = "local",
+    model_name: Optional[str] = None,
+    node: Optional[str] = None,
+    config_file: str = "config/config.yaml"
+) -> BaseLLMClient:
+    """
+    Returns the shared client for a backend and model.
+
+    When `node` is given and `llm.routing.enabled` is set, returns a router that picks the
+    model tier configured for that node instead (see llm/router.py); llm_type and
+    model_name are then ignored.
+    """
+    _load_env()
+    if node is not None:
+        routing_config = load_config(config_file).get("llm", {}).get("routing", {})
+        if routing_config.get("enabled", False):
+            return _get_routed_client(node, routing_config)
+
+    key = (llm_type, model_name)
+    with _clients_lock:
+        if key in _clients:
+            return _clients[key]
+
+        if llm_type == "openai":
+            client = OpenAIClient(model_name=model_name)
+        elif llm_type == "openai_compatible":
+            client = OpenAICompatibleClient(model_name=model_name, api_key=os.getenv("LLM_API_KEY"))
+        elif llm_type == "local":
+            client = LocalLlamaClient(model_path=model_name)
+        else:
+            raise ValueError(f"Unsupported LLM type: {llm_type}")
+
+        _clients[key] = client
+        return client
 
+def _get_routed_client(node: str, routing_config: dict) -> BaseLLMClient:
+    from llm.router import RoutedLLMClient
 
+    key = ("routed", node)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = RoutedLLMClient(
+                node, routing_config, lambda llm_type, model_name: get_llm_client(llm_type, model_name)
+            )
+        return _clients[key]
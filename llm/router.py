@@ -0,0 +1,86 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+from llm.client import BaseLLMClient, LLMRequestError
+from utils.cancellation import CancelToken, SessionCancelled, cancellation_scope, check_cancelled, current_token
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RoutedLLMClient(BaseLLMClient):
+    """
+    Sends each prompt of one graph node to a model tier chosen from the `llm.routing` config.
+
+    The node's configured tier is the starting point; tiers whose `max_prompt_chars` the prompt
+    exceeds are skipped, and a tier that raises or exceeds its `timeout_seconds` hands the
+    prompt to the next tier in `order`. Tier clients are created on first use, so a tier a
+    process never routes to is never loaded.
+    """
+
+    def __init__(self, node: str, routing_config: dict, client_factory: Callable[[str, Optional[str]], BaseLLMClient]):
+        """
+        Args:
+            node (str): Graph node name (e.g. "fact_check", "summarize").
+            routing_config (dict): The `llm.routing` config block.
+            client_factory (Callable): Returns a backend client for (llm_type, model_name).
+        """
+        self.node = node
+        self.tiers: Dict[str, dict] = routing_config.get("tiers", {})
+        self.order: List[str] = routing_config.get("order") or list(self.tiers)
+        self.start_tier = routing_config.get("nodes", {}).get(node, routing_config.get("default_tier", self.order[-1]))
+        if self.start_tier not in self.tiers or self.start_tier not in self.order:
+            raise ValueError(f"Unknown LLM tier '{self.start_tier}' for node '{node}'")
+        self._client_factory = client_factory
+
+    def _client(self, tier: str) -> BaseLLMClient:
+        tier_config = self.tiers[tier]
+        return self._client_factory(tier_config.get("type", "local"), tier_config.get("model_name"))
+
+    def candidate_tiers(self, prompt: str) -> List[str]:
+        """Tiers to try for this prompt, in order: the node's tier and every tier after it that fits."""
+        candidates = self.order[self.order.index(self.start_tier):]
+        fitting = [
+            tier for tier in candidates
+            if not self.tiers[tier].get("max_prompt_chars") or len(prompt) <= self.tiers[tier]["max_prompt_chars"]
+        ]
+        # Nothing fits: the last tier is the most capable, let it try
+        return fitting or candidates[-1:]
+
+    def _generate_on(self, tier: str, prompt: str, **kwargs) -> str:
+        client = self._client(tier)
+        timeout = self.tiers[tier].get("timeout_seconds")
+        if not timeout:
+            return client.generate(prompt, **kwargs)
+        # Run in this thread under a child token: the client stops at its next token, lock wait
+        # or HTTP timeout once the tier's deadline passes, instead of running on unobserved
+        tier_token = CancelToken(deadline_seconds=timeout, parent=current_token())
+        try:
+            with cancellation_scope(tier_token):
+                return client.generate(prompt, **kwargs)
+        except SessionCancelled:
+            # The session's own cancel or deadline ends the session, not just this tier
+            check_cancelled()
+            if not tier_token.cancelled:
+                raise
+            raise TimeoutError(f"tier '{tier}' did not answer within {timeout}s") from None
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        errors = []
+        for tier in self.candidate_tiers(prompt):
+            started = time.perf_counter()
+            try:
+                text = self._generate_on(tier, prompt, **kwargs)
+            except SessionCancelled:
+                raise
+            except Exception as e:
+                errors.append(f"{tier}: {e}")
+                logger.warning("LLM tier '%s' failed for node '%s' (%s); falling back", tier, self.node, e)
+                continue
+            logger.debug("Node '%s' answered by tier '%s' in %.2fs", self.node, tier, time.perf_counter() - started)
+            return text
+        raise LLMRequestError(f"All LLM tiers failed for node '{self.node}': {'; '.join(errors)}")
+
+    def warm_prefix(self, prefix: str) -> None:
+        # Only the node's own tier is warmed; fallback tiers are loaded when actually needed
+        self._client(self.start_tier).warm_prefix(prefix)
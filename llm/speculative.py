@@ -0,0 +1,29 @@
+import numpy as np
+import numpy.typing as npt
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel
+
+
+class SmallModelDraft(LlamaDraftModel):
+    """
+    Draft model for speculative decoding backed by a small GGUF model.
+
+    The draft greedily proposes `num_pred_tokens` tokens; the main model verifies them in a
+    single batched evaluation and keeps the longest agreeing run. The draft must share the
+    main model's tokenizer/vocabulary (e.g. a smaller model of the same family).
+    """
+
+    def __init__(self, model_path: str, num_pred_tokens: int = 8, **llama_kwargs):
+        self.num_pred_tokens = num_pred_tokens
+        self.model = Llama(model_path=model_path, **llama_kwargs)
+
+    def __call__(self, input_ids: npt.NDArray[np.intc], /, **kwargs) -> npt.NDArray[np.intc]:
+        draft = []
+        # generate() reuses the draft's own KV cache for the prefix shared with the last call
+        for token in self.model.generate(input_ids.tolist(), top_k=1, temp=0.0):
+            if token == self.model.token_eos():
+                break
+            draft.append(token)
+            if len(draft) >= self.num_pred_tokens:
+                break
+        return np.array(draft, dtype=np.intc)
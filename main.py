@@ -1,39 +1,89 @@
-import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
 import sys
-import json
+import time
 import uuid
+import argparse
 
-from tools.repo_parser import parse_repository, condense_repo_summary
-from agents.project_analyzer import ProjectAnalyzerAgent
-from orchestrator.orchestrator import CrossPublicationInsightOrchestrator
-from agents.llm_trend_agent import run as aggregate_trends
 from utils.logger import get_logger
-from utils.repo_utils import clone_if_remote
+from utils.repo_utils import clone_if_remote, normalize_repo_id
 from utils.config_loader import load_config
+from utils.profiling import SessionProfiler, write_profile
+
+# The pipeline modules (agents, models, vector index) are imported where they are used,
+# so argument errors and --help return without loading them.
 
 logger = get_logger(__name__)
 
-def run_orchestration(repo_path, comparison_repo_path,  user_query="", use_hitl=True):
+# Subcommands; anything else on the command line is an analysis run
+COMMANDS = ("analyze", "similar", "batch", "export")
+
+def _timestamp(value: str):
+    from utils.result_export import parse_timestamp
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date or date/time: {value!r}") from None
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description=(
+            "Analyze a primary repository and compare it with one or more others.\n"
+            "Without a command, `main.py <primary_repo> <comparison_repos...>` runs `analyze`."
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    analyze = commands.add_parser("analyze", help="Analyze and compare repositories (the default)")
+    analyze.add_argument("primary_repo", help="Local path or git URL of the repository to analyze")
+    analyze.add_argument("comparison_repos", nargs="+", help="Repositories to compare it with")
+    analyze.add_argument("--query", default="", help="Cross-repository question, answered once over all repositories")
+    analyze.add_argument("--no-hitl", action="store_true", help="Skip the human review before summarization")
+    analyze.add_argument("--profile", action="store_true",
+                         help="Sample the run and write speedscope/collapsed-stack files to profiling.dir")
+
+    similar = commands.add_parser("similar", help="Previously analyzed repositories closest to a repo or text")
+    target = similar.add_mutually_exclusive_group(required=True)
+    target.add_argument("repo", nargs="?", help="Repository URL or path analyzed before")
+    target.add_argument("--text", help="Free-text description to match instead of a repository")
+    similar.add_argument("--k", type=int, help="Number of neighbours; defaults to vector_index.default_k")
+
+    batch = commands.add_parser("batch", help="Analyze many repositories from a manifest")
+    batch.add_argument("manifest", help="JSONL or CSV manifest of (primary_repo, comparison_repos, user_query) jobs")
+    batch.add_argument("--output", "-o", default="output/batch_results.jsonl", help="JSONL results file")
+    batch.add_argument("--workers", "-w", type=int, help="Number of parallel workers")
+    batch.add_argument("--executor", choices=["process", "thread"], help="Worker pool type")
+    batch.add_argument("--no-resume", action="store_true", help="Start over instead of skipping completed jobs")
+
+    export = commands.add_parser("export", help="Export finished sessions to Parquet or Arrow")
+    export.add_argument("--since", type=_timestamp, help="Sessions finished at or after this ISO date/time (UTC unless given)")
+    export.add_argument("--until", type=_timestamp, help="Sessions finished before this ISO date/time")
+    export.add_argument("--format", choices=["arrow", "parquet"], help="Defaults to result_export.format")
+    export.add_argument("--output", help="Export directory for incremental parts; defaults to result_export.dir")
+    export.add_argument("--file", help="Write the whole range to this one file instead of appending a part")
+    return parser
+
+def run_orchestration(repo_path, comparison_repo_path, use_hitl=True, repo_ids=None):
+    from orchestrator.orchestrator import CrossPublicationInsightOrchestrator, cached_analyze, cached_llm_trends
+    from tools.hitl_intervention import prompt_review
+    from tools.vector_index import index_session_results
+
     logger.info("Running Orchestrator...")
 
     thread_id = str(uuid.uuid4())
     config_override = {
-        "configurable": {"thread_id":thread_id},
-        "hitl_override": {"enabled":use_hitl}
+        "configurable": {"thread_id":thread_id}
     }
 
-    # Analyze comparison repo
-    comparison_analyzer = ProjectAnalyzerAgent(llm_type="local")
-    comparison_analysis = comparison_analyzer.analyze_project(comparison_repo_path)
+    # Analyze comparison repo (skipped when its summary, prompt and model are unchanged)
+    comparison_analysis = cached_analyze({"repo_path": comparison_repo_path})["analysis_result"]
 
     # Aggregate trends for comparison repo
     trend_input = {
         "repo_path": comparison_repo_path,
         "analysis_result": comparison_analysis
     }
-    trend_result = aggregate_trends(trend_input)
+    trend_result = cached_llm_trends(trend_input)
 
     comparison_target_state = {
         "repo_path": comparison_repo_path,
@@ -44,70 +94,126 @@ def run_orchestration(repo_path, comparison_repo_path,  user_query="", use_hitl=
     # Build orchestration input
     initial_state = {
         "repo_path":repo_path,
-        "comparison_target":comparison_target_state,
-        "user_query":user_query.strip()
+        "comparison_target":comparison_target_state
     }
 
     # Initialize orchestrator
-    orchestrator = CrossPublicationInsightOrchestrator(user_query=user_query)
-    result = orchestrator.run(initial_state, config=config_override)
+    orchestrator = CrossPublicationInsightOrchestrator(use_hitl=use_hitl)
+    result = orchestrator.run(initial_state, config=config_override, review_handler=prompt_review)
+
+    primary_id, comparison_id = repo_ids or (normalize_repo_id(repo_path), normalize_repo_id(comparison_repo_path))
+    index_session_results([
+        {"repo_id": comparison_id, "analysis": comparison_analysis, "trends": trend_result["aggregated_trends"],
+         "metadata": {"local_path": comparison_repo_path}},
+        {"repo_id": primary_id, "analysis": result.get("analysis_result", ""), "trends": result.get("aggregated_trends", ""),
+         "metadata": {"local_path": repo_path}},
+    ])
 
     # Display results
     print("\n=====FACT CHECK RESULT =====\n")
     print(result.get("fact_check_result",  "No fact check result found."))
-
-    if user_query:
-        print("\n===== AGGREGATE QUERY RESULT ====== \n")
-        print(result.get("aggregate_query_result", "No aggregate query generated."))
     
     print("\n===== FINAL PROJECT SUMMARY ======\n")
     print(result.get("final_summary", "No summary generated."))
+    return result
+
+def run_similar(options):
+    """Prints the previously analyzed repositories closest to a repo or free text."""
+    from tools.vector_index import get_repo_index
+
+    k = options.k or load_config().get("vector_index", {}).get("default_k", 5)
+    repo_id = normalize_repo_id(options.repo) if options.repo else None
+    try:
+        neighbours = get_repo_index().query(repo_id=repo_id, text=options.text, k=k)
+    except KeyError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"\n===== {len(neighbours)} NEAREST REPOSITORIES =====\n")
+    for neighbour in neighbours:
+        print(f"{neighbour['score']:.3f}  {neighbour['repo_id']}")
+
+def run_analysis(options):
+    """Resolves the repositories and compares the primary with each of the others."""
+    from tools.repo_parser import parse_repository, condense_repo_summary
+
+    repos = [options.primary_repo] + options.comparison_repos
+    use_hitl = not options.no_hitl
+    user_query = options.query
+
+    # Resolve repositories
+    repo_ids = [normalize_repo_id(repo) for repo in repos]
+    local_repo_paths = [clone_if_remote(repo) for repo in repos]
+    repo_path = local_repo_paths[0]
+    comparison_repo_paths = local_repo_paths[1:]
+
+    # Display basic info
+    logger.info("Starting analysis for primary repo: %s", repo_path)
+    primary_summary = parse_repository(repo_path)
+    condensed = condense_repo_summary(primary_summary)
+
+    print("\n===== CONDENSED (LLM) SUMMARY =====\n")
+    print(condensed)
+
+    # Compare with each secondary repo 
+    results = []
+    for comparison_id, comparison_repo_path in zip(repo_ids[1:], comparison_repo_paths):
+        print(f"\n=== Comparing PRIMARY: {repo_path} WITH: {comparison_repo_path} ===\n")
+        results.append(run_orchestration(repo_path, comparison_repo_path, use_hitl=use_hitl,
+                                         repo_ids=(repo_ids[0], comparison_id)))
+
+    # The query is answered once, over the primary and every comparison analysis
+    if user_query and results:
+        from orchestrator.orchestrator import session_aggregate_query
+
+        answer = session_aggregate_query({
+            "repo_path": repo_path,
+            "analysis_result": results[-1].get("analysis_result", ""),
+            "comparison_targets": [result["comparison_target"] for result in results],
+            "user_query": user_query,
+        })
+        print("\n===== AGGREGATE QUERY RESULT ====== \n")
+        print(answer.get("aggregate_query_result", "No aggregate query generated."))
 
 def main():
     try:
         args = sys.argv[1:]
-
-        if not args or len(args) < 2:
-            print("Usage: python3 main.py <primary_repo> <comparison_repo1> [comparison_repo2...] [--query 'your question'] [--no-hitl]")
-            sys.exit(1)
-        
-        use_hitl = True
-        user_query = ""
-
-        # Parse CLI flags
-        if "--no-hitl" in args:
-            use_hitl = False
-            args.remove("--no-hitl")
-        
-        if "--query" in args:
-            idx = args.index("--query")
-            if idx + 1 < len(args):
-                user_query = args[idx + 1]
-                del args[idx:idx + 2]
-            else:
-                print("Error: --query flag. requires a string value.")
-                sys.exit(1)
-        
-        # Resolve repositories
-        local_repo_paths = [clone_if_remote(repo) for repo in args]
-        repo_path = local_repo_paths[0]
-        comparison_repo_paths = local_repo_paths[1:]
-
-        # Display basic info
-        logger.info(f"Starting analysis for primary repo: {repo_path}")
-        primary_summary = parse_repository(repo_path)
-        condensed = condense_repo_summary(primary_summary)
-
-        print("\n===== CONDENSED (LLM) SUMMARY =====\n")
-        print(condensed)
-
-        # Compare with each secondary repo 
-        for comparison_repo_path in comparison_repo_paths:
-            print(f"\n=== Comparing PRIMARY: {repo_path} WITH: {comparison_repo_path} ===\n")
-            run_orchestration(repo_path, comparison_repo_path, user_query=user_query, use_hitl=use_hitl)
+        if args and args[0] not in COMMANDS and args[0] not in ("-h", "--help"):
+            args = ["analyze", *args]
+        options = build_parser().parse_args(args)
+
+        # Each command's modules are imported only once it is chosen
+        if options.command == "similar":
+            run_similar(options)
+            return
+
+        if options.command == "batch":
+            from orchestrator.batch import batch_main
+            sys.exit(batch_main(options))
+
+        if options.command == "export":
+            from utils.result_export import export_main
+            sys.exit(export_main(options))
+
+        if options.command is None:
+            build_parser().print_help()
+            sys.exit(2)
+
+        if not options.profile:
+            run_analysis(options)
+            return
+
+        profiler = SessionProfiler()
+        try:
+            with profiler.running():
+                run_analysis(options)
+        finally:
+            profile_dir = load_config().get("profiling", {}).get("dir", "output/profiles")
+            paths = write_profile(profiler.export(), profile_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}")
+            print("\nProfile written to:\n  " + "\n  ".join(paths))
 
     except Exception as e:
-        logger.exception(f"An error occured during execution: {e}")
+        logger.exception("An error occured during execution: %s", e)
 
 
 if __name__ == "__main__":
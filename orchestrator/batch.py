@@ -0,0 +1,220 @@
+import argparse
+import csv
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from utils.config_loader import load_config
+from utils.logger import get_logger, log_context
+
+logger = get_logger(__name__)
+
+
+def _job_id(job: Dict[str, Any]) -> str:
+    """Stable id for a job: explicit 'id' field, else a hash of its repos and query."""
+    if job.get("id"):
+        return str(job["id"])
+    payload = json.dumps(
+        [job["primary_repo"], job["comparison_repos"], job.get("user_query", "")],
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """
+    Reads batch jobs from a JSONL or CSV manifest.
+
+    JSONL lines and CSV rows both provide 'primary_repo', 'comparison_repos' and optionally
+    'user_query' and 'id'. In CSV, 'comparison_repos' is a ';'-separated list.
+
+    Returns:
+        List[Dict]: Normalized jobs, each with a 'job_id'.
+    """
+    path = Path(manifest_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Manifest not found at {manifest_path}")
+
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            raw_jobs = list(csv.DictReader(f))
+        for job in raw_jobs:
+            job["comparison_repos"] = [r.strip() for r in (job.get("comparison_repos") or "").split(";") if r.strip()]
+    else:
+        with open(path, encoding="utf-8") as f:
+            raw_jobs = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for line_no, job in enumerate(raw_jobs, start=1):
+        if not job.get("primary_repo") or not job.get("comparison_repos"):
+            raise ValueError(f"Manifest entry {line_no} needs 'primary_repo' and 'comparison_repos'")
+        job = {
+            "id": job.get("id"),
+            "primary_repo": job["primary_repo"].strip(),
+            "comparison_repos": list(job["comparison_repos"]),
+            "user_query": (job.get("user_query") or "").strip(),
+        }
+        job["job_id"] = _job_id(job)
+        jobs.append(job)
+    return jobs
+
+
+def _completed_job_ids(output_path: Path) -> Set[str]:
+    """Job ids already written successfully to the output file (the resume checkpoint)."""
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a partially written last line from an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["job_id"])
+    return done
+
+
+def _init_worker() -> None:
+    """Loads the LLM(s) once per worker so every job in that worker shares them."""
+    from llm.client import get_llm_client
+
+    llm_config = load_config().get("llm", {})
+    routing_config = llm_config.get("routing", {})
+    if routing_config.get("enabled", False):
+        models = [(tier.get("type", "local"), tier.get("model_name")) for tier in routing_config.get("tiers", {}).values()]
+    else:
+        models = [("local", llm_config.get("model_name"))]
+    try:
+        for llm_type, model_name in models:
+            get_llm_client(llm_type=llm_type, model_name=model_name).preload()
+    except Exception as e:
+        logger.warning("Could not preload LLM in batch worker: %s", e)
+
+
+def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    from orchestrator.pipeline import AnalysisSession
+
+    started = time.perf_counter()
+    record = {
+        "job_id": job["job_id"],
+        "primary_repo": job["primary_repo"],
+        "comparison_repos": job["comparison_repos"],
+        "user_query": job["user_query"],
+    }
+    with log_context(session_id=job["job_id"]):
+        try:
+            session = AnalysisSession(
+                job["primary_repo"], job["comparison_repos"], user_query=job["user_query"], use_hitl=False
+            )
+            session.start()
+            record.update(status="ok", results=session.results)
+            if session.aggregate_query_result is not None:
+                record["aggregate_query_result"] = session.aggregate_query_result
+        except Exception as e:
+            logger.exception("Batch job %s failed: %s", job["job_id"], e)
+            record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    record["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return record
+
+
+def run_batch(
+    manifest_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    executor: Optional[str] = None,
+    resume: bool = True
+) -> Dict[str, Any]:
+    """
+    Runs every manifest job through a bounded worker pool, streaming results to JSONL.
+
+    Args:
+        manifest_path (str): JSONL or CSV manifest of jobs.
+        output_path (str): JSONL file results are appended to as each job finishes.
+        workers (Optional[int]): Pool size; falls back to config.
+        executor (Optional[str]): "process" (one model per worker process) or "thread"
+            (one shared model); falls back to config.
+        resume (bool): Skip jobs already recorded as successful in output_path.
+
+    Returns:
+        Dict: Summary report with counts, throughput and failures.
+    """
+    batch_config = load_config().get("batch", {})
+    workers = workers or batch_config.get("workers", 2)
+    executor = executor or batch_config.get("executor", "process")
+
+    jobs = load_manifest(manifest_path)
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    if resume:
+        done = _completed_job_ids(output)
+        if output.exists() and output.stat().st_size:
+            with open(output, "rb+") as out:
+                out.seek(-1, 2)
+                if out.read(1) != b"\n":
+                    out.write(b"\n")
+    else:
+        done = set()
+        output.write_text("", encoding="utf-8")
+    pending = [job for job in jobs if job["job_id"] not in done]
+    logger.info("Batch: %d jobs, %d already done, %d to run with %s %s workers", len(jobs), len(jobs) - len(pending), len(pending), workers, executor)
+
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    started = time.perf_counter()
+    succeeded, failures = 0, []
+
+    with open(output, "a", encoding="utf-8") as out, pool_cls(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_job, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. OOM); record it so resume retries the job
+                record = {"job_id": job["job_id"], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failures.append({"job_id": record["job_id"], "error": record.get("error", "")})
+            logger.info("Batch progress: %d/%d (%s: %s)", succeeded + len(failures), len(pending), record["job_id"], record["status"])
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "manifest": str(manifest_path),
+        "output": str(output),
+        "total_jobs": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "succeeded": succeeded,
+        "failed": len(failures),
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs_per_minute": round((succeeded + len(failures)) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "workers": workers,
+        "executor": executor,
+        "failures": failures,
+    }
+    summary_path = output.with_suffix(".summary.json")
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return summary
+
+
+def batch_main(args: argparse.Namespace) -> int:
+    """Runs `python3 main.py batch ...` from its parsed arguments. Returns the process exit code."""
+    summary = run_batch(
+        args.manifest, args.output, workers=args.workers, executor=args.executor, resume=not args.no_resume
+    )
+
+    print("\n===== BATCH SUMMARY =====\n")
+    print(json.dumps({k: v for k, v in summary.items() if k != "failures"}, indent=2))
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['job_id']}: {failure['error']}")
+    return 1 if summary["failed"] else 0
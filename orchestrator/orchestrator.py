@@ -1,5 +1,4 @@
-from langgraph.graph import StateGraph, END 
-from langgraph.checkpoint.memory import MemorySaver 
+from typing import Any, Callable, Dict, Optional
 from agents.project_analyzer import run as analyze_project
 from agents.trend_aggregator import run as aggregate_trends
 from agents.comparison_agent import run as compare_projects
@@ -7,50 +6,167 @@ from agents.fact_checker import run as fact_check
 from agents.summarize_agent import run as summarize_project
 from agents.aggregate_query_agent import run as aggregate_query_run
 
+from agents.llm_trend_agent import run as extract_llm_trends
+
 from utils.config_loader import load_config
-from tools.hitl_intervention import review_before_summary
+from utils.node_cache import NodeCache, cached_node
+from utils.prompt_registry import get_prompt_registry
+from utils.profiling import phase
+from tools.hitl_intervention import review_node
+from tools.repo_parser import parse_repository, condense_repo_summary
+from tools.repo_retriever import get_repo_retriever
+
+CONFIG = load_config()
+PATHS = CONFIG.get("paths", {})
+
+def _prompt_version(path: str) -> str:
+    return get_prompt_registry().version(path)
+
+def _model_id() -> dict:
+    return CONFIG.get("llm", {})
+
+def _condensed_summary(repo_path: str) -> str:
+    repo_summary = parse_repository(repo_path)
+    return repo_summary.get("error") or condense_repo_summary(repo_summary)
+
+# Everything each node's output depends on. A node is skipped when these hash to a stored entry.
+def _analyze_inputs(state: dict) -> dict:
+    return {
+        "repo_summary": _condensed_summary(state.get("repo_path", "")),
+        "retrieval": get_repo_retriever().cache_inputs(state.get("repo_path", "")),
+        "prompt": _prompt_version(PATHS.get("analyzer_prompt", "config/prompts/analyzer_prompt.txt")),
+        "model": _model_id(),
+    }
+
+def _fact_check_inputs(state: dict) -> dict:
+    return {
+        "analysis": state.get("analysis_result", ""),
+        "repo_summary": _condensed_summary(state.get("repo_path", "")),
+        "prompt": _prompt_version(PATHS.get("fact_checker_prompt", "config/prompts/fact_checker_prompt.txt")),
+        "escalation_prompt": _prompt_version(
+            PATHS.get("fact_check_escalation_prompt", "config/prompts/fact_check_escalation.txt")
+        ),
+        "rules": CONFIG.get("fact_check", {}),
+        "model": _model_id(),
+    }
+
+def _aggregate_inputs(state: dict) -> dict:
+    return {
+        "analysis": state.get("analysis_result", ""),
+        "embeddings": CONFIG.get("embeddings", {}),
+        "trends": CONFIG.get("trends", {}),
+    }
+
+def _llm_trends_inputs(state: dict) -> dict:
+    return {
+        "analysis": state.get("analysis_result", ""),
+        "prompt": _prompt_version(PATHS.get("llm_trend_prompt", "config/prompts/llm_trend_extractor.txt")),
+        "model": _model_id(),
+    }
+
+def _comparison_analysis(state: dict) -> str:
+    comparison = state.get("comparison_target") or {}
+    return comparison.get("analysis_result", "")
+
+def _summarize_inputs(state: dict) -> dict:
+    return {
+        "analysis": state.get("analysis_result", ""),
+        "trends": state.get("aggregated_trends", ""),
+        "comparison": _comparison_analysis(state),
+        "fact_check": state.get("fact_check_result", ""),
+        "prompt": _prompt_version(PATHS.get("summarize_prompt", "config/prompts/summarize_project.txt")),
+        "model": _model_id(),
+    }
+
+node_cache = NodeCache()
+
+# Cached node functions, also used by the CLI and API to pre-analyze comparison repos
+cached_analyze = cached_node("analyze", analyze_project, _analyze_inputs, ["analysis_result"], node_cache)
+cached_fact_check = cached_node("fact_check", fact_check, _fact_check_inputs, ["fact_check_result"], node_cache)
+cached_aggregate = cached_node("aggregate", aggregate_trends, _aggregate_inputs, ["aggregated_trends"], node_cache)
+cached_llm_trends = cached_node("llm_trends", extract_llm_trends, _llm_trends_inputs, ["aggregated_trends"], node_cache)
+# Run once per session over every analysis; its map and reduce steps are cached individually
+session_aggregate_query = phase("node:aggregate_query")(aggregate_query_run)
+cached_summarize = cached_node(
+    "summarize", summarize_project, _summarize_inputs, ["final_summary", "confidence_rating"], node_cache
+)
 
 class CrossPublicationInsightOrchestrator:
-    def __init__(self, user_query: str = ""):
+    def __init__(self, use_hitl: Optional[bool] = None):
+        """
+        One primary/comparison pair per run. The user's cross-repository query is not part of
+        the graph: it is answered once per session over all analyses (session_aggregate_query).
+
+        Args:
+            use_hitl (Optional[bool]): Pause for human review before summarization.
+                Falls back to the `hitl` config block when None.
+        """
+        hitl_config = CONFIG.get("hitl", {})
+        if use_hitl is None:
+            use_hitl = hitl_config.get("enabled", False)
+        self.use_hitl = use_hitl and hitl_config.get("step", "pre-summary") == "pre-summary"
+
+        # Imported here rather than at module level: langgraph takes most of a second to load
+        from langgraph.graph import StateGraph, END
+        from langgraph.checkpoint.memory import MemorySaver
+
         self.memory = MemorySaver()
         self.graph = StateGraph(dict)
 
-        self.graph.add_node("analyze", analyze_project)
-        self.graph.add_node("aggregate", aggregate_trends)
-        self.graph.add_node("compare", compare_projects)
-        self.graph.add_node("fact_check", fact_check)
-        self.graph.add_node("summarize", summarize_project)
-
+        self.graph.add_node("analyze", cached_analyze)
+        self.graph.add_node("aggregate", cached_aggregate)
+        self.graph.add_node("compare", phase("node:compare")(compare_projects))
+        self.graph.add_node("fact_check", cached_fact_check)
+        self.graph.add_node("summarize", cached_summarize)
 
-        if user_query:
-            self.graph.add_node("aggregate_query", aggregate_query_run)
+        if self.use_hitl:
+            self.graph.add_node("review", review_node)
         
         self.graph.set_entry_point("analyze")
         self.graph.add_edge("analyze", "fact_check")
         self.graph.add_edge("fact_check", "aggregate")
         self.graph.add_edge("aggregate", "compare")
 
-        if user_query:
-            self.graph.add_edge("compare", "aggregate_query")
-            self.graph.add_edge("aggregate_query", "summarize")
-        else:
-            self.graph.add_edge("compare", "summarize")
+        self.graph.add_edge("compare", "review" if self.use_hitl else "summarize")
+
+        if self.use_hitl:
+            self.graph.add_conditional_edges(
+                "review",
+                lambda state: END if state.get("hitl_action") == "skip" else "summarize",
+                {"summarize": "summarize", END: END}
+            )
         
         self.graph.add_edge("summarize", END)
         self.executor = self.graph.compile(checkpointer=self.memory)
+
+    def pending_review(self, config: dict) -> Optional[Dict[str, Any]]:
+        """Returns the review payload if the run for this thread is parked at the HITL step."""
+        snapshot = self.executor.get_state(config)
+        for task in snapshot.tasks:
+            for pending in getattr(task, "interrupts", ()):
+                return pending.value
+        return None
     
-    def run(self, input_data: dict, config: dict = None):
-        result = self.executor.invoke(input_data, config=config) if config else self.executor.invoke(input_data)
-        
-        # HITL before summarization
-        cfg = load_config()
-        hitl_enabled = cfg.get("hitl", {}).get("enabled", False)
+    def run(self, input_data: dict, config: dict, review_handler: Optional[Callable[[dict], dict]] = None) -> dict:
+        """
+        Runs the graph for one thread.
 
-        if config and "hitl_override" in config:
-            hitl_enabled = config["hitl_override"].get("enabled", hitl_enabled)
-        
-        if hitl_enabled and cfg["hitl"].get("step") == "pre-summary":
-            result = review_before_summary(result)
+        Without a review_handler a HITL run stops at the review checkpoint and returns the
+        partial state; call pending_review() to get the payload and resume() to continue.
+        With a review_handler (e.g. the CLI prompt) the decision is collected inline.
+        """
+        result = self.executor.invoke(input_data, config=config)
+
+        while review_handler is not None:
+            payload = self.pending_review(config)
+            if payload is None:
+                break
+            result = self.resume(review_handler(payload), config)
         
         return result
-        
\ No newline at end of file
+
+    def resume(self, decision: Dict[str, Any], config: dict) -> dict:
+        """Resumes a run parked at the review checkpoint with a reviewer decision."""
+        from langgraph.types import Command
+
+        return self.executor.invoke(Command(resume=decision), config=config)
@@ -0,0 +1,251 @@
+from contextlib import nullcontext
+from uuid import uuid4
+from typing import Any, Callable, Dict, List, Optional
+
+from orchestrator.orchestrator import (
+    CrossPublicationInsightOrchestrator, cached_aggregate, cached_analyze, session_aggregate_query
+)
+from tools.vector_index import index_session_results
+from utils.cancellation import CancelToken, SessionCancelled, cancellation_scope
+from utils.logger import get_logger
+from utils.profiling import SessionProfiler
+from utils.repo_utils import clone_if_remote, normalize_repo_id, resolve_commit
+
+logger = get_logger(__name__)
+
+
+class AnalysisSession:
+    """
+    One primary repo analyzed against each comparison repo, resumable across HITL pauses.
+
+    With HITL enabled and no review_handler, the session stops at the review checkpoint of
+    the current comparison with status "awaiting_review"; nothing keeps running while it
+    waits. resume() continues from that checkpoint and on through the remaining comparisons.
+    A user query is answered once, after the last comparison, over all the analyses.
+
+    cancel() or an elapsed deadline stops the session at the next node, git subprocess poll
+    or generated token; it then ends "cancelled" / "timed_out" with the completed results
+    plus whatever nodes of the interrupted comparison had finished.
+    """
+
+    _RESULT_KEYS = ("analysis_result", "fact_check_result", "final_summary")
+
+    def __init__(
+        self,
+        primary_repo: str,
+        comparison_repos: List[str],
+        user_query: str = "",
+        use_hitl: bool = False,
+        review_handler: Optional[Callable[[dict], dict]] = None,
+        deadline_seconds: Optional[float] = None,
+        profile: bool = False
+    ):
+        """
+        Args:
+            primary_repo (str): URL or local path of the primary repository.
+            comparison_repos (List[str]): URLs or local paths of the repositories to compare against.
+            user_query (str): Optional cross-repository question.
+            use_hitl (bool): Whether to pause for human review before summarization.
+            review_handler (Optional[Callable]): Collects review decisions inline (e.g. on the
+                terminal) instead of parking the session.
+            deadline_seconds (Optional[float]): Time budget for each run segment (start, and
+                each resume after a review); time spent parked for review does not count.
+            profile (bool): Sample the session's stacks while it runs; see `profiler.export()`.
+        """
+        self.primary_repo = primary_repo
+        self.comparison_repos = comparison_repos
+        self.user_query = (user_query or "").strip()
+        self.review_handler = review_handler
+        self.orchestrator = CrossPublicationInsightOrchestrator(use_hitl=use_hitl)
+
+        self.deadline_seconds = deadline_seconds
+        self.cancel_token = CancelToken()
+        self.profiler: Optional[SessionProfiler] = SessionProfiler() if profile else None
+
+        self.status = "pending"
+        self.results: List[Dict[str, Any]] = []
+        self.aggregate_query_result: Optional[str] = None
+        self.pending_review: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+        self._repo_ids: List[str] = []
+        self._commits: List[Optional[str]] = []
+        self._repo_path = ""
+        self._targets: List[Dict[str, Any]] = []
+        self._next = 0
+        self._thread_config: Optional[dict] = None
+        self._last_result: Dict[str, Any] = {}
+
+    def start(self) -> str:
+        """Resolves the repos, pre-analyzes the comparison targets and runs until done or paused."""
+        if self.status == "cancelled":
+            return self.status  # cancelled before it got to run
+        logger.info("Running Orchestrator...")
+        self.status = "processing"
+        return self._run_bounded(self._start)
+
+    def _start(self) -> str:
+        self._repo_ids = [normalize_repo_id(repo) for repo in [self.primary_repo] + self.comparison_repos]
+        local_repo_paths = [clone_if_remote(repo) for repo in [self.primary_repo] + self.comparison_repos]
+        self._repo_path = local_repo_paths[0]
+        # Recorded with each result, so exported results say exactly which snapshots were compared
+        self._commits = [resolve_commit(path) for path in local_repo_paths]
+
+        for comparison_repo_path in local_repo_paths[1:]:
+            # Cached: unchanged comparison repos skip both the analysis and trend steps
+            comparison_state = cached_analyze({"repo_path": comparison_repo_path})
+            trend_result = cached_aggregate(comparison_state)
+            self._targets.append({
+                "repo_path": comparison_repo_path,
+                "analysis_result": comparison_state["analysis_result"],
+                "aggregated_trends": trend_result["aggregated_trends"],
+                "node_timings": trend_result.get("node_timings", {})
+            })
+
+        return self._advance()
+
+    def resume(self, decision: Dict[str, Any]) -> str:
+        """Continues a session parked at the review checkpoint with a reviewer decision."""
+        if self.status != "awaiting_review":
+            raise RuntimeError(f"Session is not awaiting review (status: {self.status})")
+        self.status = "processing"
+        self.pending_review = None
+        return self._run_bounded(lambda: self._advance(decision))
+
+    def cancel(self, reason: str = "cancelled by client") -> str:
+        """
+        Stops the session. A running session stops at its next checkpoint (the status changes
+        once it has); a session parked for review holds no work and is cancelled immediately.
+        """
+        self.cancel_token.cancel(reason)
+        if self.status in ("pending", "awaiting_review"):
+            if self.status == "awaiting_review":
+                self._record_partial_result()
+            self.status = "cancelled"
+            self.error = reason
+            self.pending_review = None
+        return self.status
+
+    def _run_bounded(self, step: Callable[[], str]) -> str:
+        self.cancel_token.set_deadline(self.deadline_seconds)
+        with cancellation_scope(self.cancel_token), (self.profiler.running() if self.profiler else nullcontext()):
+            try:
+                return step()
+            except SessionCancelled as e:
+                self.status = "timed_out" if self.cancel_token.timed_out else "cancelled"
+                self.error = str(e)
+                logger.warning("Session stopped (%s) after %d completed comparisons: %s", self.status, self._next, e)
+                self._record_partial_result()
+                return self.status
+
+    def _record_partial_result(self) -> None:
+        """Keeps the outputs of the nodes that completed for the interrupted comparison."""
+        if self._thread_config is None or self._next >= len(self._targets):
+            return
+        values = self.orchestrator.executor.get_state(self._thread_config).values or {}
+        partial = {key: values[key] for key in self._RESULT_KEYS if key in values}
+        if partial:
+            self.results.append({"comparison_repo": self._targets[self._next]["repo_path"], **partial, "partial": True})
+
+    def _advance(self, decision: Optional[Dict[str, Any]] = None) -> str:
+        while self._next < len(self._targets):
+            comparison_target = self._targets[self._next]
+
+            if decision is not None:
+                result = self.orchestrator.resume(decision, self._thread_config)
+                decision = None
+            else:
+                self._thread_config = {"configurable": {"thread_id": str(uuid4())}}
+                initial_state = {
+                    "repo_path": self._repo_path,
+                    "comparison_target": comparison_target
+                }
+                result = self.orchestrator.run(initial_state, config=self._thread_config, review_handler=self.review_handler)
+
+            review = self.orchestrator.pending_review(self._thread_config)
+            if review is not None:
+                self.pending_review = {"comparison_repo": comparison_target["repo_path"], **review}
+                self.status = "awaiting_review"
+                logger.info("Session paused for review of %s", comparison_target["repo_path"])
+                return self.status
+
+            comparison_timings = {
+                f"comparison_{node}": seconds for node, seconds in comparison_target.get("node_timings", {}).items()
+            }
+            self.results.append({
+                "comparison_repo": comparison_target["repo_path"],
+                "analysis_result": result.get("analysis_result","No analysis result found"),
+                "fact_check_result": result.get("fact_check_result", "No fact check result found."),
+                "final_summary": result.get("final_summary", "No summary generated."),
+                "confidence_rating": result.get("confidence_rating"),
+                "aggregated_trends": result.get("aggregated_trends", ""),
+                "comparison_trends": comparison_target["aggregated_trends"],
+                "primary_repo_id": self._repo_ids[0],
+                "comparison_repo_id": self._repo_ids[self._next + 1],
+                "primary_commit": self._commits[0],
+                "comparison_commit": self._commits[self._next + 1],
+                "node_timings": {**comparison_timings, **result.get("node_timings", {})}
+            })
+            self._last_result = result
+            self._next += 1
+
+        if self.user_query:
+            self._answer_query()
+        self._index_results()
+        self.status = "completed"
+        return self.status
+
+    def _answer_query(self) -> None:
+        """Answers the user query over the primary analysis (as last reviewed) and every comparison's."""
+        primary_analysis = self._last_result.get("analysis_result")
+        if primary_analysis is None:
+            primary_analysis = cached_analyze({"repo_path": self._repo_path})["analysis_result"]
+        state = session_aggregate_query({
+            "repo_path": self._repo_path,
+            "analysis_result": primary_analysis,
+            "comparison_targets": self._targets,
+            "user_query": self.user_query,
+        })
+        self.aggregate_query_result = state["aggregate_query_result"]
+
+    def _index_results(self) -> None:
+        index_entries = [
+            {
+                "repo_id": repo_id,
+                "analysis": comparison_target["analysis_result"],
+                "trends": comparison_target["aggregated_trends"],
+                "metadata": {"local_path": comparison_target["repo_path"]}
+            }
+            for repo_id, comparison_target in zip(self._repo_ids[1:], self._targets)
+        ]
+        if self.results:
+            index_entries.append({
+                "repo_id": self._repo_ids[0],
+                "analysis": self._last_result.get("analysis_result", ""),
+                "trends": self._last_result.get("aggregated_trends", ""),
+                "metadata": {"local_path": self._repo_path}
+            })
+        index_session_results(index_entries)
+
+
+def run_analysis_session(
+    primary_repo: str,
+    comparison_repos: List[str],
+    user_query: str = "",
+    use_hitl: bool = False,
+    review_handler: Optional[Callable[[dict], dict]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Runs the full pipeline for one primary repo against each comparison repo to completion.
+
+    HITL review requires a review_handler here; use AnalysisSession directly to park
+    sessions for asynchronous review.
+
+    Returns:
+        List[Dict]: One result dict per comparison repo.
+    """
+    if use_hitl and review_handler is None:
+        raise ValueError("use_hitl requires a review_handler; use AnalysisSession for asynchronous review.")
+    session = AnalysisSession(primary_repo, comparison_repos, user_query, use_hitl, review_handler)
+    session.start()
+    return session.results
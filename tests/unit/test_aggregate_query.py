@@ -0,0 +1,82 @@
+import threading
+from unittest.mock import patch
+
+from agents.aggregate_query_agent import AggregateQueryAgent
+
+
+class FakeLLM:
+    """Answers map prompts with the analysis' first word and reduce prompts with a count of their parts."""
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def warm_prefix(self, prefix):
+        pass
+
+    def generate(self, prompt, **kwargs):
+        with self._lock:
+            self.prompts.append(prompt)
+        if "Project Analysis:" in prompt:
+            return prompt.split("Project Analysis:\n", 1)[1].split()[0]
+        return f"combined {prompt.count('--- ')}"
+
+
+class NoRetrieval:
+    def cache_inputs(self, repo_path):
+        return {}
+
+    def context(self, repo_path, query=None):
+        return ""
+
+
+def make_agent(tmp_path, llm, max_reduce_chars=12000):
+    with patch("agents.aggregate_query_agent.get_llm_client", return_value=llm):
+        agent = AggregateQueryAgent()
+    agent.cache.cache_dir = tmp_path
+    agent.cache.enabled = True
+    agent.max_reduce_chars = max_reduce_chars
+    return agent
+
+
+@patch("agents.aggregate_query_agent.get_repo_retriever", return_value=NoRetrieval())
+def test_maps_every_analysis_then_reduces_once(_, tmp_path):
+    llm = FakeLLM()
+    agent = make_agent(tmp_path, llm)
+    answer = agent.run("Which use LangGraph?", ["alpha analysis", "beta analysis", "gamma analysis"])
+
+    assert answer == "combined 3"
+    assert len(llm.prompts) == 4
+    reduce_prompt = llm.prompts[-1]
+    assert all(word in reduce_prompt for word in ("alpha", "beta", "gamma"))
+
+
+@patch("agents.aggregate_query_agent.get_repo_retriever", return_value=NoRetrieval())
+def test_map_steps_are_cached_by_analysis_and_query(_, tmp_path):
+    llm = FakeLLM()
+    agent = make_agent(tmp_path, llm)
+    agent.run("Which use LangGraph?", ["alpha analysis", "beta analysis"])
+
+    llm.prompts.clear()
+    agent.run("Which use LangGraph?", ["alpha analysis", "beta analysis", "delta analysis"])
+    # Only the new analysis is mapped; the reduce input changed so it runs again
+    assert sum("Project Analysis:" in prompt for prompt in llm.prompts) == 1
+    assert len(llm.prompts) == 2
+
+    llm.prompts.clear()
+    agent.run("Which use LangGraph?", ["alpha analysis", "beta analysis", "delta analysis"])
+    assert llm.prompts == []
+
+
+@patch("agents.aggregate_query_agent.get_repo_retriever", return_value=NoRetrieval())
+def test_reduces_hierarchically_when_findings_do_not_fit(_, tmp_path):
+    llm = FakeLLM()
+    agent = make_agent(tmp_path, llm, max_reduce_chars=0)
+    notes = [f"note{i} " + "x" * 1500 for i in range(5)]
+
+    groups = agent._reduce_groups("q", notes)
+    assert len(groups) > 1 and all(len(group) >= 2 for group in groups[:-1])
+
+    answer = agent.reduce("q", notes)
+    assert answer.startswith("combined")
+    assert any("--- Group 1 ---" in prompt for prompt in llm.prompts)
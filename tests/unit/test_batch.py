@@ -0,0 +1,46 @@
+import json
+from unittest.mock import patch
+
+from orchestrator import batch
+
+
+def _fake_run_job(job):
+    if "broken" in job["primary_repo"]:
+        return {"job_id": job["job_id"], "status": "failed", "error": "boom"}
+    return {"job_id": job["job_id"], "status": "ok", "results": []}
+
+
+def test_load_manifest_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "jobs.jsonl"
+    jsonl.write_text(json.dumps({"primary_repo": "a", "comparison_repos": ["b", "c"]}) + "\n")
+    csv_file = tmp_path / "jobs.csv"
+    csv_file.write_text("id,primary_repo,comparison_repos,user_query\njob-1,a,b;c,What?\n")
+
+    from_jsonl = batch.load_manifest(str(jsonl))[0]
+    from_csv = batch.load_manifest(str(csv_file))[0]
+
+    assert from_jsonl["comparison_repos"] == from_csv["comparison_repos"] == ["b", "c"]
+    assert from_csv["job_id"] == "job-1"
+    assert from_csv["user_query"] == "What?"
+
+
+@patch("orchestrator.batch._init_worker", lambda: None)
+@patch("orchestrator.batch._run_job", side_effect=_fake_run_job)
+def test_run_batch_streams_and_resumes(mock_run_job, tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text("\n".join(json.dumps(job) for job in [
+        {"id": "ok-1", "primary_repo": "a", "comparison_repos": ["b"]},
+        {"id": "bad-1", "primary_repo": "broken", "comparison_repos": ["b"]},
+    ]))
+    output = tmp_path / "out.jsonl"
+
+    summary = batch.run_batch(str(manifest), str(output), workers=2, executor="thread")
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+    assert len(output.read_text().splitlines()) == 2
+    assert (tmp_path / "out.summary.json").exists()
+
+    # Only the failed job runs again on resume
+    mock_run_job.reset_mock()
+    summary = batch.run_batch(str(manifest), str(output), workers=2, executor="thread")
+    assert summary["skipped"] == 1
+    assert [c.args[0]["job_id"] for c in mock_run_job.call_args_list] == ["bad-1"]
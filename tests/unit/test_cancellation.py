@@ -0,0 +1,87 @@
+import sys
+import time
+
+import pytest
+
+from utils.cancellation import (
+    CancelToken, DeadlineExceeded, SessionCancelled, cancellation_scope, check_cancelled, remaining_time, run_cancellable
+)
+
+
+def test_deadline_fires_and_reports_timeout():
+    token = CancelToken(deadline_seconds=0.05)
+    assert not token.cancelled
+    assert token.wait(5) is True  # wakes at the deadline, not after 5s
+    assert token.timed_out
+    with pytest.raises(DeadlineExceeded):
+        token.check()
+
+
+def test_scope_makes_token_current():
+    token = CancelToken(deadline_seconds=10)
+    check_cancelled()  # no scope: no-op
+    assert remaining_time(3) == 3
+
+    with cancellation_scope(token):
+        assert remaining_time(3) == 3
+        assert remaining_time() <= 10
+        token.cancel("stop")
+        with pytest.raises(SessionCancelled, match="stop"):
+            check_cancelled()
+    check_cancelled()
+
+
+def test_run_cancellable_kills_child_on_cancel():
+    token = CancelToken(deadline_seconds=0.3)
+    started = time.monotonic()
+    with cancellation_scope(token), pytest.raises(DeadlineExceeded):
+        run_cancellable([sys.executable, "-c", "import time; time.sleep(30)"])
+    assert time.monotonic() - started < 5
+
+
+def test_run_cancellable_returns_output_and_raises_on_failure():
+    import subprocess
+
+    result = run_cancellable([sys.executable, "-c", "print('ok')"], stdout=subprocess.PIPE, text=True)
+    assert result.stdout.strip() == "ok"
+    with pytest.raises(subprocess.CalledProcessError):
+        run_cancellable([sys.executable, "-c", "raise SystemExit(3)"])
+
+
+def test_child_token_fires_with_its_parent_or_its_own_deadline():
+    parent = CancelToken(deadline_seconds=10)
+    child = CancelToken(deadline_seconds=0.05, parent=parent)
+    assert 0 < child.remaining() <= 0.05
+    time.sleep(0.06)
+    assert child.cancelled and child.timed_out and not parent.cancelled
+
+    child = CancelToken(deadline_seconds=10, parent=parent)
+    parent.cancel("user")
+    assert child.cancelled and child.reason == "user" and not child.timed_out
+
+
+def test_child_wait_wakes_when_parent_is_cancelled():
+    import threading
+
+    parent = CancelToken()
+    child = CancelToken(deadline_seconds=30, parent=parent)
+    threading.Timer(0.05, parent.cancel, args=("user",)).start()
+    started = time.monotonic()
+    assert child.wait(10) is True
+    assert time.monotonic() - started < 2 and child.reason == "user"
+
+
+def test_resolve_commit_is_cancelled_with_the_session(tmp_path):
+    import subprocess
+
+    from utils.repo_utils import resolve_commit
+
+    git = ["git", "-C", str(tmp_path), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    subprocess.run(git + ["commit", "-q", "--allow-empty", "-m", "init"], check=True)
+    assert resolve_commit(str(tmp_path))
+
+    session = CancelToken()
+    session.cancel("user")
+    with cancellation_scope(session):
+        assert resolve_commit(str(tmp_path)) is None
@@ -0,0 +1,48 @@
+from tools.claim_verifier import CONTRADICTED, UNRESOLVED, VERIFIED, verify_claims
+
+SUMMARY = {
+    "languages_used": {"Python": 12, "Shell": 2},
+    "license_excerpt": "MIT License\n\nCopyright (c) 2024",
+    "dependencies": {"python": ["langchain", "faiss-cpu", "fastapi"]},
+    "keywords": ["retrieval", "agents"],
+    "readme_excerpt": "An agent framework built with LangGraph.",
+}
+
+
+def statuses(report):
+    return {(claim.kind, claim.value): claim.status for claim in report.claims}
+
+
+def test_all_claims_verified_skips_llm():
+    analysis = "A Python project using LangChain, LangGraph and FAISS behind a FastAPI server. MIT licensed."
+    report = verify_claims(analysis, SUMMARY)
+
+    assert statuses(report) == {
+        ("language", "Python"): VERIFIED,
+        ("license", "MIT"): VERIFIED,
+        ("framework", "LangChain"): VERIFIED,
+        ("framework", "LangGraph"): VERIFIED,
+        ("framework", "FAISS"): VERIFIED,
+        ("framework", "FastAPI"): VERIFIED,
+    }
+    assert not report.needs_llm
+    assert "All 6 checkable claims verified" in report.format()
+
+
+def test_contradicted_and_unresolved_claims_are_escalated():
+    analysis = "Written in Rust with some C code, released under the Apache 2.0 license; it fine-tunes models with PyTorch."
+    report = verify_claims(analysis, SUMMARY)
+
+    assert statuses(report) == {
+        ("language", "Rust"): CONTRADICTED,
+        ("language", "C"): CONTRADICTED,
+        ("license", "Apache"): CONTRADICTED,
+        ("framework", "PyTorch"): UNRESOLVED,
+    }
+    assert report.needs_llm and len(report.escalated) == 4
+
+
+def test_nothing_checkable_needs_full_review():
+    report = verify_claims("The code is well organised. Let's go through it; section C covers tests.", SUMMARY)
+    assert report.claims == []
+    assert report.needs_llm
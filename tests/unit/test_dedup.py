@@ -0,0 +1,50 @@
+import subprocess
+
+from api.dedup import RequestDeduplicator, request_fingerprint
+from utils.repo_utils import resolve_commit
+
+
+def test_attach_to_inflight_and_reuse_completed():
+    dedup = RequestDeduplicator(ttl_seconds=60)
+    assert dedup.attach_or_register("fp", "s1") is None
+    assert dedup.attach_or_register("fp", "s2") == "s1"
+    assert dedup.detach("s1") == 1
+
+    dedup.finished("s1", "completed")
+    assert dedup.attach_or_register("fp", "s3") == "s1"
+
+
+def test_failed_or_expired_jobs_are_forgotten():
+    dedup = RequestDeduplicator(ttl_seconds=60)
+    dedup.attach_or_register("fp", "s1")
+    dedup.finished("s1", "cancelled")
+    assert dedup.attach_or_register("fp", "s2") is None
+
+    dedup = RequestDeduplicator(ttl_seconds=0)
+    dedup.attach_or_register("fp", "s1")
+    dedup.finished("s1", "completed")
+    assert dedup.attach_or_register("fp", "s2") is None
+
+
+def test_fingerprint_normalizes_inputs_and_tracks_commits(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git = ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    (repo / "a.txt").write_text("one")
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-qm", "one"], check=True)
+
+    first = resolve_commit(str(repo))
+    assert first and len(first) == 40
+    assert resolve_commit(str(tmp_path / "missing")) is None
+
+    url = "https://github.com/org/project"
+    base = request_fingerprint(str(repo), [url], "Which uses  FAISS?", resolve_commits=False)
+    assert base == request_fingerprint(str(repo) + "/", [url + ".git"], " Which uses FAISS? ", resolve_commits=False)
+    assert base != request_fingerprint(str(repo), [url], "Another question", resolve_commits=False)
+
+    before = request_fingerprint(str(repo), [], "")
+    (repo / "a.txt").write_text("two")
+    subprocess.run(git + ["commit", "-qam", "two"], check=True)
+    assert request_fingerprint(str(repo), [], "") != before
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from tools import embedding_backends
+from tools.embedding_backends import compare_backends, load_embedding_backend, mean_pool, normalize_rows
+
+
+class FixedBackend:
+    def __init__(self, noise: float = 0.0):
+        self.noise = noise
+
+    def encode(self, texts):
+        rows = np.array([[len(text), text.count("a") + 1, 1.0 + self.noise] for text in texts], dtype=np.float32)
+        return normalize_rows(rows)
+
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 1.0], [3.0, 3.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    assert np.allclose(mean_pool(hidden, mask), [[2.0, 2.0]])
+
+
+def test_compare_backends_reports_agreement():
+    report = compare_backends(FixedBackend(), FixedBackend(), ["a", "banana", "text"], repeats=1)
+    assert report["texts"] == 3
+    assert report["min_cosine"] == pytest.approx(1.0)
+
+    drifted = compare_backends(FixedBackend(), FixedBackend(noise=5.0), ["a", "banana"], repeats=1)
+    assert drifted["min_cosine"] < 0.99
+
+
+def test_missing_onnx_export_falls_back_to_torch(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_backends, "TorchBackend", lambda model_name, batch_size: ("torch", model_name))
+    backend = load_embedding_backend({"model_name": "m", "backend": "onnx", "onnx": {"model_dir": str(tmp_path)}})
+    assert backend == ("torch", "m")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_embedding_backend({"model_name": "m", "backend": "tensorrt"})
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Loaded on first use only: none of these may be imported by starting the CLI or the API
+DEFERRED_MODULES = {
+    "torch", "sentence_transformers", "transformers", "onnxruntime", "langgraph",
+    "llama_cpp", "bs4", "httpx", "dotenv",
+}
+
+# Cumulative cold-start import time per entry point, in milliseconds. Generous on purpose:
+# eagerly importing torch or langgraph again costs well over a second.
+IMPORT_BUDGET_MS = {
+    "main": 400,
+    "api.server": 1500,
+}
+
+
+def import_profile(module: str) -> dict:
+    """Runs `python -X importtime -c "import <module>"` and returns {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET_MS))
+def test_cold_start_stays_within_budget(module):
+    profile = import_profile(module)
+
+    eager = sorted(name for name in profile if name.split(".")[0] in DEFERRED_MODULES)
+    assert not eager, f"{module} imports deferred dependencies at startup: {eager}"
+    assert profile[module] / 1000 <= IMPORT_BUDGET_MS[module], (
+        f"Importing {module} took {profile[module] / 1000:.0f} ms (budget {IMPORT_BUDGET_MS[module]} ms)"
+    )
+
+
+def test_cli_help_does_not_load_the_pipeline():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", "--help"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "usage: main.py" in result.stdout
+    assert " orchestrator.orchestrator" not in result.stderr
+
+
+@pytest.mark.parametrize("command", ["similar", "batch", "export"])
+def test_subcommand_help_does_not_load_its_handler(command):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", command, "--help"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert f"usage: main.py {command}" in result.stdout
+    for module in ("tools.vector_index", "orchestrator.batch", "utils.result_export"):
+        assert f" {module}\n" not in result.stderr
@@ -0,0 +1,22 @@
+from tools.lexical_tagger import AhoCorasick, LexicalTagger
+
+
+def test_matcher_finds_overlapping_patterns():
+    matcher = AhoCorasick({"he": "HE", "she": "SHE", "his": "HIS", "hers": "HERS"})
+    matches = sorted(matcher.finditer("ushers"))
+    assert matches == [(1, 4, "SHE"), (2, 4, "HE"), (2, 6, "HERS")]
+
+
+def test_tagger_is_case_and_hyphen_insensitive():
+    tagger = LexicalTagger(["LangChain", "RAG", "Retrieval", "Fine-tuning"], {
+        "RAG": ["retrieval augmented generation"],
+        "Fine-tuning": ["fine tune"],
+    })
+    text = "A Retrieval-Augmented Generation demo built on LANGCHAIN; we fine_tune later."
+    assert tagger.tag(text) == ["RAG", "LangChain", "Fine-tuning"]
+
+
+def test_tagger_matches_whole_words_only():
+    tagger = LexicalTagger(["RAG", "GPT"])
+    assert tagger.tag("Storage and leverage with GPT-4o") == ["GPT"]
+    assert tagger.tag("nothing relevant here") == []
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm.client import LLMRequestError, OpenAICompatibleClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint driven by the server's script."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(body)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay)
+
+        if status != 200:
+            self.send_response(status)
+            self.end_headers()
+            return
+        content = json.dumps({"choices": [{"message": {"content": f" echo: {body['messages'][0]['content']} "}}]})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests, server.statuses, server.delay = [], [], 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def client(stub_server):
+    client = OpenAICompatibleClient(model_name="stub", base_url=f"http://127.0.0.1:{stub_server.server_port}/v1")
+    client.backoff_base = 0.01
+    yield client
+    client.close()
+
+
+def test_generate_returns_stripped_content(client, stub_server):
+    assert client.generate("hello") == "echo: hello"
+    assert stub_server.requests[0]["model"] == "stub"
+
+
+def test_retries_on_429_and_5xx(client, stub_server):
+    stub_server.statuses = [429, 503]
+    assert client.generate("retry me") == "echo: retry me"
+    assert len(stub_server.requests) == 3
+
+
+def test_gives_up_after_max_retries(client, stub_server):
+    client.max_retries = 1
+    stub_server.statuses = [500, 500]
+    with pytest.raises(LLMRequestError):
+        client.generate("fail")
+    assert len(stub_server.requests) == 2
+
+
+def test_identical_concurrent_requests_are_coalesced(client, stub_server):
+    stub_server.delay = 0.3
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: client.generate("same prompt"), range(4)))
+    assert results == ["echo: same prompt"] * 4
+    assert len(stub_server.requests) == 1
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from llm.client import BaseLLMClient, LLMRequestError
+from llm.router import RoutedLLMClient
+from utils.cancellation import current_token
+
+
+class FakeClient(BaseLLMClient):
+    def __init__(self, name, fail=False, delay=0.0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.prompts = []
+        self.warmed = []
+        self.running = 0
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        # Like the real clients, stops early once the current token fires
+        token = current_token()
+        self.running += 1
+        try:
+            if token is None:
+                time.sleep(self.delay)
+            elif token.wait(self.delay):
+                token.check()
+        finally:
+            self.running -= 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name}: {prompt}"
+
+    def warm_prefix(self, prefix):
+        self.warmed.append(prefix)
+
+
+ROUTING = {
+    "order": ["small", "large"],
+    "tiers": {
+        "small": {"type": "fake", "model_name": "small", "max_prompt_chars": 20},
+        "large": {"type": "fake", "model_name": "large"},
+    },
+    "nodes": {"fact_check": "small", "summarize": "large"},
+}
+
+
+def make_router(node, clients, routing=ROUTING):
+    return RoutedLLMClient(node, routing, lambda llm_type, model_name: clients[model_name])
+
+
+def test_routes_node_to_its_tier():
+    clients = {"small": FakeClient("small"), "large": FakeClient("large")}
+
+    assert make_router("fact_check", clients).generate("short") == "small: short"
+    assert make_router("summarize", clients).generate("short") == "large: short"
+    assert clients["small"].prompts == ["short"]
+    assert clients["large"].prompts == ["short"]
+
+
+def test_long_prompts_skip_small_tier():
+    clients = {"small": FakeClient("small"), "large": FakeClient("large")}
+
+    router = make_router("fact_check", clients)
+    assert router.generate("x" * 50).startswith("large:")
+    assert clients["small"].prompts == []
+
+
+def test_falls_back_on_failure_and_timeout():
+    clients = {"small": FakeClient("small", fail=True), "large": FakeClient("large")}
+    assert make_router("fact_check", clients).generate("hi") == "large: hi"
+
+    routing = {**ROUTING, "tiers": {**ROUTING["tiers"], "small": {**ROUTING["tiers"]["small"], "timeout_seconds": 0.05}}}
+    clients = {"small": FakeClient("small", delay=0.5), "large": FakeClient("large")}
+    assert make_router("fact_check", clients, routing).generate("hi") == "large: hi"
+
+
+def test_timed_out_calls_stop_instead_of_piling_up():
+    routing = {**ROUTING, "tiers": {**ROUTING["tiers"], "small": {**ROUTING["tiers"]["small"], "timeout_seconds": 0.05}}}
+    slow = FakeClient("small", delay=5)
+    clients = {"small": slow, "large": FakeClient("large")}
+    router = make_router("fact_check", clients, routing)
+
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(router.generate("hi"))) for _ in range(12)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert answers == ["large: hi"] * 12
+    assert time.perf_counter() - started < 2
+    assert slow.running == 0
+
+    # Nothing is left queued or holding the tier: a fast call is answered by it again
+    slow.delay = 0
+    assert router.generate("hi") == "small: hi"
+
+
+def test_raises_when_every_tier_fails():
+    clients = {"small": FakeClient("small", fail=True), "large": FakeClient("large", fail=True)}
+    with pytest.raises(LLMRequestError):
+        make_router("fact_check", clients).generate("hi")
+
+
+def test_unknown_tier_is_rejected_and_warm_prefix_targets_start_tier():
+    clients = {"small": FakeClient("small"), "large": FakeClient("large")}
+    with pytest.raises(ValueError):
+        make_router("fact_check", clients, {**ROUTING, "nodes": {"fact_check": "medium"}})
+
+    make_router("fact_check", clients).warm_prefix("You are")
+    assert clients["small"].warmed == ["You are"]
+    assert clients["large"].warmed == []
@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+SCRIPT = textwrap.dedent("""
+    import logging, sys
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+    import utils.logger as log_setup
+
+    log_setup._ensure_handlers({"log_file": sys.argv[1], "async": True, "format": "json"})
+    logger = logging.getLogger("test_logger")
+    logger.setLevel(logging.INFO)
+    for handler in log_setup._main_handlers:
+        logger.addHandler(handler)
+
+    def work():
+        logger.warning("from worker")
+        log_setup.shutdown_logging()
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("fork")) as pool:
+        pool.submit(work).result()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("from parent")
+    log_setup.shutdown_logging()
+""")
+
+
+def test_forked_workers_log_and_json_keeps_tracebacks(tmp_path):
+    log_file = tmp_path / "project.log"
+    subprocess.run([sys.executable, "-c", SCRIPT, str(log_file)], cwd=PROJECT_ROOT, check=True, capture_output=True)
+
+    records = {record["message"]: record for record in map(json.loads, log_file.read_text().splitlines())}
+    assert "from worker" in records
+    assert "ValueError: boom" in records["from parent"]["exc_info"]
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from utils.model_manager import MB, ModelManager
+
+
+class Loader:
+    def __init__(self):
+        self.loaded, self.unloaded = [], []
+
+    def load(self, name):
+        def loader():
+            self.loaded.append(name)
+            return f"model-{name}"
+        return loader
+
+    def unload(self, model):
+        self.unloaded.append(model)
+
+
+def test_loads_once_and_reports():
+    manager, loader = ModelManager(budget_mb=0), Loader()
+    for _ in range(3):
+        with manager.use("a", loader.load("a"), 10 * MB, kind="llm") as model:
+            assert model == "model-a"
+    assert loader.loaded == ["a"]
+
+    report = manager.report()
+    assert report["budget_mb"] is None
+    assert report["models"][0]["key"] == "a"
+    assert report["models"][0]["estimated_mb"] == 10
+    assert report["models"][0]["in_use"] == 0
+
+
+def test_evicts_least_recently_used_idle_model():
+    manager, loader = ModelManager(budget_mb=25), Loader()
+    for name in ("a", "b"):
+        with manager.use(name, loader.load(name), 10 * MB, unloader=loader.unload):
+            pass
+    with manager.use("a", loader.load("a"), 10 * MB, unloader=loader.unload):
+        pass  # a is now the most recently used
+
+    with manager.use("c", loader.load("c"), 10 * MB, unloader=loader.unload):
+        pass
+    assert loader.unloaded == ["model-b"]
+    assert [model["key"] for model in manager.report()["models"]] == ["c", "a"]
+    assert manager.evictions == 1
+
+
+def test_models_in_use_are_never_evicted():
+    manager, loader = ModelManager(budget_mb=15, wait_seconds=0.2), Loader()
+    with manager.use("a", loader.load("a"), 10 * MB, unloader=loader.unload):
+        # No room and nothing idle: loads over budget after waiting instead of unloading "a"
+        with manager.use("b", loader.load("b"), 10 * MB, unloader=loader.unload) as model:
+            assert model == "model-b"
+    assert loader.unloaded == []
+
+
+def test_waiting_load_proceeds_once_a_model_is_released():
+    manager, loader = ModelManager(budget_mb=15, wait_seconds=5), Loader()
+    released = threading.Event()
+
+    def hold_a():
+        with manager.use("a", loader.load("a"), 10 * MB, unloader=loader.unload):
+            released.wait(2)
+
+    holder = threading.Thread(target=hold_a)
+    holder.start()
+    while not loader.loaded:
+        pass
+    threading.Timer(0.1, released.set).start()
+    with manager.use("b", loader.load("b"), 10 * MB, unloader=loader.unload):
+        pass
+    holder.join()
+    assert loader.unloaded == ["model-a"]
+
+
+def test_failed_load_is_not_kept():
+    manager = ModelManager(budget_mb=0)
+
+    def broken():
+        raise RuntimeError("no such model")
+
+    with pytest.raises(RuntimeError):
+        with manager.use("x", broken, MB):
+            pass
+    assert manager.report()["models"] == []
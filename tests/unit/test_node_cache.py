@@ -0,0 +1,33 @@
+from utils.node_cache import NodeCache, cached_node
+
+
+def test_cached_node_skips_when_inputs_unchanged(tmp_path):
+    cache = NodeCache(cache_dir=str(tmp_path))
+    cache.enabled = True
+    calls = []
+
+    def analyze(state):
+        calls.append(state["repo_summary"])
+        return {**state, "analysis_result": f"analysis of {state['repo_summary']}"}
+
+    node = cached_node("analyze", analyze, lambda s: {"repo_summary": s["repo_summary"]}, ["analysis_result"], cache)
+
+    first = node({"repo_summary": "A"})
+    second = node({"repo_summary": "A", "other": 1})
+    third = node({"repo_summary": "B"})
+
+    assert calls == ["A", "B"]
+    assert second["analysis_result"] == first["analysis_result"]
+    assert second["other"] == 1
+    assert third["analysis_result"] == "analysis of B"
+
+
+def test_cached_node_passthrough_when_disabled(tmp_path):
+    cache = NodeCache(cache_dir=str(tmp_path))
+    cache.enabled = False
+    calls = []
+
+    node = cached_node("n", lambda s: calls.append(1) or s, lambda s: {}, [], cache)
+    node({})
+    node({})
+    assert len(calls) == 2
@@ -0,0 +1,55 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.profiling import SessionProfiler, phase, profile_summary, to_collapsed, to_speedscope
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@phase("llm")
+def fake_llm_call():
+    busy(0.05)
+
+
+def test_phases_are_attributed_across_threads():
+    profiler = SessionProfiler(interval_ms=1)
+    with profiler.running():
+        with phase("node:analyze"):
+            busy(0.05)
+        # Like the model router: work handed to a pool with the session's context copied
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, fake_llm_call).result()
+
+    profile = profiler.export()
+    assert profile["samples"] > 0
+    assert profile["phases"]["node:analyze"] > 0.02
+    assert profile["phases"]["llm"] > 0.02
+    assert any(stack[0] == "[llm]" and "fake_llm_call" in " ".join(stack) for stack, _ in profile["stacks"])
+
+
+def test_phase_is_a_no_op_without_a_profiler():
+    profiler = SessionProfiler(interval_ms=1)
+    with phase("repo_parse"):
+        busy(0.01)
+    assert profiler.export()["stacks"] == []
+
+
+def test_export_formats():
+    profile = {
+        "interval_ms": 5, "duration_seconds": 0.3, "samples": 60, "phases": {"llm": 0.2},
+        "stacks": [[["[llm]", "generate (client.py:90)"], 0.2], [["run (main.py:1)"], 0.1]],
+    }
+    assert to_collapsed(profile) == "[llm];generate (client.py:90) 200000\nrun (main.py:1) 100000\n"
+
+    speedscope = to_speedscope(profile, name="s")
+    frames = speedscope["shared"]["frames"]
+    assert frames[1] == {"name": "generate", "file": "client.py", "line": 90}
+    assert speedscope["profiles"][0]["samples"] == [[0, 1], [2]]
+    assert speedscope["profiles"][0]["weights"] == [0.2, 0.1]
+
+    assert profile_summary(profile)["top_self"][0] == ["generate (client.py:90)", 0.2]
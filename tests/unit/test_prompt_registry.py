@@ -0,0 +1,31 @@
+import os
+import time
+
+from utils.prompt_registry import PromptRegistry
+
+
+def test_registry_renders_and_hashes(tmp_path):
+    (tmp_path / "greet.txt").write_text("You are a helper.\nSay hi to {{ name }}.")
+    registry = PromptRegistry(prompt_dir=str(tmp_path))
+
+    template = registry.get("greet")
+    assert registry.get(str(tmp_path / "greet.txt")) is template
+    assert template.render(name="Ada") == "You are a helper.\nSay hi to Ada."
+    assert template.prefix == "You are a helper.\nSay hi to "
+    assert registry.version("greet") == template.version
+    assert registry.version("missing") == "missing"
+
+
+def test_registry_reloads_changed_file(tmp_path):
+    path = tmp_path / "greet.txt"
+    path.write_text("Hello {{ name }}")
+    registry = PromptRegistry(prompt_dir=str(tmp_path))
+    registry.reload_interval = 0
+    old_version = registry.version("greet")
+
+    path.write_text("Goodbye {{ name }}")
+    mtime = time.time() + 5
+    os.utime(path, (mtime, mtime))
+
+    assert registry.render("greet", name="Ada") == "Goodbye Ada"
+    assert registry.version("greet") != old_version
@@ -0,0 +1,111 @@
+import json
+
+from tools.repo_parser import condense_repo_summary, parse_manifest, parse_repository
+
+
+def make_repo(root):
+    (root / "pkg").mkdir(parents=True)
+    (root / "web").mkdir()
+    (root / ".git").mkdir()
+    (root / "README.md").write_text("# Demo\n\nA retrieval service built on FAISS embeddings.\n")
+    (root / "LICENSE").write_text("MIT License")
+    (root / "pkg" / "app.py").write_text("import faiss\n\nprint('hi')\n")
+    (root / "pkg" / "util.py").write_text("x = 1")
+    (root / "analysis.ipynb").write_text(json.dumps({"cells": []}))
+    (root / "requirements.txt").write_text("faiss-cpu==1.8.0\n# comment\nlangchain>=0.3 ; python_version>'3.8'\n-r extra.txt\n")
+    (root / "pyproject.toml").write_text('[project]\ndependencies = ["numpy>=1.26", "httpx[http2]"]\n')
+    (root / "web" / "package.json").write_text(json.dumps({"dependencies": {"react": "^18"}, "devDependencies": {"vite": "5"}}))
+    (root / ".git" / "ignored.py").write_text("print('not part of the repo')\n" * 50)
+    return root
+
+
+def test_single_pass_collects_languages_notebooks_and_dependencies(tmp_path):
+    summary = parse_repository(str(make_repo(tmp_path / "demo")))
+
+    assert summary["repository_name"] == "demo"
+    assert summary["language_stats"]["Python"] == {"files": 2, "bytes": 31, "loc": 4}
+    assert summary["notebook_count"] == 1
+    assert summary["file_types"][".py"] == 2  # .git is skipped
+    assert summary["dependencies"]["python"] == ["faiss-cpu", "httpx", "langchain", "numpy"]
+    assert summary["dependencies"]["javascript"] == ["react", "vite"]
+    assert summary["manifests"][0] in ("pyproject.toml", "requirements.txt")
+    assert summary["license_excerpt"].startswith("MIT")
+
+    condensed = condense_repo_summary(summary)
+    assert "Dependencies: faiss-cpu, httpx, langchain, numpy, react, vite" in condensed
+    assert "Notebooks: 1" in condensed
+
+
+def test_parse_manifest_formats():
+    cargo = '[dependencies]\nserde = "1"\n[dev-dependencies]\ntokio = { version = "1" }\n'
+    assert parse_manifest("Cargo.toml", cargo) == ["serde", "tokio"]
+
+    gomod = "module x\n\nrequire github.com/a/b v1.0.0\nrequire (\n\tgithub.com/c/d v0.1.0\n\t// note\n)\n"
+    assert parse_manifest("go.mod", gomod) == ["github.com/a/b", "github.com/c/d"]
+
+    assert parse_manifest("package.json", "{not json") == []
+
+
+def test_bare_repository_yields_same_summary_as_checkout(tmp_path):
+    import subprocess
+
+    repo = make_repo(tmp_path / "demo")
+    git = ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-qm", "init"], check=True)
+    bare = tmp_path / "clones" / "demo.git"
+    subprocess.run(["git", "clone", "-q", "--bare", "--depth", "1", f"file://{repo}", str(bare)], check=True)
+
+    assert not (bare / "README.md").exists()
+    from_objects, from_checkout = parse_repository(str(bare)), parse_repository(str(repo))
+    # Lines are not counted in the object store (git_objects_count_lines: false)
+    assert from_objects["language_stats"]["Python"] == {"files": 2, "bytes": 31}
+    for stats in from_checkout["language_stats"].values():
+        stats.pop("loc", None)
+    assert from_objects == from_checkout
+
+
+def test_git_object_reader_reads_only_the_requested_prefix(tmp_path, monkeypatch):
+    import subprocess
+
+    import tools.git_object_reader as git_object_reader
+    from tools.git_object_reader import GitObjectReader
+
+    repo = tmp_path / "big"
+    repo.mkdir()
+    (repo / "big.bin").write_bytes(b"a" * 5000)
+    (repo / "medium.bin").write_bytes(b"b" * 300)
+    (repo / "small.txt").write_text("tail\n")
+    git = ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-qm", "init"], check=True)
+    monkeypatch.setattr(git_object_reader, "MAX_DRAIN_BYTES", 1000)
+
+    with GitObjectReader(str(repo / ".git")) as reader:
+        blobs = {path: sha for path, _, sha in reader.list_files()}
+        assert reader.read(blobs["medium.bin"], 10) == b"b" * 10  # tail drained
+        assert reader.read(blobs["big.bin"], 10) == b"a" * 10  # batch process restarted
+        assert reader._batch is None
+        assert reader.read(blobs["small.txt"], 100) == b"tail\n"
+        assert reader.read(blobs["medium.bin"], 1000) == b"b" * 300
+
+
+def test_unchanged_working_tree_is_not_read_again(tmp_path, monkeypatch):
+    import tools.repo_parser as repo_parser
+
+    repo = make_repo(tmp_path / "demo")
+    reads = []
+    read_local_file = repo_parser.read_local_file
+    monkeypatch.setattr(repo_parser, "read_local_file", lambda key, n: reads.append(key) or read_local_file(key, n))
+
+    first = parse_repository(str(repo))
+    assert reads
+    reads.clear()
+    assert parse_repository(str(repo)) == first
+    assert reads == []
+
+    (repo / "pkg" / "util.py").write_text("x = 1\ny = 2\n")
+    assert parse_repository(str(repo))["language_stats"]["Python"]["loc"] == 5
+    assert reads
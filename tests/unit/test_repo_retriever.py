@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from tools.repo_retriever import RepoRetriever, chunk_text, format_chunks
+
+
+class FakeDetector:
+    """Embeds text as a normalised bag of its first letters, counting calls."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            vec = np.zeros(26, dtype=np.float32)
+            for word in text.lower().split():
+                if word[0].isalpha() and word[0].isascii():
+                    vec[ord(word[0]) - ord("a")] += 1
+            rows.append(vec / (np.linalg.norm(vec) or 1.0))
+        self.encoded += len(rows)
+        rows = np.stack(rows)
+        return rows[0] if single else rows
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    (root / "src").mkdir(parents=True)
+    (root / "node_modules").mkdir()
+    (root / "README.md").write_text("# Demo\nA zebra zoo zone tracker.\n")
+    (root / "src" / "main.py").write_text("def apple():\n    return 'apple avocado apricot'\n")
+    (root / "src" / "util.py").write_text("banana = 1\n")
+    (root / "package.json").write_text('{"dependencies": {}}')
+    (root / "node_modules" / "lib.js").write_text("zebra")
+    return root
+
+
+def test_chunk_text_respects_size_and_overlap():
+    text = "\n".join(f"line {i:02d}" for i in range(20))
+    chunks = chunk_text(text, chunk_chars=30, overlap_chars=8)
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    assert chunks[1].startswith(chunks[0].splitlines()[-1])
+    assert chunk_text("x" * 70, chunk_chars=30) == ["x" * 30, "x" * 30, "x" * 10]
+
+
+def test_selects_docs_and_sources_within_limits(repo, tmp_path):
+    retriever = RepoRetriever(detector=FakeDetector(), index_dir=str(tmp_path / "index"))
+    retriever.max_files = 2
+    retriever.max_file_chars = 10
+    files = retriever.read_files(str(repo))
+    assert [path for path, _ in files] == ["README.md", "src/main.py"]
+    assert all(len(text) <= 10 for _, text in files)
+
+
+def test_retrieves_relevant_chunks_and_reuses_the_index(repo, tmp_path):
+    detector = FakeDetector()
+    retriever = RepoRetriever(detector=detector, index_dir=str(tmp_path / "index"))
+    hits = retriever.retrieve(str(repo), "apple avocado", k=1)
+    assert hits[0]["path"] == "src/main.py"
+    indexed = detector.encoded
+
+    # A fresh retriever finds the stored index; only the query is embedded
+    detector = FakeDetector()
+    retriever = RepoRetriever(detector=detector, index_dir=str(tmp_path / "index"))
+    assert retriever.retrieve(str(repo), "zebra zoo", k=1)[0]["path"] == "README.md"
+    assert detector.encoded == 1 < indexed
+
+    fingerprint = retriever.fingerprint(str(repo))
+    (repo / "src" / "main.py").write_text("def cherry(): pass\n")
+    assert retriever.fingerprint(str(repo)) != fingerprint
+
+
+def test_format_chunks_caps_context():
+    chunks = [{"path": "a.py", "text": "x" * 50}, {"path": "b.py", "text": "y" * 10}]
+    context = format_chunks(chunks, max_chars=30)
+    assert context == "[b.py]\n" + "y" * 10
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.result_export import ResultExporter, parse_timestamp, parse_trends, select_sessions
+from utils.result_store import ResultStore
+
+
+def make_entry(repo):
+    return {
+        "status": "completed",
+        "user_query": "Which use RAG?",
+        "aggregate_query_result": "Both do.",
+        "results": [{
+            "comparison_repo": f"/local/{repo}",
+            "comparison_repo_id": f"https://github.com/org/{repo}",
+            "primary_repo_id": "https://github.com/org/main",
+            "primary_commit": "a" * 40,
+            "comparison_commit": "b" * 40,
+            "aggregated_trends": "Detected Trends:\nFrameworks: LangGraph, LangChain\nTechniques: RAG",
+            "comparison_trends": "Detected Trends:\nVector DBs: Faiss",
+            "confidence_rating": "High",
+            "node_timings": {"analyze": 1.5, "summarize": 0.25},
+            "analysis_result": "analysis",
+            "fact_check_result": "ok",
+            "final_summary": "summary",
+        }],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(store_dir=str(tmp_path / "results"))
+    store["s1"] = make_entry("one")
+    store["s2"] = make_entry("two")
+    store["running"] = {"status": "processing", "results": []}
+    return store
+
+
+def test_parse_trends_and_timestamps():
+    assert parse_trends("Detected Trends:\nFrameworks: LangGraph, LangChain\nLLMs: GPT") == ["LangGraph", "LangChain", "GPT"]
+    assert parse_trends(None) == []
+    assert parse_timestamp("2026-01-02") == datetime(2026, 1, 2, tzinfo=timezone.utc)
+    assert parse_timestamp("2026-01-02T03:00:00Z").hour == 3
+    with pytest.raises(ValueError):
+        parse_timestamp("yesterday")
+
+
+def test_select_sessions_by_status_and_range(store):
+    assert [session_id for _, session_id in select_sessions(store)] == ["s1", "s2"]
+    assert select_sessions(store, since=datetime(2999, 1, 1, tzinfo=timezone.utc)) == []
+    assert [s for _, s in select_sessions(store, exclude={"s1"})] == ["s2"]
+
+
+def test_incremental_parquet_export(store, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    exporter = ResultExporter(store=store, export_dir=str(tmp_path / "exports"))
+    exporter.row_group_size = 1
+
+    first = exporter.export()
+    assert first["rows"] == 2 and first["sessions"] == 2
+    parquet = pq.ParquetFile(first["path"])
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("primary_trends").to_pylist()[0] == ["LangGraph", "LangChain", "RAG"]
+    assert dict(table.column("node_timings").to_pylist()[0])["analyze"] == 1.5
+
+    assert exporter.export()["path"] is None  # nothing new
+    store["s3"] = make_entry("three")
+    assert exporter.export()["sessions"] == 1
+
+
+def test_arrow_file_export(store, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    exporter = ResultExporter(store=store, export_dir=str(tmp_path / "exports"))
+    report = exporter.export_file(str(tmp_path / "all.arrow"), fmt="arrow")
+    with pa.ipc.open_file(report["path"]) as reader:
+        assert reader.read_all().num_rows == 2
@@ -0,0 +1,36 @@
+import utils.result_store as result_store
+from utils.result_store import ResultStore, decode_entry, encode_entry
+
+ENTRY = {
+    "status": "completed",
+    "results": [{"comparison_repo": "/r", "final_summary": "summary " * 200, "partial": False}],
+}
+
+
+def test_round_trip_is_compact():
+    blob = encode_entry(ENTRY)
+    assert decode_entry(blob) == ENTRY
+    assert len(blob) < len(str(ENTRY)) / 4
+
+
+def test_json_zlib_fallback(monkeypatch):
+    monkeypatch.setattr(result_store, "ormsgpack", None)
+    monkeypatch.setattr(result_store, "zstandard", None)
+    blob = encode_entry(ENTRY)
+    assert blob[:2] == b"jd"
+    assert decode_entry(blob) == ENTRY
+
+
+def test_store_persists_with_stable_etags(tmp_path):
+    store = ResultStore(str(tmp_path))
+    etag = store.put("s1", ENTRY)
+    assert store.put("s1", ENTRY) == etag
+    assert store.meta("s1")["status"] == "completed"
+    assert "s1" in store and store.get("missing") is None
+
+    reopened = ResultStore(str(tmp_path))
+    assert reopened["s1"] == ENTRY
+    assert reopened.meta("s1")["etag"] == etag
+
+    reopened["s1"] = {**ENTRY, "status": "failed"}
+    assert reopened.meta("s1")["etag"] != etag
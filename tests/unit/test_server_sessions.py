@@ -0,0 +1,83 @@
+import api.server as server
+from utils.result_store import ResultStore
+
+
+def test_store_is_opened_at_startup_and_sweeps_interrupted_sessions(tmp_path):
+    stale = ResultStore(str(tmp_path))
+    stale["running"] = {"status": "processing", "results": []}
+    stale["done"] = {"status": "completed", "results": []}
+
+    store = server.open_session_store(str(tmp_path))
+    assert server.session_store is store
+    assert store.meta("running")["status"] == "failed"
+    assert store["running"]["error"] == "Interrupted by a server restart."
+    assert store.meta("done")["status"] == "completed"
+
+
+class ParkedSession:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        return "processing"
+
+
+def test_owner_cannot_cancel_a_job_others_are_attached_to(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    store = server.open_session_store(str(tmp_path))
+    session = ParkedSession()
+    monkeypatch.setitem(server.live_sessions, "owner", session)
+    monkeypatch.setitem(server.session_aliases, "alias", "owner")
+    monkeypatch.setattr(server, "deduplicator", server.RequestDeduplicator(ttl_seconds=60))
+    server.deduplicator.attach_or_register("fp", "owner")
+    server.deduplicator.attach_or_register("fp", "alias")
+    store["owner"] = {"status": "processing", "results": []}
+    client = TestClient(server.app)
+
+    response = client.delete("/sessions/owner")
+    assert response.status_code == 409
+    assert not session.cancelled and store.meta("owner")["status"] == "processing"
+
+    # Once the attached request stops following, the owner's cancel goes through
+    assert client.delete("/sessions/alias").json()["status"] == "cancelled"
+    assert client.get("/results/alias").json()["status"] == "cancelled"
+    assert client.delete("/sessions/owner").json()["status"] == "cancelling"
+    assert session.cancelled
+
+
+def test_similar_runs_the_lookup_off_the_event_loop(monkeypatch):
+    import asyncio
+    from fastapi.testclient import TestClient
+
+    on_loop = []
+
+    class Index:
+        def query(self, repo_id=None, text=None, k=5):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return [{"repo_id": "r", "score": 1.0}]
+
+    monkeypatch.setattr(server, "get_repo_index", lambda: Index())
+    response = TestClient(server.app).get("/similar?text=rag&k=1")
+    assert response.json()["results"][0]["repo_id"] == "r"
+    assert on_loop == [False]
+
+
+def test_run_analysis_refuses_private_webhook_urls(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    server.open_session_store(str(tmp_path))
+    monkeypatch.setattr(server.webhooks, "_secret", "s3cret")
+    monkeypatch.setattr(server.webhooks, "allowed_hosts", set())
+    monkeypatch.setattr(server.webhooks, "allow_private_networks", False)
+    client = TestClient(server.app)
+
+    response = client.post("/run-analysis/", json={
+        "primary_repo": "https://github.com/o/r", "comparison_repos": [], "webhook_url": "http://169.254.169.254/latest/meta-data/"
+    })
+    assert response.status_code == 422 and "non-public" in response.json()["detail"]
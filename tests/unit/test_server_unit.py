@@ -4,10 +4,10 @@ from httpx import AsyncClient
 from api.server import api 
 
 @pytest.mark.asyncio
-@patch("api.server.clone_if_remote")
-@patch("api.server.ProjectAnalyzerAgent.analyze_project")
-@patch("api.server.CrossPublicationInsightOrchestrator.run")
-@patch("api.server.aggregate_trends")
+@patch("orchestrator.pipeline.clone_if_remote")
+@patch("orchestrator.pipeline.cached_analyze")
+@patch("orchestrator.pipeline.CrossPublicationInsightOrchestrator.run")
+@patch("orchestrator.pipeline.cached_aggregate")
 
 async def test_run_analysis_mocked(
     mock_aggregate_trends,
@@ -16,7 +16,7 @@ async def test_run_analysis_mocked(
     mock_clone_if_remote
 ):
     mock_clone_if_remote.side_effect = lambda url: f"/local/path/to/{url.split('/')[-1]}"
-    mock_analyze_project.return_value = "Mocked analysis result"
+    mock_analyze_project.return_value = {"analysis_result": "Mocked analysis result"}
     mock_aggregate_trends.return_value = {"aggregated_trends": "Mocked trends"}
     mock_orchestrator_run.return_value = {
         "analysis_result": "Mocked analysis",
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from tools.vector_index import RepoVectorIndex
+
+
+class FakeDetector:
+    """Embeds text as a normalised bag of its first letters, enough to order neighbours."""
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            vec = np.zeros(26, dtype=np.float32)
+            for word in text.lower().split():
+                if word[0].isalpha():
+                    vec[ord(word[0]) - ord("a")] += 1
+            rows.append(vec / (np.linalg.norm(vec) or 1.0))
+        rows = np.stack(rows)
+        return rows[0] if single else rows
+
+
+@pytest.fixture
+def index(tmp_path):
+    return RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+
+
+def test_upsert_and_query_by_repo(index):
+    index.upsert("repo-a", "apple avocado apricot", trends="Frameworks: LangChain")
+    index.upsert("repo-b", "apple almond banana")
+    index.upsert("repo-c", "zebra zucchini")
+
+    neighbours = index.query(repo_id="repo-a", k=2)
+    assert [n["repo_id"] for n in neighbours] == ["repo-b", "repo-c"]
+    assert neighbours[0]["score"] > neighbours[1]["score"]
+
+
+def test_upsert_replaces_existing_row(index):
+    index.upsert("repo-a", "apple")
+    index.upsert("repo-a", "zebra", trends="updated")
+    assert len(index) == 1
+    assert index.get("repo-a")["trends"] == "updated"
+    assert index.query(text="zebra", k=1)[0]["repo_id"] == "repo-a"
+
+
+def test_delete_and_persistence(tmp_path):
+    index = RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+    index.upsert_many([
+        {"repo_id": "repo-a", "analysis": "apple"},
+        {"repo_id": "repo-b", "analysis": "banana"},
+    ])
+    assert index.delete("repo-a")
+    assert not index.delete("repo-a")
+
+    reopened = RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+    assert len(reopened) == 1
+    assert "repo-b" in reopened
+    with pytest.raises(KeyError):
+        reopened.query(repo_id="repo-a")
+
+
+def test_instances_sharing_a_directory_keep_each_others_rows(tmp_path):
+    a = RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+    b = RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+    a.upsert("repo-a", "apple")
+    b.upsert("repo-b", "banana")
+    assert "repo-a" in b and len(a) == 2
+
+    a.delete("repo-b")
+    reopened = RepoVectorIndex(index_dir=str(tmp_path), detector=FakeDetector())
+    assert [entry["repo_id"] for entry in reopened.entries] == ["repo-a"]
+    assert b.query(text="apple", k=5)[0]["repo_id"] == "repo-a" and len(b) == 1
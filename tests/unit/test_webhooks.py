@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+
+from api.long_poll import SessionWaiters
+import pytest
+
+from api.webhooks import SIGNATURE_HEADER, WebhookDispatcher, WebhookURLRefused, sign_payload, verify_signature
+from utils.result_store import ResultStore
+
+
+def make_dispatcher(tmp_path, handler):
+    dispatcher = WebhookDispatcher(secret="s3cret", transport=httpx.MockTransport(handler))
+    dispatcher.log_path = tmp_path / "deliveries.jsonl"
+    dispatcher.backoff_base = 0.01
+    dispatcher.max_attempts = 3
+    dispatcher.allowed_hosts = {"example.test"}
+    return dispatcher
+
+
+def read_log(dispatcher):
+    return [json.loads(line) for line in dispatcher.log_path.read_text().splitlines()]
+
+
+def test_signatures_verify_only_the_signed_body():
+    header = sign_payload("s3cret", b'{"status":"completed"}')
+    assert verify_signature("s3cret", b'{"status":"completed"}', header)
+    assert not verify_signature("s3cret", b'{"status":"failed"}', header)
+    assert not verify_signature("other", b'{"status":"completed"}', header)
+    assert not verify_signature("s3cret", b'{}', sign_payload("s3cret", b'{}', timestamp=1))
+    assert not verify_signature("s3cret", b'{}', "garbage")
+
+
+def test_retries_server_errors_then_delivers_signed_payload(tmp_path):
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(503 if len(received) < 2 else 200)
+
+    dispatcher = make_dispatcher(tmp_path, handler)
+    store = ResultStore(str(tmp_path / "results"))
+    store.subscribe(dispatcher.notify)
+    dispatcher.register("s1", "https://example.test/hook")
+
+    store["s1"] = {"status": "processing", "results": []}
+    store["s1"] = {"status": "completed", "results": [{"final_summary": "done"}]}
+    store["s1"] = {"status": "completed", "results": [{"final_summary": "again"}]}
+    assert dispatcher.join(timeout=5)
+
+    assert len(received) == 2
+    last = received[-1]
+    assert verify_signature("s3cret", last.content, last.headers[SIGNATURE_HEADER])
+    assert received[0].headers["X-Webhook-Id"] == last.headers["X-Webhook-Id"]
+    payload = json.loads(last.content)
+    assert payload["event"] == "session.completed" and payload["results"][0]["final_summary"] == "done"
+    assert [record["outcome"] for record in read_log(dispatcher)] == ["retrying", "delivered"]
+
+
+def test_client_errors_are_not_retried(tmp_path):
+    dispatcher = make_dispatcher(tmp_path, lambda request: httpx.Response(404))
+    dispatcher.enqueue("https://example.test/hook", {"event": "session.failed", "session_id": "s1"})
+    assert dispatcher.join(timeout=5)
+    assert [(r["outcome"], r["status_code"]) for r in read_log(dispatcher)] == [("failed", 404)]
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/hook", "http://localhost/hook", "http://169.254.169.254/latest/meta-data/",
+    "https://10.0.0.5/hook", "http://[::1]/hook", "http://[::ffff:192.168.1.1]/hook", "ftp://93.184.216.34/hook",
+])
+def test_non_public_webhook_urls_are_refused(tmp_path, url):
+    dispatcher = make_dispatcher(tmp_path, lambda request: httpx.Response(200))
+    dispatcher.allowed_hosts = set()
+    with pytest.raises(WebhookURLRefused):
+        dispatcher.validate_url(url)
+
+
+def test_public_and_allowlisted_webhook_urls_are_accepted(tmp_path):
+    dispatcher = make_dispatcher(tmp_path, lambda request: httpx.Response(200))
+    dispatcher.validate_url("https://example.test/hook")
+    with pytest.raises(WebhookURLRefused, match="allowed_hosts"):
+        dispatcher.validate_url("https://93.184.216.34/hook")
+
+    dispatcher.allowed_hosts = set()
+    dispatcher.validate_url("https://93.184.216.34/hook")
+    dispatcher.allow_private_networks = True
+    dispatcher.validate_url("http://127.0.0.1:8000/hook")
+
+
+def test_refused_urls_are_rechecked_and_never_posted_at_delivery(tmp_path):
+    received = []
+    dispatcher = make_dispatcher(tmp_path, lambda request: received.append(request) or httpx.Response(200))
+    dispatcher.allowed_hosts = set()
+    dispatcher.enqueue("http://169.254.169.254/hook", {"event": "session.completed", "session_id": "s1"})
+    assert dispatcher.join(timeout=5)
+    assert received == []
+    assert [r["outcome"] for r in read_log(dispatcher)] == ["failed"]
+
+
+def test_long_poll_wakes_on_store_change(tmp_path):
+    store = ResultStore(str(tmp_path))
+    waiters = SessionWaiters()
+    store.subscribe(waiters.notify)
+    store["s1"] = {"status": "processing", "results": []}
+
+    async def poll():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, store.put, "s1", {"status": "completed", "results": []})
+        started = loop.time()
+        meta = await waiters.wait("s1", lambda: store.meta("s1"), lambda m: m["status"] == "processing", 5)
+        return meta, loop.time() - started
+
+    meta, waited = asyncio.run(poll())
+    assert meta["status"] == "completed" and waited < 1
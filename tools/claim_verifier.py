@@ -0,0 +1,161 @@
+import re
+from typing import Any, Dict, List, NamedTuple
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONFIG = load_config()
+FACT_CHECK_CONFIG = CONFIG.get("fact_check", {})
+LANGUAGES = sorted(set(CONFIG.get("repo_parser", {}).get("extension_language_map", {}).values()))
+IGNORED_LANGUAGES = {lang.lower() for lang in FACT_CHECK_CONFIG.get("ignore_languages", ["JSON", "YAML", "Markdown"])}
+FRAMEWORKS: Dict[str, List[str]] = FACT_CHECK_CONFIG.get("frameworks", {})
+
+# License family -> pattern, matched in both the analysis and the LICENSE excerpt
+LICENSE_PATTERNS = {
+    "MIT": re.compile(r"\bMIT\b"),
+    "Apache": re.compile(r"\bApache(?:[\s-]+License|[\s-]*2(?:\.0)?)\b", re.I),
+    "AGPL": re.compile(r"\bAGPL|\bAffero", re.I),
+    "LGPL": re.compile(r"\bLGPL|\bLesser General Public", re.I),
+    "GPL": re.compile(r"(?<![LA])\bGPL|\bGNU General Public", re.I),
+    "BSD": re.compile(r"\bBSD\b"),
+    "MPL": re.compile(r"\bMPL\b|\bMozilla Public", re.I),
+    "Unlicense": re.compile(r"\bUnlicense\b", re.I),
+    "Creative Commons": re.compile(r"\bCreative Commons\b|\bCC[- ]BY", re.I),
+}
+
+VERIFIED, CONTRADICTED, UNRESOLVED = "verified", "contradicted", "unresolved"
+
+
+class Claim(NamedTuple):
+    """A checkable statement found in an analysis and the outcome of checking it."""
+    kind: str       # "language", "license" or "framework"
+    value: str
+    status: str     # verified / contradicted / unresolved
+    evidence: str
+
+
+class VerificationReport:
+    def __init__(self, claims: List[Claim]):
+        self.claims = claims
+
+    @property
+    def escalated(self) -> List[Claim]:
+        """Claims the rules could not settle, or found contradicted, for the LLM to review."""
+        return [claim for claim in self.claims if claim.status != VERIFIED]
+
+    @property
+    def needs_llm(self) -> bool:
+        return not self.claims or bool(self.escalated)
+
+    def format(self) -> str:
+        lines = [f"- [{claim.status}] {claim.kind.capitalize()}: {claim.value} ({claim.evidence})" for claim in self.claims]
+        verified = len(self.claims) - len(self.escalated)
+        overall = (
+            f"All {len(self.claims)} checkable claims verified against the repository."
+            if not self.escalated else
+            f"{verified} of {len(self.claims)} checkable claims verified against the repository."
+        )
+        return "Automated checks:\n" + "\n".join(lines) + f"\n\nOverall: {overall}"
+
+
+def _term_pattern(term: str, case_sensitive: bool = False) -> re.Pattern:
+    """Whole-term match; hyphens, underscores and spaces in the term are interchangeable."""
+    parts = [re.escape(part) for part in re.split(r"[-_\s]+", term.strip())]
+    body = r"[-_\s]?".join(parts)
+    return re.compile(rf"(?<![\w+#]){body}(?![\w+#])", 0 if case_sensitive else re.I)
+
+
+def _language_pattern(language: str) -> re.Pattern:
+    if len(language) > 2:
+        return _term_pattern(language)
+    # Short names ("C", "Go", "R") are ordinary words too: only count them capitalised and
+    # in a language context ("written in Go", "C code", "Go and Rust")
+    name = re.escape(language[0].upper() + language[1:])
+    return re.compile(
+        rf"\b(?:in|using|with|and|or)\s+{name}(?![\w+#])"
+        rf"|(?<![\w+#]){name}\s+(?:language|code|source|programs?|librar(?:y|ies)|implementation|bindings|extensions?|modules?)\b"
+    )
+
+
+LANGUAGE_PATTERNS = {
+    language: _language_pattern(language) for language in LANGUAGES if language.lower() not in IGNORED_LANGUAGES
+}
+FRAMEWORK_PATTERNS = {
+    framework: [_term_pattern(term) for term in [framework] + list(aliases)] for framework, aliases in FRAMEWORKS.items()
+}
+
+
+def check_languages(analysis: str, summary: Dict[str, Any]) -> List[Claim]:
+    used = {lang.lower(): count for lang, count in summary.get("languages_used", {}).items()}
+    claims = []
+    for language, pattern in LANGUAGE_PATTERNS.items():
+        if not pattern.search(analysis):
+            continue
+        count = used.get(language.lower())
+        if count:
+            claims.append(Claim("language", language, VERIFIED, f"{count} files in the repository"))
+        else:
+            claims.append(Claim("language", language, CONTRADICTED, "no files of this language in the repository"))
+    return claims
+
+
+def detect_licenses(text: str) -> List[str]:
+    return [name for name, pattern in LICENSE_PATTERNS.items() if pattern.search(text)]
+
+
+def check_license(analysis: str, summary: Dict[str, Any]) -> List[Claim]:
+    claimed = detect_licenses(analysis)
+    if not claimed:
+        return []
+    excerpt = summary.get("license_excerpt", "")
+    actual = detect_licenses(excerpt) if not excerpt.startswith("No LICENSE file found") else []
+
+    claims = []
+    for license_name in claimed:
+        if license_name in actual:
+            claims.append(Claim("license", license_name, VERIFIED, "matches the LICENSE file"))
+        elif actual:
+            claims.append(Claim("license", license_name, CONTRADICTED, f"LICENSE file is {', '.join(actual)}"))
+        else:
+            claims.append(Claim("license", license_name, UNRESOLVED, "LICENSE file missing or not recognised"))
+    return claims
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.\s]+", "-", name.lower())
+
+
+def check_frameworks(analysis: str, summary: Dict[str, Any]) -> List[Claim]:
+    dependencies = {_normalize(name) for names in summary.get("dependencies", {}).values() for name in names}
+    readme = summary.get("readme_excerpt", "")
+    keywords = " ".join(summary.get("keywords", []))
+
+    claims = []
+    for framework, patterns in FRAMEWORK_PATTERNS.items():
+        if not any(pattern.search(analysis) for pattern in patterns):
+            continue
+        terms = {_normalize(term) for term in [framework] + list(FRAMEWORKS[framework])}
+        declared = sorted(dependencies & terms)
+        if declared:
+            claims.append(Claim("framework", framework, VERIFIED, f"declared dependency {declared[0]}"))
+        elif any(pattern.search(readme) or pattern.search(keywords) for pattern in patterns):
+            claims.append(Claim("framework", framework, VERIFIED, "named in the README"))
+        else:
+            # Absence from the manifests we read is not proof it is unused
+            claims.append(Claim("framework", framework, UNRESOLVED, "not found in manifests or README"))
+    return claims
+
+
+def verify_claims(analysis: str, summary: Dict[str, Any]) -> VerificationReport:
+    """
+    Extracts language, license and framework claims from an analysis and checks each
+    against the parsed repository summary, without an LLM.
+    """
+    claims = check_languages(analysis, summary) + check_license(analysis, summary) + check_frameworks(analysis, summary)
+    report = VerificationReport(claims)
+    logger.info(
+        "Deterministic fact check: %d claims, %d need review", len(claims), len(report.escalated)
+    )
+    return report
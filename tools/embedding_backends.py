@@ -0,0 +1,282 @@
+"""
+Embedding backends for the semantic trend detector and the repository vector index.
+
+- torch: sentence-transformers on PyTorch (the reference implementation).
+- onnx:  the same model exported to ONNX and run with ONNX Runtime on CPU, optionally
+         int8-quantized. Torch is never imported, which saves its import time and memory.
+
+Both return L2-normalised float32 rows, so cosine similarity is a dot product.
+
+Usage:
+    python -m tools.embedding_backends export [--output models/embeddings-onnx] [--no-quantize]
+    python -m tools.embedding_backends check  [--texts-file analyses.txt] [--repeats 3]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+SAMPLE_TEXTS = [
+    "A retrieval-augmented generation service that indexes documentation with FAISS and answers "
+    "questions with a local Llama model.",
+    "LangGraph agents that compare GitHub repositories, fact-check their analyses and summarize trends.",
+    "Fine-tuning scripts for small transformer models with LoRA adapters and an evaluation harness.",
+    "A FastAPI backend storing sentence embeddings in ChromaDB for semantic search over papers.",
+    "Utilities for parsing PDFs, chunking text and building vector stores.",
+    "LangChain",
+    "Evaluation",
+]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mean_pool(hidden_states: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average of the token embeddings, ignoring padding (sentence-transformers' mean pooling)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity between the rows of a and b."""
+    return normalize_rows(np.atleast_2d(a)) @ normalize_rows(np.atleast_2d(b)).T
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def footprint_bytes(self) -> int:
+        return sum(parameter.numel() * parameter.element_size() for parameter in self.model.parameters())
+
+
+class OnnxBackend:
+    """
+    Runs an exported sentence-transformer with ONNX Runtime: tokenizes with the model's
+    fast tokenizer, mean-pools the last hidden state and normalises, as the torch path does.
+    """
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        batch_size: int = 32,
+        max_seq_length: int = 256,
+        threads: int = 0
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / (ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_path.exists() or not (model_dir / TOKENIZER_FILE).exists():
+            raise FileNotFoundError(
+                f"No exported model at {model_path}; run `python -m tools.embedding_backends export`."
+            )
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.model_path = model_path
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Batches of similar length waste less work on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in batch])
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": attention_mask,
+            }
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            hidden_states = self.session.run(None, feeds)[0]
+            pooled = normalize_rows(mean_pool(hidden_states, attention_mask))
+            if embeddings.shape[1] == 0:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[batch] = pooled
+        return embeddings
+
+    def footprint_bytes(self) -> int:
+        # ONNX Runtime holds roughly one copy of the weights plus its arena
+        return 2 * self.model_path.stat().st_size
+
+
+def load_embedding_backend(embeddings_config: Dict[str, Any]):
+    """
+    Creates the backend named by `embeddings.backend`. An unavailable ONNX backend
+    (onnxruntime missing or model not exported) falls back to torch with a warning.
+    """
+    backend = embeddings_config.get("backend", "torch")
+    batch_size = embeddings_config.get("batch_size", 32)
+    if backend == "onnx":
+        onnx_config = embeddings_config.get("onnx", {})
+        try:
+            return OnnxBackend(
+                onnx_config.get("model_dir", "models/embeddings-onnx"),
+                quantized=onnx_config.get("quantized", True),
+                batch_size=batch_size,
+                max_seq_length=embeddings_config.get("max_seq_length", 256),
+                threads=onnx_config.get("threads", 0),
+            )
+        except (ImportError, FileNotFoundError) as e:
+            logger.warning("ONNX embedding backend unavailable (%s); using torch.", e)
+    elif backend != "torch":
+        raise ValueError(f"Unknown embeddings backend: {backend}")
+    return TorchBackend(embeddings_config["model_name"], batch_size=batch_size)
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True, opset: int = 14) -> Path:
+    """
+    Exports a Hugging Face sentence-transformer to ONNX with its tokenizer, plus an
+    int8 dynamically quantized copy. Needs torch, transformers and onnxruntime once, offline.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.encoder(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    sample = tokenizer(["an example sentence to trace"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model),
+            tuple(sample[name] for name in input_names),
+            str(output_dir / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(str(output_dir))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(output_dir / ONNX_MODEL_FILE), str(output_dir / ONNX_INT8_MODEL_FILE), weight_type=QuantType.QInt8
+        )
+    logger.info("Exported %s to %s", model_name, output_dir)
+    return output_dir
+
+
+def _timed_encode(backend, texts: List[str], repeats: int) -> Tuple[np.ndarray, float]:
+    backend.encode(texts[:1])  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        embeddings = backend.encode(texts)
+    return embeddings, (time.perf_counter() - started) / repeats
+
+
+def compare_backends(reference, candidate, texts: Sequence[str], repeats: int = 3) -> Dict[str, float]:
+    """
+    Encodes the same texts with both backends. Returns the per-text cosine agreement
+    between their embeddings and the average encode time of each.
+    """
+    texts = list(texts)
+    reference_embeddings, reference_seconds = _timed_encode(reference, texts, repeats)
+    candidate_embeddings, candidate_seconds = _timed_encode(candidate, texts, repeats)
+    agreement = np.sum(normalize_rows(reference_embeddings) * normalize_rows(candidate_embeddings), axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(agreement.min()), 4),
+        "mean_cosine": round(float(agreement.mean()), 4),
+        "reference_ms": round(reference_seconds * 1000, 2),
+        "candidate_ms": round(candidate_seconds * 1000, 2),
+        "speedup": round(reference_seconds / candidate_seconds, 2) if candidate_seconds else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    embeddings_config = load_config().get("embeddings", {})
+    onnx_config = embeddings_config.get("onnx", {})
+
+    parser = argparse.ArgumentParser(description="Export and check the ONNX embedding backend.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Export embeddings.model_name to ONNX (fp32 and int8)")
+    export_parser.add_argument("--output", default=onnx_config.get("model_dir", "models/embeddings-onnx"))
+    export_parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 copy")
+    check_parser = commands.add_parser("check", help="Compare the ONNX backend with torch for parity and speed")
+    check_parser.add_argument("--texts-file", help="One text per line (default: built-in samples)")
+    check_parser.add_argument("--repeats", type=int, default=3)
+    check_parser.add_argument("--fp32", action="store_true", help="Check the unquantized export")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_onnx(embeddings_config["model_name"], args.output, quantize=not args.no_quantize)
+        return 0
+
+    texts = (
+        [line.strip() for line in Path(args.texts_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+        if args.texts_file else SAMPLE_TEXTS
+    )
+    reference = TorchBackend(embeddings_config["model_name"], batch_size=embeddings_config.get("batch_size", 32))
+    candidate = OnnxBackend(
+        onnx_config.get("model_dir", "models/embeddings-onnx"),
+        quantized=not args.fp32,
+        batch_size=embeddings_config.get("batch_size", 32),
+        max_seq_length=embeddings_config.get("max_seq_length", 256),
+        threads=onnx_config.get("threads", 0),
+    )
+    report = compare_backends(reference, candidate, texts, args.repeats)
+    min_cosine = onnx_config.get("parity_min_cosine", 0.98)
+    report["passed"] = report["min_cosine"] >= min_cosine
+
+    print(json.dumps(report, indent=2))
+    if not report["passed"]:
+        print(f"ONNX embeddings diverge from torch (min cosine {report['min_cosine']} < {min_cosine}).")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+from utils.cancellation import run_cancellable
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Unread blob tails up to this size are drained from the batch process; past it, restarting is cheaper
+MAX_DRAIN_BYTES = 1 << 20
+
+
+def is_bare_repo(path: Path) -> bool:
+    """True for a git directory without a working tree (e.g. `git clone --bare`)."""
+    return (path / "HEAD").is_file() and (path / "objects").is_dir() and (path / "refs").is_dir()
+
+
+class GitObjectReader:
+    """
+    Reads a repository straight from its object store, without a working tree.
+
+    The file listing comes from `git ls-tree -r -l` (paths and blob sizes in one call);
+    contents are streamed from a single long-lived `git cat-file --batch` process.
+    Use as a context manager so the batch process is closed.
+    """
+
+    def __init__(self, git_dir: str, ref: str = "HEAD"):
+        self.git_dir = str(git_dir)
+        self.ref = ref
+        self._batch: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _git(self, *args: str) -> str:
+        result = run_cancellable(["git", f"--git-dir={self.git_dir}", *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return result.stdout.decode("utf-8", errors="surrogateescape")
+
+    def commit(self) -> str:
+        return self._git("rev-parse", self.ref).strip()
+
+    def list_files(self, skip_dirs: Optional[Set[str]] = None) -> Iterator[Tuple[str, int, str]]:
+        """Yields (path, size, blob sha) per file in the tree, pruning skip_dirs."""
+        skip_dirs = skip_dirs or set()
+        for record in self._git("ls-tree", "-r", "-l", "-z", self.ref).split("\0"):
+            if not record:
+                continue
+            meta, path = record.split("\t", 1)
+            mode, obj_type, sha, size = meta.split()
+            # Submodules are commits, symlinks are blobs whose content is only the target path
+            if obj_type != "blob" or mode == "120000":
+                continue
+            if skip_dirs and any(part in skip_dirs for part in path.split("/")[:-1]):
+                continue
+            yield path, int(size), sha
+
+    def read(self, sha: str, max_bytes: int) -> Optional[bytes]:
+        """Returns up to max_bytes of a blob, without buffering the rest; None if the object is missing."""
+        with self._lock:
+            if self._batch is None:
+                self._batch = subprocess.Popen(
+                    ["git", f"--git-dir={self.git_dir}", "cat-file", "--batch"],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE
+                )
+            self._batch.stdin.write(f"{sha}\n".encode())
+            self._batch.stdin.flush()
+            header = self._batch.stdout.readline().split()
+            if len(header) != 3:  # "<sha> missing"
+                logger.warning("Git object %s missing from %s", sha, self.git_dir)
+                return None
+            size = int(header[2])
+            content = self._batch.stdout.read(min(size, max_bytes))
+            rest = size - len(content) + 1  # plus the trailing newline
+            if rest > MAX_DRAIN_BYTES:
+                self._stop_batch(kill=True)
+            else:
+                while rest > 0:
+                    chunk = self._batch.stdout.read(min(rest, 65536))
+                    if not chunk:
+                        break
+                    rest -= len(chunk)
+        return content
+
+    def _stop_batch(self, kill: bool = False) -> None:
+        if self._batch is not None:
+            if kill:
+                self._batch.kill()
+            self._batch.stdin.close()
+            self._batch.stdout.close()
+            self._batch.wait()
+            self._batch = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop_batch()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,15 +1,59 @@
 import textwrap
+from typing import Any, Dict
 
-def review_before_summary(state: dict) -> dict:
+REVIEW_ACTIONS = ("edit", "continue", "skip")
+SKIPPED_SUMMARY = "Summarization skipped by human operator."
+
+def build_review_payload(state: dict) -> Dict[str, Any]:
+    """What a reviewer sees before summarization."""
+    return {
+        "step": "pre-summary",
+        "analysis_result": state.get("analysis_result", ""),
+        "aggregated_trends": state.get("aggregated_trends", ""),
+        "fact_check_result": state.get("fact_check_result", ""),
+        "actions": list(REVIEW_ACTIONS),
+    }
+
+def apply_review_decision(state: dict, decision: Dict[str, Any]) -> dict:
+    """
+    Applies a reviewer decision of the form {"action": "edit"|"continue"|"skip", "analysis": "..."}.
+    Unknown actions are treated as "continue".
+    """
+    action = (decision or {}).get("action", "continue")
+
+    if action == "edit":
+        edited = (decision.get("analysis") or "").strip()
+        if edited:
+            state["analysis_result"] = edited
+    elif action == "skip":
+        state["final_summary"] = SKIPPED_SUMMARY
+
+    state["hitl_action"] = action
+    return state
+
+def review_node(state: dict) -> dict:
+    """
+    Graph node that parks the run at a checkpoint until a reviewer decision arrives.
+
+    The first execution raises a LangGraph interrupt carrying the review payload; the
+    run is resumed with Command(resume=decision) and this node then applies it.
+    """
+    from langgraph.types import interrupt
+
+    decision = interrupt(build_review_payload(state))
+    return apply_review_decision(state, decision)
+
+def prompt_review(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Collects a review decision interactively on the terminal (CLI use only)."""
     print("\n===== HUMAN-IN-THE-LOOP: REVIEW BEFORE FINAL SUMMARY =====")
     print("\n Analysis Result:\n")
-    print(textwrap.fill(state.get("analysis_result", ""), width=100))
+    print(textwrap.fill(payload.get("analysis_result", ""), width=100))
 
     print("\n Detected Trends:\n")
-    print(textwrap.fill(state.get("aggregated_trends", ""), width=100))
+    print(textwrap.fill(payload.get("aggregated_trends", ""), width=100))
 
     print("\n Fact Check Feedback:\n")
-    print(textwrap.fill(state.get("fact_check_result", ""), width=100))
+    print(textwrap.fill(payload.get("fact_check_result", ""), width=100))
 
     print("\nWould you like to edit the analysis before summarization?")
     choice= input("Enter [e]dit, [c]ontinue, or [s]kip summarization: ").strip().lower()
@@ -24,14 +68,14 @@ def review_before_summary(state: dict) -> dict:
             lines.append(line)
         edited = "\n".join(lines).strip()
         if edited:
-            state["analysis_result"] = edited
             print(" Analysis updated.")
-    
+            return {"action": "edit", "analysis": edited}
+        return {"action": "continue"}
+
     elif choice == "s":
         print("Skipping summarization as requested.")
-        state["final_summary"] = "Summarization skipped by human operator."
-    
+        return {"action": "skip"}
+
     else:
         print("Continuing without changes.")
-    
-    return state
\ No newline at end of file
+        return {"action": "continue"}
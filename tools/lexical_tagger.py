@@ -0,0 +1,102 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+_SEPARATORS = re.compile(r"[-_\s]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases and folds runs of hyphens, underscores and whitespace to one space."""
+    return _SEPARATORS.sub(" ", text.lower())
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text.
+    Patterns are matched as given; normalize them and the text the same way beforehand.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Args:
+            patterns (Dict[str, str]): Pattern -> value reported when it matches.
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]  # (pattern length, value) per state
+
+        for pattern, value in patterns.items():
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].append((len(pattern), value))
+
+        # Breadth-first, so each state's failure link is resolved before its children's
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yields (start, end, value) for every match, including overlapping ones."""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._out[state]:
+                yield index + 1 - length, index + 1, value
+
+
+class LexicalTagger:
+    """
+    Tags text with the canonical names of the terms it mentions, matched case- and
+    hyphen-insensitively on word boundaries. Where matches overlap the longest wins, so
+    "retrieval augmented generation" tags RAG rather than Retrieval.
+    """
+
+    def __init__(self, tags: Iterable[str], aliases: Dict[str, List[str]] = None):
+        """
+        Args:
+            tags (Iterable[str]): Canonical tag names; each also matches itself.
+            aliases (Dict[str, List[str]]): Tag -> other spellings that map to it.
+        """
+        patterns = {}
+        for tag in tags:
+            patterns.setdefault(normalize_text(tag), tag)
+        for tag, spellings in (aliases or {}).items():
+            patterns.setdefault(normalize_text(tag), tag)
+            for spelling in spellings:
+                patterns.setdefault(normalize_text(spelling), tag)
+        self._matcher = AhoCorasick(patterns)
+
+    def tag(self, text: str) -> List[str]:
+        """Tags found in the text, in order of first mention."""
+        text = normalize_text(text)
+        candidates = [
+            (start, end, tag) for start, end, tag in self._matcher.finditer(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+        ]
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+
+        tags, covered_until = [], 0
+        for start, end, tag in candidates:
+            if start < covered_until:
+                continue
+            covered_until = end
+            if tag not in tags:
+                tags.append(tag)
+        return tags
@@ -1,13 +1,20 @@
 import os
-os.environ["GGML_METAL_LOG_LEVEL"] = "0"
-
 import re
+import json
+import fnmatch
+import subprocess
 from pathlib import Path
-from typing import Dict, List, Any
-from bs4 import BeautifulSoup
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
 
+from tools.git_object_reader import GitObjectReader, is_bare_repo
 from utils.config_loader import load_config
 from utils.logger import get_logger
+from utils.profiling import phase
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -20,54 +27,189 @@ EXTENSION_LANGUAGE_MAP = PARSER_CONFIG.get("extension_language_map", {})
 MAX_README_EXCERPT = PARSER_CONFIG.get("max_readme_excerpt_chars", 2000)
 MAX_LICENSE_EXCERPT = PARSER_CONFIG.get("max_license_excerpt_chars", 2000)
 NUM_KEYWORDS = PARSER_CONFIG.get("num_keywords", 10)
+SKIP_DIRS = set(PARSER_CONFIG.get("skip_dirs", [".git", "node_modules", "__pycache__", ".venv", "venv"]))
+MAX_MANIFEST_BYTES = PARSER_CONFIG.get("max_manifest_bytes", 262144)
+MAX_MANIFESTS = PARSER_CONFIG.get("max_manifests", 20)
+MAX_LOC_FILE_BYTES = PARSER_CONFIG.get("max_loc_file_bytes", 1048576)
+GIT_OBJECTS_COUNT_LINES = PARSER_CONFIG.get("git_objects_count_lines", False)
+MAX_CONDENSED_DEPENDENCIES = PARSER_CONFIG.get("max_condensed_dependencies", 15)
+
+README_NAMES = ["README.md", "README"]
+LICENSE_NAMES = ["LICENSE", "LICENSE.txt"]
+
+# Manifest file name pattern -> ecosystem
+MANIFEST_PATTERNS = {
+    "requirements*.txt": "python",
+    "pyproject.toml": "python",
+    "package.json": "javascript",
+    "Cargo.toml": "rust",
+    "go.mod": "go",
+}
 
 COMMON_WORDS = {
     "the", "and", "for", "with", "this", "that", "from", "are", "of",
     "to", "in", "is", "it", "on", "as", "by", "an", "be", "at", "or"
 }
 
-def extract_readme(repo_path: Path) -> str:
-    """Extracts the README content from a repository directory."""
-    for filename in ["README.md", "README"]:
-        readme_path = repo_path / filename
-        if readme_path.exists():
-            logger.debug(f"README file found: {readme_path}")
-            raw = readme_path.read_text(encoding='utf-8')
-        
-            #Clean HTML if necessary
-            soup = BeautifulSoup(raw, "html.parser")
-            text = soup.get_text(separator="\n")
-
-            # Remove empty lines or markdown clutter
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            cleaned = "\n".join(lines)
-
-            logger.info(f"Extracted and cleaned README content ({len(cleaned)}) chars)")
-            return cleaned
-        
-    logger.warning(f"No README file found in {repo_path}")
-    return "No README file found."
-
-def extract_license(repo_path: Path) -> str:
-    """Extracts the LICENSE content from a repository directory."""
-    for filename in ["LICENSE", "LICENSE.txt"]:
-        license_path = repo_path / filename
-        if license_path.exists():
-            logger.debug(f"LICENSE file found: {license_path}")
-            return license_path.read_text(encoding='utf-8')
-    logger.warning(f"No LICENSE file found in {repo_path}")
-    return "No LICENSE file found."
-
-def list_file_extensions(repo_path: Path) -> Dict[str, int]:
-    """Lists all file extensions in the repository and their counts."""
-    extensions = {}
-    for root, _, files in os.walk(repo_path):
+def clean_readme(raw: str) -> str:
+    """Strips HTML and blank lines from raw README text."""
+    from bs4 import BeautifulSoup
+
+    #Clean HTML if necessary
+    soup = BeautifulSoup(raw, "html.parser")
+    text = soup.get_text(separator="\n")
+
+    # Remove empty lines or markdown clutter
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    cleaned = "\n".join(lines)
+
+    logger.info("Extracted and cleaned README content (%d chars)", len(cleaned))
+    return cleaned
+
+class RepoFile(NamedTuple):
+    """One file of a repository listing: its repo-relative POSIX path, size, a source-specific read key and mtime."""
+    path: str
+    size: int
+    key: Any
+    mtime_ns: int = 0
+
+# Reads up to max_bytes of a file given its RepoFile.key; None if unreadable
+FileReader = Callable[[Any, int], Optional[bytes]]
+
+def walk_files(repo_path: Path) -> Iterator[RepoFile]:
+    """Lists a working tree, pruning SKIP_DIRS (.git, node_modules, ...) without descending into them."""
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
         for file in files:
-            ext = Path(file).suffix
-            if ext:
-                extensions[ext] = extensions.get(ext, 0) + 1
-    logger.debug(f"File extensions found: {extensions}")
-    return extensions
+            full_path = os.path.join(root, file)
+            if os.path.islink(full_path):
+                continue  # as in the git object store, a symlink is not file content
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue  # broken symlink
+            yield RepoFile(Path(full_path).relative_to(repo_path).as_posix(), stat.st_size, full_path, stat.st_mtime_ns)
+
+def read_local_file(key: Any, max_bytes: int) -> Optional[bytes]:
+    try:
+        with open(key, "rb") as f:
+            return f.read(max_bytes)
+    except OSError:
+        return None
+
+def manifest_ecosystem(path: str) -> Optional[str]:
+    name = path.rsplit("/", 1)[-1]
+    for pattern, ecosystem in MANIFEST_PATTERNS.items():
+        if fnmatch.fnmatch(name, pattern):
+            return ecosystem
+    return None
+
+def _requirement_name(spec: str) -> str:
+    return re.split(r"[<>=!~;\[\s@(]", spec.strip(), maxsplit=1)[0].strip()
+
+def parse_manifest(path: str, text: str) -> List[str]:
+    """Returns the dependency names declared in a manifest; unparsable manifests yield none."""
+    name = path.rsplit("/", 1)[-1]
+    try:
+        if name == "package.json":
+            data = json.loads(text)
+            return sorted(set(data.get("dependencies", {})) | set(data.get("devDependencies", {})))
+        if name == "go.mod":
+            block = re.findall(r"^require\s*\((.*?)^\)", text, flags=re.M | re.S)
+            lines = "\n".join(block).splitlines() + re.findall(r"^require\s+([^\s(]\S*\s+\S+)", text, flags=re.M)
+            return sorted({line.split()[0] for line in lines if line.strip() and not line.strip().startswith("//")})
+        if name.endswith(".toml"):
+            data = tomllib.loads(text)
+            if name == "Cargo.toml":
+                return sorted(set(data.get("dependencies", {})) | set(data.get("dev-dependencies", {})))
+            project = data.get("project", {})
+            specs = list(project.get("dependencies", []))
+            for group in project.get("optional-dependencies", {}).values():
+                specs.extend(group)
+            names = {_requirement_name(spec) for spec in specs}
+            names |= set(data.get("tool", {}).get("poetry", {}).get("dependencies", {})) - {"python"}
+            return sorted(n for n in names if n)
+        # requirements*.txt
+        names = set()
+        for line in text.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line and not line.startswith("-"):
+                names.add(_requirement_name(line))
+        return sorted(n for n in names if n)
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.warning("Could not parse manifest %s: %s", path, e)
+        return []
+
+def _count_loc(content: bytes) -> int:
+    if not content:
+        return 0
+    return content.count(b"\n") + (0 if content.endswith(b"\n") else 1)
+
+def scan_files(files: Iterable[RepoFile], read: FileReader, count_lines: bool = True) -> Dict[str, Any]:
+    """
+    Collects everything the summary needs from one pass over a file listing: extension
+    counts, per-language file/byte/LOC counts, notebook count, root README/LICENSE and
+    dependency manifests. With count_lines, source files are read once (up to
+    max_loc_file_bytes) to count lines; without it, language stats carry no "loc" and only
+    the listing's sizes are used. Manifests are only read afterwards, nearest to the root
+    first, capped in count and size.
+    """
+    file_types: Dict[str, int] = {}
+    language_stats: Dict[str, Dict[str, int]] = {}
+    notebook_count = 0
+    root_files: Dict[str, RepoFile] = {}
+    manifests: List[RepoFile] = []
+
+    for file in files:
+        name = file.path.rsplit("/", 1)[-1]
+        if "/" not in file.path:
+            root_files[name] = file
+        if manifest_ecosystem(file.path):
+            manifests.append(file)
+
+        ext = Path(name).suffix
+        if not ext:
+            continue
+        file_types[ext] = file_types.get(ext, 0) + 1
+        if ext.lower() == ".ipynb":
+            notebook_count += 1
+
+        language = EXTENSION_LANGUAGE_MAP.get(ext.lower())
+        if language is None:
+            continue
+        stats = language_stats.setdefault(language, {"files": 0, "bytes": 0, "loc": 0} if count_lines else {"files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += file.size
+        if count_lines and ext.lower() != ".ipynb" and 0 < file.size <= MAX_LOC_FILE_BYTES:
+            stats["loc"] += _count_loc(read(file.key, file.size) or b"")
+
+    dependencies: Dict[str, List[str]] = {}
+    manifests.sort(key=lambda f: (f.path.count("/"), f.path))
+    for manifest in manifests[:MAX_MANIFESTS]:
+        content = read(manifest.key, MAX_MANIFEST_BYTES)
+        if content is None:
+            continue
+        names = parse_manifest(manifest.path, content.decode("utf-8", errors="replace"))
+        ecosystem = manifest_ecosystem(manifest.path)
+        dependencies[ecosystem] = sorted(set(dependencies.get(ecosystem, [])) | set(names))
+
+    def _root_text(candidates: List[str]) -> Optional[str]:
+        for candidate in candidates:
+            if candidate in root_files:
+                content = read(root_files[candidate].key, root_files[candidate].size)
+                if content is not None:
+                    return content.decode("utf-8", errors="replace")
+        return None
+
+    return {
+        "file_types": file_types,
+        "language_stats": language_stats,
+        "notebook_count": notebook_count,
+        "manifests": [m.path for m in manifests],
+        "dependencies": dependencies,
+        "readme_raw": _root_text(README_NAMES),
+        "license_raw": _root_text(LICENSE_NAMES),
+    }
 
 def map_extensions_to_languages(extensions: Dict[str, int]) -> Dict[str, int]:
     """Maps file extensions to programming languages with usage counts."""
@@ -75,7 +217,7 @@ def map_extensions_to_languages(extensions: Dict[str, int]) -> Dict[str, int]:
     for ext, count in extensions.items():
         language = EXTENSION_LANGUAGE_MAP.get(ext.lower(), "Other")
         language_count[language] = language_count.get(language, 0) + count
-    logger.debug(f"Languages used in repository: {language_count}")
+    logger.debug("Languages used in repository: %s", language_count)
     return language_count
 
 def extract_keywords(text: str) -> List[str]:
@@ -90,36 +232,99 @@ def extract_keywords(text: str) -> List[str]:
     sorted_keywords = sorted(freq.items(), key=lambda item: item[1], reverse=True)
     top_keywords = [word for word, _ in sorted_keywords[:NUM_KEYWORDS]]
 
-    logger.debug(f"Extracted keywords: {top_keywords}")
+    logger.debug("Extracted keywords: %s", top_keywords)
     return top_keywords
 
-def parse_repository(repo_path: str) -> Dict[str, Any]:
-    """Parses the repository and returns a structured summary."""
-    repo = Path(repo_path)
-    if not repo.exists():
-        logger.error(f"Repository path does not exist: {repo_path}")
-        return {"error": f"Repository path {repo_path} does not exist."}
-    
-    logger.info(f"Parsing repository: {repo}")
+def build_summary(repository_name: str, scan: Dict[str, Any]) -> Dict[str, Any]:
+    """Turns a scan_files() result into the repository summary dict."""
+    if scan["readme_raw"] is not None:
+        readme = clean_readme(scan["readme_raw"])
+    else:
+        logger.warning("No README file found in %s", repository_name)
+        readme = "No README file found."
+    if scan["license_raw"] is not None:
+        license_info = scan["license_raw"]
+    else:
+        logger.warning("No LICENSE file found in %s", repository_name)
+        license_info = "No LICENSE file found."
 
-    readme = extract_readme(repo)
-    license_info = extract_license(repo)
-    file_types = list_file_extensions(repo)
+    # Most used first, so "main" languages and file types come first
+    file_types = dict(sorted(scan["file_types"].items(), key=lambda item: -item[1]))
     languages_used = map_extensions_to_languages(file_types)
+    languages_used = dict(sorted(languages_used.items(), key=lambda item: -item[1]))
     keywords = extract_keywords(readme) if readme else []
 
     summary = {
-        "repository_name": repo.name,
+        "repository_name": repository_name,
         "file_types": file_types,
         "languages_used": languages_used,
+        "language_stats": scan["language_stats"],
+        "notebook_count": scan["notebook_count"],
+        "manifests": scan["manifests"],
+        "dependencies": scan["dependencies"],
         "license_excerpt": license_info[:MAX_LICENSE_EXCERPT] + ("..." if len(license_info) > MAX_LICENSE_EXCERPT else ""),
         "keywords": keywords,
         "readme_excerpt": readme[:MAX_README_EXCERPT] + ("..." if len(readme) > MAX_README_EXCERPT else "")
     }
 
-    logger.debug(f"Repository summary generated: {summary}")
+    logger.debug("Repository summary generated: %s", summary)
     return summary
 
+# Summaries of bare repos by (git dir, commit): a commit's content never changes
+_git_summaries: Dict[tuple, Dict[str, Any]] = {}
+
+def parse_git_objects(git_dir: Path) -> Dict[str, Any]:
+    """Summarizes a bare repository's HEAD from its object store, without a working tree."""
+    with GitObjectReader(str(git_dir)) as reader:
+        try:
+            key = (str(git_dir.resolve()), reader.commit())
+        except subprocess.CalledProcessError:
+            logger.error("Bare repository has no commits: %s", git_dir)
+            return {"error": f"Repository {git_dir} has no commits."}
+        if key not in _git_summaries:
+            files = (RepoFile(*entry) for entry in reader.list_files(SKIP_DIRS))
+            name = git_dir.resolve().name
+            name = name[:-len(".git")] if name.endswith(".git") else name
+            # Line counts would mean a cat-file round trip per source blob; sizes come with ls-tree
+            _git_summaries[key] = build_summary(name, scan_files(files, reader.read, GIT_OBJECTS_COUNT_LINES))
+    return dict(_git_summaries[key])
+
+# Latest summary per working tree: resolved path -> (tree fingerprint, summary)
+_tree_summaries: Dict[str, tuple] = {}
+
+def parse_working_tree(repo: Path) -> Dict[str, Any]:
+    """
+    Summarizes a checkout. The listing (paths, sizes, mtimes) is its fingerprint, so an
+    unchanged tree is only walked, not read again.
+    """
+    files = list(walk_files(repo))
+    fingerprint = hash(tuple(files))
+    key = str(repo.resolve())
+    cached = _tree_summaries.get(key)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, build_summary(repo.resolve().name, scan_files(files, read_local_file)))
+        _tree_summaries[key] = cached
+    else:
+        logger.debug("Repository unchanged since last parse: %s", repo)
+    return dict(cached[1])
+
+@phase("repo_parse")
+def parse_repository(repo_path: str) -> Dict[str, Any]:
+    """
+    Parses the repository in a single pass over its tree and returns a structured summary.
+    Bare repositories are read from the git object store and yield the same summary.
+    Summaries are reused while the commit (bare) or the file listing (checkout) is unchanged.
+    """
+    repo = Path(repo_path)
+    if not repo.exists():
+        logger.error("Repository path does not exist: %s", repo_path)
+        return {"error": f"Repository path {repo_path} does not exist."}
+    
+    logger.info("Parsing repository: %s", repo)
+    if is_bare_repo(repo):
+        return parse_git_objects(repo)
+    return parse_working_tree(repo)
+
 def format_repo_summary(summary: Dict[str, Any]) -> str:
     """Formats the repository summary into a human-readable string."""
     languages = ', '.join([f"{lang} ({count})" for lang, count in summary.get("languages_used", {}).items()])
@@ -144,6 +349,7 @@ def condense_repo_summary(summary: Dict[str, Any]) -> str:
     languages = ', '.join(list(summary.get("languages_used", {}).keys())[:3]) or "Unknown Languages"
     file_types = ', '.join(list(summary.get("file_types", {}).keys())[:3]) or "Unknown File Types"
     keywords = ', '.join(summary.get("keywords", [])[:5]) or "No Keywords"
+    dependencies = sorted({name for names in summary.get("dependencies", {}).values() for name in names})
 
     # Improve project summary extraction
     readme_excerpt = summary.get("readme_excerpt", "")
@@ -181,6 +387,12 @@ def condense_repo_summary(summary: Dict[str, Any]) -> str:
         f"Main Languages: {languages}\n"
         f"File Types: {file_types}\n"
         f"Top Keywords: {keywords}\n"
-        f"Project Summary: {project_summary}"
     )
+    if dependencies:
+        shown = dependencies[:MAX_CONDENSED_DEPENDENCIES]
+        more = len(dependencies) - len(shown)
+        condensed += f"Dependencies: {', '.join(shown)}" + (f" (+{more} more)" if more > 0 else "") + "\n"
+    if summary.get("notebook_count"):
+        condensed += f"Notebooks: {summary['notebook_count']}\n"
+    condensed += f"Project Summary: {project_summary}"
     return condensed
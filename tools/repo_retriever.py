@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.git_object_reader import GitObjectReader, is_bare_repo
+from tools.repo_parser import (
+    EXTENSION_LANGUAGE_MAP, README_NAMES, SKIP_DIRS, RepoFile, manifest_ecosystem, read_local_file, walk_files
+)
+from utils.config_loader import load_config
+from utils.logger import get_logger
+from utils.profiling import phase
+
+logger = get_logger(__name__)
+
+DOC_EXTENSIONS = {".md", ".rst", ".txt"}
+# Languages whose files describe data or configuration rather than what the code does
+NON_SOURCE_LANGUAGES = {"JSON", "YAML", "Markdown", "Jupyter Notebook"}
+ENTRYPOINT_STEMS = {"main", "app", "server", "cli", "__main__", "index", "pipeline", "graph"}
+DEFAULT_ANALYSIS_QUERY = "What the project does, its main components, how they fit together and the technologies it uses"
+
+
+def _file_rank(file: RepoFile) -> Optional[Tuple[int, int, str]]:
+    """Sort key for picking the files worth indexing; None for files never indexed."""
+    path = file.path
+    name = path.rsplit("/", 1)[-1]
+    depth = path.count("/")
+    ext = Path(name).suffix.lower()
+    parts = path.lower().split("/")[:-1]
+    if file.size == 0 or manifest_ecosystem(path) or name.upper().startswith("LICENSE"):
+        return None
+    if depth == 0 and name in README_NAMES:
+        return (0, depth, path)
+    if ext in DOC_EXTENSIONS and (depth == 0 or parts[0] in ("docs", "doc")):
+        return (1, depth, path)
+    language = EXTENSION_LANGUAGE_MAP.get(ext)
+    if language is None or language in NON_SOURCE_LANGUAGES:
+        return None
+    tests = any(part in ("test", "tests", "examples") for part in parts)
+    if Path(name).stem.lower() in ENTRYPOINT_STEMS and not tests:
+        return (2, depth, path)
+    return (4 if tests else 3, depth, path)
+
+
+def select_files(files, max_files: int) -> List[RepoFile]:
+    """The root README and docs first, then entry points and other sources nearest the root."""
+    ranked = [(rank, file) for file in files for rank in [_file_rank(file)] if rank is not None]
+    ranked.sort(key=lambda item: item[0])
+    return [file for _, file in ranked[:max_files]]
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int = 0) -> List[str]:
+    """
+    Splits text into chunks of at most chunk_chars, breaking between lines where possible.
+    Consecutive chunks share up to overlap_chars of trailing lines.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in text.splitlines():
+        while len(line) > chunk_chars:  # minified code, long paragraphs
+            line, rest = line[:chunk_chars], line[chunk_chars:]
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line)
+            line = rest
+        if current and size + len(line) + 1 > chunk_chars:
+            chunks.append("\n".join(current))
+            carried: List[str] = []
+            carried_size = 0
+            for previous in reversed(current):
+                if carried_size + len(previous) + 1 > overlap_chars:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous) + 1
+            current, size = carried, carried_size
+        current.append(line)
+        size += len(line) + 1
+    if current and any(line.strip() for line in current):
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class RepoChunkIndex:
+    """Chunks of one repository snapshot and their normalised embeddings, in the same order."""
+
+    def __init__(self, key: str, chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        self.key = key
+        self.chunks = chunks
+        self.vectors = vectors
+
+    def search(self, query_vector: np.ndarray, k: int) -> List[Dict[str, Any]]:
+        if not self.chunks or k <= 0:
+            return []
+        scores = self.vectors @ np.asarray(query_vector, dtype=np.float32)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [{**self.chunks[i], "score": round(float(scores[i]), 4)} for i in top]
+
+
+class RepoRetriever:
+    """
+    Retrieval over a repository's own files for the analyzer and aggregate-query prompts.
+
+    Up to `rag_summarizer.max_files` files (README and docs, then entry points and other
+    sources nearest the root) are read up to `max_file_chars` each, split into chunks and
+    embedded once. The index is keyed by a hash of the selected files' paths and contents
+    plus the chunking and embeddings settings, and kept on disk under `index_dir`, so an
+    unchanged repository is never re-embedded; only the query is encoded per call.
+    """
+
+    def __init__(self, detector=None, index_dir: Optional[str] = None, config_file: str = "config/config.yaml"):
+        config = load_config(config_file)
+        self.config_file = config_file
+        self.config = config.get("rag_summarizer", {})
+        self.embeddings_config = config.get("embeddings", {})
+        self.enabled = self.config.get("enabled", True)
+        self.max_files = self.config.get("max_files", 8)
+        self.max_file_chars = self.config.get("max_file_chars", 4000)
+        self.chunk_chars = self.config.get("chunk_chars", 800)
+        self.chunk_overlap = self.config.get("chunk_overlap_chars", 100)
+        self.top_k = self.config.get("top_k", 4)
+        self.max_context_chars = self.config.get("max_context_chars", 3000)
+        self.analysis_query = self.config.get("analysis_query", DEFAULT_ANALYSIS_QUERY)
+        self.index_dir = Path(index_dir or self.config.get("index_dir", "output/rag_index"))
+        self._detector = detector
+        self._indexes: "OrderedDict[str, RepoChunkIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            from tools.semantic_trend_detector import SemanticTrendDetector
+            self._detector = SemanticTrendDetector(config_path=self.config_file)
+        return self._detector
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    def read_files(self, repo_path: str) -> List[Tuple[str, str]]:
+        """(path, text) of the files selected for indexing, each cut to max_file_chars."""
+        repo = Path(repo_path)
+        if not repo.exists():
+            return []
+        # UTF-8 needs at most 4 bytes per character
+        max_bytes = self.max_file_chars * 4
+        if is_bare_repo(repo):
+            with GitObjectReader(str(repo)) as reader:
+                files = select_files((RepoFile(*entry) for entry in reader.list_files(SKIP_DIRS)), self.max_files)
+                contents = [(file.path, reader.read(file.key, max_bytes)) for file in files]
+        else:
+            files = select_files(walk_files(repo), self.max_files)
+            contents = [(file.path, read_local_file(file.key, max_bytes)) for file in files]
+        return [
+            (path, content.decode("utf-8", errors="replace")[:self.max_file_chars])
+            for path, content in contents if content and b"\0" not in content[:1024]
+        ]
+
+    def fingerprint(self, repo_path: str) -> str:
+        """Identifies the index a repository maps to: its selected files plus the settings that shape chunks."""
+        return self._fingerprint(self.read_files(repo_path))
+
+    def cache_inputs(self, repo_path: str) -> Dict[str, Any]:
+        """What a prompt's retrieved excerpts depend on, for node cache keys; empty when retrieval is off."""
+        if not self.enabled or not repo_path:
+            return {}
+        return {"index": self.fingerprint(repo_path), "config": self.config}
+
+    def _fingerprint(self, files: List[Tuple[str, str]]) -> str:
+        digest = hashlib.sha256(json.dumps({
+            "max_file_chars": self.max_file_chars,
+            "chunk_chars": self.chunk_chars,
+            "chunk_overlap": self.chunk_overlap,
+            "model": self.embeddings_config.get("model_name"),
+            "backend": self.embeddings_config.get("backend", "torch"),
+        }, sort_keys=True).encode())
+        for path, text in files:
+            digest.update(b"\0" + path.encode() + b"\0" + text.encode("utf-8", errors="surrogatepass"))
+        return digest.hexdigest()[:32]
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+    def index(self, repo_path: str) -> RepoChunkIndex:
+        """Returns the repository's chunk index, building and storing it on first use."""
+        files = self.read_files(repo_path)
+        key = self._fingerprint(files)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+
+        index = self._load(key)
+        if index is None:
+            chunks = [
+                {"path": path, "text": chunk}
+                for path, text in files
+                for chunk in chunk_text(text, self.chunk_chars, self.chunk_overlap)
+            ]
+            with phase("rag_index"):
+                vectors = (
+                    self.detector.encode([f"{chunk['path']}\n{chunk['text']}" for chunk in chunks])
+                    if chunks else np.empty((0, 0), dtype=np.float32)
+                )
+            index = RepoChunkIndex(key, chunks, np.asarray(vectors, dtype=np.float32))
+            self._save(index)
+            logger.info("Indexed %d chunks from %d files of %s", len(chunks), len(files), repo_path)
+
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > 32:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _load(self, key: str) -> Optional[RepoChunkIndex]:
+        chunks_path = self.index_dir / f"{key}.json"
+        vectors_path = self.index_dir / f"{key}.npy"
+        if not (chunks_path.exists() and vectors_path.exists()):
+            return None
+        try:
+            chunks = json.loads(chunks_path.read_text(encoding="utf-8"))
+            vectors = np.load(vectors_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable retrieval index %s: %s", key, e)
+            return None
+        if len(chunks) != vectors.shape[0]:
+            return None
+        return RepoChunkIndex(key, chunks, vectors)
+
+    def _save(self, index: RepoChunkIndex) -> None:
+        """Writes the index files atomically; a failed write only costs a re-embed next time."""
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            tmp_vectors = self.index_dir / f".{index.key}.npy.tmp"
+            tmp_chunks = self.index_dir / f".{index.key}.json.tmp"
+            with open(tmp_vectors, "wb") as f:
+                np.save(f, index.vectors)
+            tmp_chunks.write_text(json.dumps(index.chunks), encoding="utf-8")
+            os.replace(tmp_vectors, self.index_dir / f"{index.key}.npy")
+            os.replace(tmp_chunks, self.index_dir / f"{index.key}.json")
+        except OSError as e:
+            logger.warning("Could not store retrieval index %s: %s", index.key, e)
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+    def retrieve(self, repo_path: str, query: Optional[str] = None, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the chunks of a repository closest to the query, best first.
+
+        Args:
+            repo_path (str): Local working tree or bare repository.
+            query (Optional[str]): Defaults to `rag_summarizer.analysis_query`.
+            k (Optional[int]): Defaults to `rag_summarizer.top_k`.
+
+        Returns:
+            List[Dict]: Chunks with 'path', 'text' and 'score' (cosine similarity).
+        """
+        index = self.index(repo_path)
+        if not index.chunks:
+            return []
+        query_vector = self.detector.encode(query or self.analysis_query)
+        return index.search(query_vector, k or self.top_k)
+
+    def context(self, repo_path: str, query: Optional[str] = None) -> str:
+        """
+        Retrieved chunks formatted for a prompt, capped at max_context_chars; empty when
+        retrieval is disabled or fails, so the prompt falls back to the summary alone.
+        """
+        if not self.enabled or not repo_path:
+            return ""
+        try:
+            chunks = self.retrieve(repo_path, query)
+        except Exception as e:
+            logger.warning("Retrieval over %s failed: %s", repo_path, e)
+            return ""
+        return format_chunks(chunks, self.max_context_chars)
+
+
+def format_chunks(chunks: List[Dict[str, Any]], max_chars: int) -> str:
+    """Chunks as '[path]' headed excerpts, in relevance order, dropping those that no longer fit."""
+    parts: List[str] = []
+    used = 0
+    for chunk in chunks:
+        part = f"[{chunk['path']}]\n{chunk['text'].strip()}"
+        if used + len(part) > max_chars:
+            continue
+        parts.append(part)
+        used += len(part) + 2
+    return "\n\n".join(parts)
+
+
+_retriever: Optional[RepoRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_repo_retriever() -> RepoRetriever:
+    """The process-wide retriever, so its in-memory indexes are shared across agents."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = RepoRetriever()
+        return _retriever
@@ -1,10 +1,18 @@
-import yaml
-from pathlib import Path
+import logging
+import numpy as np
 from collections import defaultdict
 from typing import List, Optional, Union
-from sentence_transformers import SentenceTransformer, util
 
-CATEGORY_MAP = {
+from tools.embedding_backends import cosine_similarity, load_embedding_backend
+from tools.lexical_tagger import LexicalTagger
+from utils.config_loader import load_config
+from utils.logger import get_logger
+from utils.model_manager import get_model_manager
+from utils.profiling import phase
+
+logger = get_logger(__name__)
+
+DEFAULT_CATEGORY_MAP = {
     "LangGraph": "Frameworks",
     "LangChain": "Frameworks",
     "Crewai": "Frameworks",
@@ -20,6 +28,8 @@ CATEGORY_MAP = {
     "Fine-tuning": "Workflows",
     }
 
+CATEGORY_MAP = load_config().get("trends", {}).get("categories") or DEFAULT_CATEGORY_MAP
+
 class SemanticTrendDetector:
     def __init__(self, config_path: str = "config/config.yaml"):
         self.config = self._load_config(config_path)
@@ -27,21 +37,37 @@ class SemanticTrendDetector:
         self.top_k = self.config["embeddings"]["top_k"]
         self.score_threshold = self.config["embeddings"].get("score_threshold", 0.25)
 
-        self.model = SentenceTransformer(self.model_name)
-        self.base_tags = [
-            "LangGraph","LangChain", "Crewai", "Vector DB",
-            "RAG", "Llama", "OpenAI", "GPT", "Embeddings",
-            "Retrieval-Augmented Generation", "Faiss", "ChromaDB", "Weaviate",
-            "Retrieval","Fine-tuning","Evaluation","Transformer"
-        ]
-    
+        trends_config = self.config.get("trends", {})
+        self.base_tags = list(trends_config.get("categories") or DEFAULT_CATEGORY_MAP)
+        self.min_lexical_tags = trends_config.get("min_lexical_tags", 2)
+        self.tagger = LexicalTagger(self.base_tags, trends_config.get("aliases", {}))
+        # Every detector with the same embeddings config shares one model through the manager
+        self._model_key = f"embeddings:{self.config['embeddings'].get('backend', 'torch')}:{self.model_name}"
+        self._estimated_bytes = int(
+            self.config.get("model_manager", {}).get("embeddings_estimate_mb", 400) * 1024 * 1024
+        )
+
     def _load_config(self, path: str) -> dict:
         try:
-            with open(Path(path), "r") as f:
-                return yaml.safe_load(f)
+            return load_config(path)
         except Exception as e:
             raise RuntimeError(f"Error loading config from {path}: {e}")
 
+    @phase("embedding")
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Returns L2-normalised float32 embeddings for a text or a list of texts."""
+        single = isinstance(texts, str)
+        # Loaded on first use: texts the lexical tagger covers never need it
+        with get_model_manager().use(
+            self._model_key,
+            lambda: load_embedding_backend(self.config["embeddings"]),
+            self._estimated_bytes,
+            kind="embeddings",
+            footprint=lambda backend: backend.footprint_bytes(),
+        ) as backend:
+            embeddings = backend.encode([texts] if single else list(texts))
+        return embeddings[0] if single else embeddings
+
     def detect_trends(
         self,
         text: str,
@@ -49,21 +75,29 @@ class SemanticTrendDetector:
         score_threshold: Optional[float] = None,
         return_scores: bool = False
     ) -> Union[List[str], List[tuple]]:
-        tags = list(set(self.base_tags + (additional_candidate_tags or [])))
-        text_embedding = self.model.encode(text, convert_to_tensor=True)
-        tag_embeddings = self.model.encode(tags, convert_to_tensor=True)
+        """
+        Tags named in the text (score 1.0), plus embedding matches when fewer than
+        `trends.min_lexical_tags` tags are named.
+        """
+        lexical_tags = self.tagger.tag(text)
+        if additional_candidate_tags:
+            lexical_tags += [tag for tag in LexicalTagger(additional_candidate_tags).tag(text) if tag not in lexical_tags]
+        sorted_filtered = [(tag, 1.0) for tag in lexical_tags]
 
-        similarities = util.pytorch_cos_sim(text_embedding, tag_embeddings)[0]
-        scored_tags = list(zip(tags, similarities.tolist()))
+        if len(lexical_tags) < self.min_lexical_tags:
+            # Too little named outright: add tags the text is semantically close to
+            tags = list(set(self.base_tags + (additional_candidate_tags or [])))
+            embeddings = self.encode([text] + tags)
+            similarities = cosine_similarity(embeddings[0], embeddings[1:])[0]
+            scored_tags = list(zip(tags, similarities.tolist()))
 
-        threshold = score_threshold if score_threshold is not None else self.score_threshold
-        filtered = [(tag, score) for tag, score in scored_tags if score >= threshold]
-        sorted_filtered = sorted(filtered, key=lambda x: x[1], reverse=True)
+            threshold = score_threshold if score_threshold is not None else self.score_threshold
+            filtered = [(tag, score) for tag, score in scored_tags if score >= threshold and tag not in lexical_tags]
+            sorted_filtered += sorted(filtered, key=lambda x: x[1], reverse=True)
 
         # 🔍 Log matches
-        print("\n[DEBUG] Trend Detector Matches:")
-        for tag, score in sorted_filtered:
-            print(f"  - {tag} ({score:.3f})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trend Detector Matches: %s", ", ".join(f"{tag} ({score:.3f})" for tag, score in sorted_filtered))
 
         if return_scores:
             return sorted_filtered
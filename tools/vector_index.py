@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process are still serialized by the thread lock
+    fcntl = None
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+ENTRIES_FILE = "entries.json"
+LOCK_FILE = ".lock"
+
+
+class RepoVectorIndex:
+    """
+    Persistent nearest-neighbour index of analyzed repositories.
+
+    Each repository is stored as one row of a float32 matrix (memory-mapped from
+    disk) holding the normalised embedding of its analysis, alongside a JSON list
+    of entries with the repo id, trends and metadata in the same row order.
+    FAISS is used for search when installed and enabled; NumPy otherwise.
+
+    Several processes (API, CLI, batch workers) may share one directory: writers hold an
+    exclusive lock on its lock file and re-read the index before merging their rows in,
+    and readers reload it when another process has written since they last looked.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, detector=None, config_file: str = "config/config.yaml"):
+        """
+        Args:
+            index_dir (Optional[str]): Directory holding the index files; falls back to config.
+            detector (Optional[SemanticTrendDetector]): Detector whose model embeds analyses.
+                Created lazily on first insert/text query when not provided.
+            config_file (str): Path to the configuration YAML file.
+        """
+        self.config_file = config_file
+        self.config = load_config(config_file).get("vector_index", {})
+        self.index_dir = Path(index_dir or self.config.get("index_dir", "output/vector_index"))
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.use_faiss = self.config.get("use_faiss", "auto")
+        self._detector = detector
+        self._lock = threading.RLock()
+        self._faiss_index = None
+        with self._file_lock(shared=True):
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _file_lock(self, shared: bool = False) -> Iterator[None]:
+        """Cross-process lock on the index directory: shared for reading, exclusive for writing."""
+        with open(self.index_dir / LOCK_FILE, "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _disk_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.index_dir / ENTRIES_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        """Reloads the index if another instance or process has written it since it was loaded."""
+        if self._disk_stamp() != self._loaded_stamp:
+            with self._file_lock(shared=True):
+                self._load()
+
+    def _load(self) -> None:
+        entries_path = self.index_dir / ENTRIES_FILE
+        vectors_path = self.index_dir / VECTORS_FILE
+
+        self.entries: List[Dict[str, Any]] = []
+        self.vectors: Optional[np.ndarray] = None
+
+        if entries_path.exists() and vectors_path.exists():
+            self.entries = json.loads(entries_path.read_text(encoding="utf-8"))
+            self.vectors = np.load(vectors_path, mmap_mode="r")
+            if len(self.entries) != self.vectors.shape[0]:
+                raise RuntimeError(
+                    f"Vector index at {self.index_dir} is inconsistent: "
+                    f"{len(self.entries)} entries vs {self.vectors.shape[0]} vectors"
+                )
+        self._positions = {entry["repo_id"]: i for i, entry in enumerate(self.entries)}
+        self._faiss_index = None
+        self._loaded_stamp = self._disk_stamp()
+        logger.debug("Loaded vector index with %d repositories from %s", len(self.entries), self.index_dir)
+
+    def _save(self, vectors: np.ndarray, entries: List[Dict[str, Any]]) -> None:
+        """Writes the matrix and entries atomically, then re-opens the matrix memory-mapped."""
+        vectors_path = self.index_dir / VECTORS_FILE
+        entries_path = self.index_dir / ENTRIES_FILE
+        tmp_vectors = self.index_dir / f".{VECTORS_FILE}.tmp"
+        tmp_entries = self.index_dir / f".{ENTRIES_FILE}.tmp"
+
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+        tmp_entries.write_text(json.dumps(entries), encoding="utf-8")
+
+        # Release the old mapping before replacing the file underneath it
+        self.vectors = None
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_entries, entries_path)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------
+    @property
+    def detector(self):
+        if self._detector is None:
+            from tools.semantic_trend_detector import SemanticTrendDetector
+            self._detector = SemanticTrendDetector(config_path=self.config_file)
+        return self._detector
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+    def upsert(self, repo_id: str, analysis: str, trends: str = "", metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Inserts a repository or replaces its existing row."""
+        self.upsert_many([{"repo_id": repo_id, "analysis": analysis, "trends": trends, "metadata": metadata}])
+
+    def upsert_many(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Inserts or replaces several repositories with a single embedding batch and a single write.
+
+        Args:
+            items (List[Dict]): Dicts with 'repo_id', 'analysis' and optional 'trends' and 'metadata'.
+        """
+        items = [item for item in items if item.get("repo_id") and item.get("analysis")]
+        if not items:
+            return
+
+        embeddings = self.detector.encode([item["analysis"] for item in items])
+        analyzed_at = datetime.now(timezone.utc).isoformat()
+
+        with self._lock, self._file_lock():
+            # Start from what is on disk now, so rows other processes added are kept
+            self._load()
+            vectors = np.array(self.vectors) if self.vectors is not None else np.empty((0, embeddings.shape[1]), dtype=np.float32)
+            entries = list(self.entries)
+            positions = dict(self._positions)
+
+            new_rows = []
+            for item, embedding in zip(items, embeddings):
+                entry = {
+                    "repo_id": item["repo_id"],
+                    "trends": item.get("trends") or "",
+                    "metadata": item.get("metadata") or {},
+                    "analyzed_at": analyzed_at,
+                }
+                if item["repo_id"] in positions:
+                    row = positions[item["repo_id"]]
+                    vectors[row] = embedding
+                    entries[row] = entry
+                else:
+                    positions[item["repo_id"]] = len(entries) + len(new_rows)
+                    new_rows.append((entry, embedding))
+
+            if new_rows:
+                entries.extend(entry for entry, _ in new_rows)
+                vectors = np.vstack([vectors, np.stack([embedding for _, embedding in new_rows])])
+
+            self._save(vectors, entries)
+        logger.info("Indexed %d repositories (%d total)", len(items), len(self.entries))
+
+    def delete(self, repo_id: str) -> bool:
+        """Removes a repository from the index. Returns False if it was not indexed."""
+        with self._lock, self._file_lock():
+            self._load()
+            row = self._positions.get(repo_id)
+            if row is None:
+                return False
+            vectors = np.delete(np.array(self.vectors), row, axis=0)
+            entries = self.entries[:row] + self.entries[row + 1:]
+            self._save(vectors, entries)
+        logger.info("Removed %s from vector index", repo_id)
+        return True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.entries)
+
+    def __contains__(self, repo_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return repo_id in self._positions
+
+    def get(self, repo_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            row = self._positions.get(repo_id)
+            return dict(self.entries[row]) if row is not None else None
+
+    def _faiss(self):
+        if self.use_faiss is False or self.use_faiss == "never":
+            return None
+        if self._faiss_index is None:
+            try:
+                import faiss
+            except ImportError:
+                if self.use_faiss is True:
+                    logger.warning("use_faiss is enabled but faiss is not installed; using NumPy search.")
+                self.use_faiss = False
+                return None
+            index = faiss.IndexFlatIP(self.vectors.shape[1])
+            index.add(np.ascontiguousarray(self.vectors, dtype=np.float32))
+            self._faiss_index = index
+        return self._faiss_index
+
+    def _search(self, query_vector: np.ndarray, k: int):
+        index = self._faiss()
+        if index is not None:
+            scores, rows = index.search(query_vector.reshape(1, -1).astype(np.float32), k)
+            return [(int(r), float(s)) for r, s in zip(rows[0], scores[0]) if r >= 0]
+
+        scores = self.vectors @ query_vector
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(r), float(scores[r])) for r in top]
+
+    def query(self, repo_id: Optional[str] = None, text: Optional[str] = None, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Returns the k repositories closest to an indexed repo or to free text.
+
+        Args:
+            repo_id (Optional[str]): Id of an indexed repository; it is excluded from its own results.
+            text (Optional[str]): Free text to embed and search with when no repo_id is given.
+            k (int): Number of neighbours to return.
+
+        Returns:
+            List[Dict]: Entries with an added 'score' (cosine similarity), best first.
+        """
+        with self._lock:
+            self._refresh()
+            if not self.entries:
+                return []
+
+            if repo_id is not None:
+                row = self._positions.get(repo_id)
+                if row is None:
+                    raise KeyError(f"Repository not indexed: {repo_id}")
+                query_vector = np.asarray(self.vectors[row], dtype=np.float32)
+                hits = self._search(query_vector, min(k + 1, len(self.entries)))
+                hits = [(r, s) for r, s in hits if r != row][:k]
+            elif text:
+                query_vector = self.detector.encode(text)
+                hits = self._search(query_vector, min(k, len(self.entries)))
+            else:
+                raise ValueError("Either repo_id or text must be provided.")
+
+            return [{**self.entries[r], "score": round(s, 4)} for r, s in hits]
+
+
+_shared_index: Optional[RepoVectorIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_repo_index(detector=None) -> RepoVectorIndex:
+    """Returns the process-wide index, opening it on first use."""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = RepoVectorIndex(detector=detector)
+        return _shared_index
+
+
+def index_session_results(repo_entries: List[Dict[str, Any]]) -> None:
+    """
+    Adds freshly analyzed repositories to the shared index when indexing is enabled.
+    Failures are logged rather than raised so indexing never breaks an analysis run.
+    """
+    try:
+        if not load_config().get("vector_index", {}).get("enabled", False):
+            return
+        get_repo_index().upsert_many(repo_entries)
+    except Exception as e:
+        logger.warning("Failed to update vector index: %s", e)
@@ -0,0 +1,146 @@
+import contextvars
+import subprocess
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+class SessionCancelled(Exception):
+    """Raised inside a session whose cancel token was triggered."""
+
+
+class DeadlineExceeded(SessionCancelled):
+    """Raised inside a session that ran past its deadline."""
+
+
+class CancelToken:
+    """
+    Cancellation flag plus optional deadline for one session.
+
+    Long-running work (graph nodes, git subprocesses, token generation, HTTP retries) polls
+    the token of the current scope and stops at the next safe point once it fires.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None, parent: Optional["CancelToken"] = None):
+        """
+        Args:
+            deadline_seconds (Optional[float]): Time budget from now; None for none.
+            parent (Optional[CancelToken]): A token this one also fires with, e.g. the session's
+                token for a shorter per-call deadline.
+        """
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.timed_out = False
+        self.deadline: Optional[float] = None
+        self.parent = parent
+        # Tokens derived from this one, woken from their wait() when this one fires
+        self._children: "weakref.WeakSet[CancelToken]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        if parent is not None:
+            with parent._lock:
+                parent._children.add(self)
+        self.set_deadline(deadline_seconds)
+
+    def set_deadline(self, seconds: Optional[float]) -> None:
+        """Bounds the work from now on to `seconds`; None removes the deadline."""
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+            with self._lock:
+                children = list(self._children)
+            for child in children:
+                child.timed_out = child.timed_out or self.timed_out
+                child.cancel(reason)
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set():
+            if self.parent is not None and self.parent.cancelled:
+                self.timed_out = self.parent.timed_out
+                self.cancel(self.parent.reason)
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.timed_out = True
+                self.cancel("deadline exceeded")
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (or the parent's, if sooner), or None without one."""
+        remaining = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+        parent_remaining = self.parent.remaining() if self.parent is not None else None
+        if remaining is None or parent_remaining is None:
+            return remaining if parent_remaining is None else parent_remaining
+        return min(remaining, parent_remaining)
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise (DeadlineExceeded if self.timed_out else SessionCancelled)(self.reason)
+
+    def wait(self, seconds: float) -> bool:
+        """Sleeps up to `seconds`, waking early on cancellation or deadline. Returns self.cancelled."""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        return self.cancelled
+
+
+_current_token: contextvars.ContextVar = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancelToken):
+    """Makes `token` the current token for everything run inside the block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def check_cancelled() -> None:
+    """Raises SessionCancelled / DeadlineExceeded if the current scope's token fired."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """The smaller of `default` and the current deadline's remaining seconds."""
+    token = _current_token.get()
+    remaining = token.remaining() if token is not None else None
+    if remaining is None:
+        return default
+    return remaining if default is None else min(default, remaining)
+
+
+def run_cancellable(args: List[str], poll_interval: float = 0.2, **popen_kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(check=True) that kills the child as soon as the current token fires.
+
+    Raises:
+        SessionCancelled: The token fired while the command was running.
+        subprocess.CalledProcessError: The command exited non-zero.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.check()  # never start a command for a session that is already over
+    with subprocess.Popen(args, **popen_kwargs) as process:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                if token is not None and token.cancelled:
+                    process.kill()
+                    process.communicate()
+                    token.check()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
@@ -1,9 +1,27 @@
+import copy
+import threading
 import yaml
 from pathlib import Path
 
+# libyaml's loader when PyYAML was built with it; several times faster than the pure-Python one
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Parsed configs by path, re-read when the file's mtime or size changes. Almost every
+# module loads the config at import time, so this keeps cold start to one parse.
+_cache = {}
+_cache_lock = threading.Lock()
+
 def load_config(config_file: str = "config/config.yaml") -> dict:
     config_path = Path(config_file)
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found at {config_file}")
-    with open(config_path, "r") as f:
-        return yaml.safe_load(f)
\ No newline at end of file
+    stat = config_path.stat()
+    key = str(config_path.resolve())
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+            with open(config_path, "r") as f:
+                cached = ((stat.st_mtime_ns, stat.st_size), yaml.load(f, Loader=_Loader))
+            _cache[key] = cached
+    # Callers own their copy and may modify it
+    return copy.deepcopy(cached[1])
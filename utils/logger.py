@@ -1,8 +1,165 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import List, Optional, Tuple
 from utils.config_loader import load_config
 
+PROMPT_LOGGER_NAME = "cross_pub_insight.prompts"
+
+# Correlation ids attached to every record emitted within a session / graph node
+_session_id: contextvars.ContextVar = contextvars.ContextVar("log_session_id", default=None)
+_node: contextvars.ContextVar = contextvars.ContextVar("log_node", default=None)
+
+_setup_lock = threading.Lock()
+_main_handlers: Optional[List[logging.Handler]] = None
+_prompt_handlers: Optional[List[logging.Handler]] = None
+_prompt_config: dict = {}
+# (queue handler, listener) pairs of the async handlers, so a forked child can restart them
+_listeners: List[Tuple[logging.handlers.QueueHandler, logging.handlers.QueueListener]] = []
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current session and node ids (on the emitting thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = _session_id.get()
+        record.node = _node.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, session/node ids."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "session_id": getattr(record, "session_id", None),
+            "node": getattr(record, "node", None),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:  # formatted before crossing the log queue
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _formatter(logging_config: dict) -> logging.Formatter:
+    if logging_config.get("format", "text") == "json":
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+
+def _file_handler(log_file: str, formatter: logging.Formatter) -> logging.Handler:
+    log_file_path = Path(log_file)
+    log_file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    return file_handler
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback apart from the message. The stock one formats
+    exc_info into the message text, which leaves JSON records without their exc_info field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _frontend(handlers: List[logging.Handler], use_queue: bool) -> List[logging.Handler]:
+    """
+    Returns the handlers loggers should attach. In async mode that is a single QueueHandler
+    whose listener thread does the actual stream/file I/O off the calling thread.
+    """
+    if not use_queue:
+        for handler in handlers:
+            handler.addFilter(ContextFilter())
+        return handlers
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append((queue_handler, listener))
+    return [queue_handler]
+
+
+def _restart_listeners_in_child() -> None:
+    """
+    A forked child (e.g. a batch process worker) inherits the queue handlers but not the
+    listener threads draining them: give each its own queue and listener there.
+    """
+    global _setup_lock
+    _setup_lock = threading.Lock()
+    for queue_handler, listener in _listeners:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler.queue = log_queue
+        listener.queue = log_queue
+        listener._thread = None
+        listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners_in_child)
+
+
+def _ensure_handlers(logging_config: dict) -> None:
+    """Builds the process-wide handlers once; every logger shares them."""
+    global _main_handlers, _prompt_handlers, _prompt_config
+    with _setup_lock:
+        if _main_handlers is not None:
+            return
+
+        formatter = _formatter(logging_config)
+        use_queue = logging_config.get("async", True)
+
+        # Console handler
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+
+        # File handler
+        file_handler = _file_handler(logging_config.get("log_file", "output/project.log"), formatter)
+        _main_handlers = _frontend([console_handler, file_handler], use_queue)
+
+        _prompt_config = logging_config.get("prompt_log", {})
+        if _prompt_config.get("enabled", False):
+            prompt_file = _file_handler(_prompt_config.get("log_file", "output/prompts.log"), formatter)
+            _prompt_handlers = _frontend([prompt_file], use_queue)
+        else:
+            _prompt_handlers = []
+
+        if _listeners:
+            atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records and stops the listener threads."""
+    while _listeners:
+        _listeners.pop()[1].stop()
+
+
 def get_logger(name: str = "cross_pub_insight") -> logging.Logger:
     logger = logging.getLogger(name)
 
@@ -14,22 +171,60 @@ def get_logger(name: str = "cross_pub_insight") -> logging.Logger:
     logging_config = config.get("Logging", {})
 
     log_level = getattr(logging, logging_config.get("level", "DEBUG").upper(), logging.DEBUG)
-    log_file = logging_config.get("log_file", "output/project.log")
-
     logger.setLevel(log_level)
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    _ensure_handlers(logging_config)
+    for handler in _main_handlers:
+        logger.addHandler(handler)
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    return logger
 
-    # File handler
-    log_file_path = Path(log_file)
-    log_file_path.parent.mkdir(parents=True, exist_ok=True)
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
 
+def _prompt_logger() -> logging.Logger:
+    logger = logging.getLogger(PROMPT_LOGGER_NAME)
+    if not logger.handlers:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        for handler in _prompt_handlers:
+            logger.addHandler(handler)
     return logger
+
+
+def log_prompt(kind: str, prompt: str, response: Optional[str] = None) -> None:
+    """
+    Records a prompt (and optionally its response) in the separate prompt log.
+
+    Only a configured fraction of calls is kept (`Logging.prompt_log.sample_rate`) and each
+    body is truncated to `max_chars`, so full prompts never reach the main log.
+    """
+    if _main_handlers is None:
+        _ensure_handlers(load_config().get("Logging", {}))
+    if not _prompt_handlers:
+        return
+    if random.random() >= _prompt_config.get("sample_rate", 1.0):
+        return
+
+    max_chars = _prompt_config.get("max_chars", 4000)
+
+    def _cap(text: str) -> str:
+        return text if len(text) <= max_chars else f"{text[:max_chars]}... [{len(text) - max_chars} chars truncated]"
+
+    message = f"[{kind}] PROMPT ({len(prompt)} chars):\n{_cap(prompt)}"
+    if response is not None:
+        message += f"\n[{kind}] RESPONSE ({len(response)} chars):\n{_cap(response)}"
+    _prompt_logger().debug(message)
+
+
+@contextmanager
+def log_context(session_id: Optional[str] = None, node: Optional[str] = None):
+    """Attaches a session and/or node id to every record logged inside the block."""
+    tokens = []
+    if session_id is not None:
+        tokens.append((_session_id, _session_id.set(session_id)))
+    if node is not None:
+        tokens.append((_node, _node.set(node)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
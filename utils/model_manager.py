@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from utils.cancellation import check_cancelled
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MB = 1024 * 1024
+
+
+class _Resident:
+    def __init__(self, key: str, kind: str, estimated_bytes: int, unloader: Optional[Callable[[Any], None]]):
+        self.key = key
+        self.kind = kind
+        self.bytes = estimated_bytes
+        self.unloader = unloader
+        self.model: Any = None
+        self.loaded = False
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux); None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelManager:
+    """
+    Keeps the process's loaded models (LLMs, embedding models) within a memory budget.
+
+    Callers borrow a model with `use(key, loader, ...)`: it is loaded on first use, counted
+    as in use while borrowed, and stays resident afterwards. When loading a model would
+    exceed `model_manager.memory_budget_mb`, idle models are unloaded least recently used
+    first. If the models in use leave no room, the load waits up to `wait_seconds` for
+    some to be released, then goes ahead over budget with a warning rather than failing.
+
+    Footprints are estimates (file sizes, KV cache and parameter sizes), refined once a
+    model is loaded; `report()` shows them next to the process RSS.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None, wait_seconds: Optional[float] = None,
+                 config_file: str = "config/config.yaml"):
+        manager_config = load_config(config_file).get("model_manager", {})
+        budget_mb = budget_mb if budget_mb is not None else manager_config.get("memory_budget_mb", 0)
+        self.budget_bytes = int(budget_mb * MB) if budget_mb else None
+        self.wait_seconds = wait_seconds if wait_seconds is not None else manager_config.get("wait_seconds", 30)
+
+        self._residents: "OrderedDict[str, _Resident]" = OrderedDict()
+        self._cond = threading.Condition()
+        self.evictions = 0
+
+    def _used_bytes(self) -> int:
+        return sum(resident.bytes for resident in self._residents.values())
+
+    def _make_room(self, needed: int) -> bool:
+        """Unloads idle models, oldest use first, until `needed` more bytes fit. Call with the lock held."""
+        if self.budget_bytes is None:
+            return True
+        for resident in list(self._residents.values()):
+            if self._used_bytes() + needed <= self.budget_bytes:
+                break
+            if resident.loaded and resident.refs == 0:
+                self._unload(resident)
+        return self._used_bytes() + needed <= self.budget_bytes
+
+    def _unload(self, resident: _Resident) -> None:
+        del self._residents[resident.key]
+        model, resident.model = resident.model, None
+        if resident.unloader is not None:
+            try:
+                resident.unloader(model)
+            except Exception as e:
+                logger.warning("Error unloading model %s: %s", resident.key, e)
+        self.evictions += 1
+        logger.info("Unloaded idle %s model %s (~%d MB)", resident.kind, resident.key, resident.bytes // MB)
+
+    def _acquire(self, key: str, kind: str, loader: Callable[[], Any], estimated_bytes: int,
+                 unloader: Optional[Callable[[Any], None]], footprint: Optional[Callable[[Any], int]]) -> _Resident:
+        waited_until = time.monotonic() + self.wait_seconds
+        with self._cond:
+            while True:
+                resident = self._residents.get(key)
+                if resident is not None and resident.loaded:
+                    resident.refs += 1
+                    self._residents.move_to_end(key)
+                    return resident
+                if resident is None:
+                    if self._make_room(estimated_bytes):
+                        break
+                    nothing_to_wait_for = not any(other.refs for other in self._residents.values())
+                    if nothing_to_wait_for or time.monotonic() >= waited_until:
+                        logger.warning(
+                            "Loading %s model %s (~%d MB) over the %d MB budget; models in use cannot be unloaded",
+                            kind, key, estimated_bytes // MB, self.budget_bytes // MB
+                        )
+                        break
+                # Another thread is loading this model, or we are waiting for room
+                self._cond.wait(timeout=0.5)
+                check_cancelled()
+
+            # Reserved before loading, so concurrent loads of the same model wait for this one
+            resident = _Resident(key, kind, estimated_bytes, unloader)
+            resident.refs = 1
+            self._residents[key] = resident
+
+        try:
+            model = loader()
+        except BaseException:
+            with self._cond:
+                self._residents.pop(key, None)
+                self._cond.notify_all()
+            raise
+
+        measured = None
+        if footprint is not None:
+            try:
+                measured = footprint(model)
+            except Exception as e:
+                logger.debug("Could not measure footprint of %s: %s", key, e)
+        with self._cond:
+            resident.model = model
+            resident.loaded = True
+            resident.bytes = measured or estimated_bytes
+            self._cond.notify_all()
+        logger.info("Loaded %s model %s (~%d MB)", kind, key, resident.bytes // MB)
+        return resident
+
+    def _release(self, resident: _Resident) -> None:
+        with self._cond:
+            resident.refs -= 1
+            resident.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    @contextmanager
+    def use(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        estimated_bytes: int,
+        kind: str = "model",
+        unloader: Optional[Callable[[Any], None]] = None,
+        footprint: Optional[Callable[[Any], int]] = None
+    ) -> Iterator[Any]:
+        """
+        Borrows the model registered under `key`, loading it if it is not resident.
+
+        Args:
+            key (str): Identity of the model, shared by everything that can use the same instance.
+            loader (Callable): Loads and returns the model.
+            estimated_bytes (int): Footprint assumed when making room before loading.
+            kind (str): "llm", "embeddings", ...; shown in the report.
+            unloader (Optional[Callable]): Frees the model's resources when it is evicted.
+            footprint (Optional[Callable]): Measures the loaded model's footprint in bytes.
+        """
+        resident = self._acquire(key, kind, loader, estimated_bytes, unloader, footprint)
+        try:
+            yield resident.model
+        finally:
+            self._release(resident)
+
+    def evict_idle(self) -> int:
+        """Unloads every model not in use; returns how many were unloaded."""
+        with self._cond:
+            idle = [resident for resident in self._residents.values() if resident.loaded and resident.refs == 0]
+            for resident in idle:
+                self._unload(resident)
+            return len(idle)
+
+    def report(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            models = [
+                {
+                    "key": resident.key,
+                    "kind": resident.kind,
+                    "estimated_mb": round(resident.bytes / MB, 1),
+                    "in_use": resident.refs,
+                    "loaded": resident.loaded,
+                    "idle_seconds": round(now - resident.last_used, 1) if resident.refs == 0 else 0.0,
+                }
+                for resident in reversed(self._residents.values())
+            ]
+            used = self._used_bytes()
+        rss = process_rss_bytes()
+        return {
+            "budget_mb": round(self.budget_bytes / MB, 1) if self.budget_bytes else None,
+            "estimated_mb": round(used / MB, 1),
+            "process_rss_mb": round(rss / MB, 1) if rss is not None else None,
+            "evictions": self.evictions,
+            "models": models,
+        }
+
+
+_manager: Optional[ModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager() -> ModelManager:
+    """The process-wide manager every model loader shares."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager()
+        return _manager
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.cancellation import check_cancelled
+from utils.config_loader import load_config
+from utils.logger import get_logger, log_context
+from utils.profiling import phase
+
+logger = get_logger(__name__)
+
+
+def hash_inputs(inputs: Dict[str, Any]) -> str:
+    """Returns a stable SHA-256 hex digest of a JSON-serialisable dict of node inputs."""
+    payload = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NodeCache:
+    """
+    Disk-backed store of graph node outputs keyed by a hash of the node's inputs.
+
+    Entries live at <cache_dir>/<node>/<inputs_hash>.json. A node whose inputs hash
+    matches a stored entry is skipped and its stored outputs are merged into the state,
+    so unchanged upstream outputs make every downstream node hit the cache as well.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, config_file: str = "config/config.yaml"):
+        cache_config = load_config(config_file).get("node_cache", {})
+        self.enabled = cache_config.get("enabled", False)
+        self.cache_dir = Path(cache_dir or cache_config.get("cache_dir", "output/node_cache"))
+
+    def _entry_path(self, node: str, key: str) -> Path:
+        return self.cache_dir / node / f"{key}.json"
+
+    def get(self, node: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(node, key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["outputs"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable node cache entry %s: %s", path, e)
+            return None
+
+    def put(self, node: str, key: str, outputs: Dict[str, Any]) -> None:
+        path = self._entry_path(node, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "node": node,
+            "inputs_hash": key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "outputs": outputs,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def cached_node(
+    name: str,
+    fn: Callable[[dict], dict],
+    inputs_fn: Callable[[dict], Dict[str, Any]],
+    output_keys: List[str],
+    cache: Optional[NodeCache] = None,
+) -> Callable[[dict], dict]:
+    """
+    Wraps a graph node so it only runs when its inputs changed. The node's wall time (a
+    cache lookup when skipped) is added to the state's `node_timings`.
+
+    Args:
+        name (str): Node name, used as the cache namespace.
+        fn (Callable): The node function (state -> state).
+        inputs_fn (Callable): Returns the dict of everything the node's output depends on
+            (input texts, prompt template version, model id, ...).
+        output_keys (List[str]): State keys the node writes; these are stored and replayed.
+        cache (Optional[NodeCache]): Cache to use; a default one is created if omitted.
+
+    Returns:
+        Callable: A node function with the same signature as fn.
+    """
+    cache = cache or NodeCache()
+
+    def run(state: dict) -> dict:
+        if not cache.enabled:
+            return fn(state)
+
+        key = hash_inputs({"node": name, **inputs_fn(state)})
+        outputs = cache.get(name, key)
+        if outputs is not None:
+            logger.info("Skipping node '%s': inputs unchanged (%s)", name, key[:12])
+            return {**state, **outputs}
+
+        result = fn(state)
+        cache.put(name, key, {k: result[k] for k in output_keys if k in result})
+        return result
+
+    def wrapper(state: dict) -> dict:
+        with log_context(node=name), phase(f"node:{name}"):
+            # Nodes are the pipeline's checkpoints: a cancelled session stops before the next one
+            check_cancelled()
+            started = time.perf_counter()
+            result = run(state)
+            timings = {**state.get("node_timings", {}), name: round(time.perf_counter() - started, 4)}
+            return {**result, "node_timings": timings}
+
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    return wrapper
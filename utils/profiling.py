@@ -0,0 +1,208 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.config_loader import load_config
+
+# Profiler of the session running in this context; None (the normal case) makes phase() a no-op
+_current_profiler: contextvars.ContextVar[Optional["SessionProfiler"]] = contextvars.ContextVar(
+    "session_profiler", default=None
+)
+
+
+class SessionProfiler:
+    """
+    Sampling profiler for one session.
+
+    While running, a background thread snapshots the Python stacks of the session's threads
+    every `interval_ms` and counts identical stacks. Each stack is prefixed with the phases
+    (see `phase`) its thread was in, e.g. "[node:analyze];[llm]", so time can be read per
+    pipeline step as well as per function. It can be started and stopped repeatedly (e.g.
+    around each HITL segment); samples accumulate.
+    """
+
+    def __init__(self, interval_ms: Optional[float] = None, max_depth: Optional[int] = None,
+                 config_file: str = "config/config.yaml"):
+        profiling_config = load_config(config_file).get("profiling", {})
+        self.interval = (interval_ms or profiling_config.get("interval_ms", 5)) / 1000
+        self.max_depth = max_depth or profiling_config.get("max_depth", 96)
+
+        self._stacks: Counter = Counter()
+        self._phases: Dict[int, List[str]] = defaultdict(list)
+        self._owners: set = set()
+        self._labels: Dict[Any, str] = {}
+        self._duration = 0.0
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def running(self) -> Iterator["SessionProfiler"]:
+        """Samples the calling thread (and threads entering phases in its context) until exit."""
+        thread_id = threading.get_ident()
+        self._owners.add(thread_id)
+        token = _current_profiler.set(self)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="session-profiler", daemon=True)
+        self._sampler.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            self._sampler.join()
+            _current_profiler.reset(token)
+            self._owners.discard(thread_id)
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample_loop(self) -> None:
+        own_thread = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frames = sys._current_frames()
+            # Pool threads are only attributed to the session while they work inside one of its phases
+            threads = self._owners | {thread_id for thread_id, phases in list(self._phases.items()) if phases}
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._frame_label(frame.f_code))
+                    frame = frame.f_back
+                phases = [f"[{name}]" for name in self._phases.get(thread_id, ())]
+                self._stacks[tuple(phases + stack[::-1])] += elapsed
+            self._duration += elapsed
+            self._samples += 1
+
+    def export(self) -> Dict[str, Any]:
+        """Plain-data profile: identical stacks merged with their total seconds, plus per-phase totals."""
+        phase_seconds: Counter = Counter()
+        for stack, seconds in self._stacks.items():
+            for name in {frame for frame in stack if frame.startswith("[")}:
+                phase_seconds[name[1:-1]] += seconds
+        return {
+            "interval_ms": self.interval * 1000,
+            "duration_seconds": round(self._duration, 4),
+            "samples": self._samples,
+            "phases": {name: round(seconds, 4) for name, seconds in phase_seconds.most_common()},
+            "stacks": [[list(stack), round(seconds, 6)] for stack, seconds in self._stacks.most_common()],
+        }
+
+
+class phase(ContextDecorator):
+    """
+    Marks a step of a profiled session, as a context manager or decorator:
+
+        with phase("repo_parse"): ...
+        @phase("llm")
+        def generate(...): ...
+
+    Outside a profiled session this only reads a context variable.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "phase":
+        profiler = _current_profiler.get()
+        if profiler is not None:
+            profiler._phases[threading.get_ident()].append(self.name)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        profiler = _current_profiler.get()
+        if profiler is not None:
+            phases = profiler._phases.get(threading.get_ident())
+            if phases:
+                phases.pop()
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """Brendan Gregg's collapsed-stack format ("a;b;c <count>"), with counts in microseconds."""
+    return "\n".join(
+        f"{';'.join(frame.replace(';', ',') for frame in stack)} {max(1, round(seconds * 1e6))}"
+        for stack, seconds in profile["stacks"]
+    ) + "\n"
+
+
+def to_speedscope(profile: Dict[str, Any], name: str = "session") -> Dict[str, Any]:
+    """Speedscope's file format: one sampled profile, weights in seconds."""
+    frame_index: Dict[str, int] = {}
+    frames: List[Dict[str, Any]] = []
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, seconds in profile["stacks"]:
+        sample = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append(_speedscope_frame(label))
+            sample.append(frame_index[label])
+        samples.append(sample)
+        weights.append(seconds)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "cross-publication-insight-assistant",
+    }
+
+
+def _speedscope_frame(label: str) -> Dict[str, Any]:
+    function, _, location = label.partition(" (")
+    if not location:
+        return {"name": label}
+    file, _, line = location.rstrip(")").rpartition(":")
+    frame = {"name": function, "file": file}
+    if line.isdigit():
+        frame["line"] = int(line)
+    return frame
+
+
+def profile_summary(profile: Dict[str, Any], top: int = 20) -> Dict[str, Any]:
+    """Duration, per-phase totals and the functions with the most self time."""
+    self_seconds: Counter = Counter()
+    for stack, seconds in profile["stacks"]:
+        if stack:
+            self_seconds[stack[-1]] += seconds
+    return {
+        "duration_seconds": profile["duration_seconds"],
+        "samples": profile["samples"],
+        "phases": profile["phases"],
+        "top_self": [[label, round(seconds, 4)] for label, seconds in self_seconds.most_common(top)],
+    }
+
+
+def write_profile(profile: Dict[str, Any], output_dir: str, name: str) -> Tuple[str, str]:
+    """Writes <name>.speedscope.json and <name>.collapsed.txt; returns their paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    speedscope_path = os.path.join(output_dir, f"{name}.speedscope.json")
+    collapsed_path = os.path.join(output_dir, f"{name}.collapsed.txt")
+    with open(speedscope_path, "w", encoding="utf-8") as f:
+        json.dump(to_speedscope(profile, name), f)
+    with open(collapsed_path, "w", encoding="utf-8") as f:
+        f.write(to_collapsed(profile))
+    return speedscope_path, collapsed_path
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from jinja2 import Environment
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_env = Environment(keep_trailing_newline=True)
+
+
+class PromptTemplate:
+    """A compiled prompt template with its content hash and fixed leading text."""
+
+    def __init__(self, path: Path, source: str, mtime: float):
+        self.path = path
+        self.name = path.stem
+        self.source = source
+        self.mtime = mtime
+        self.version = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        self.template = _env.from_string(source)
+
+        # Text before the first placeholder; identical across every render of this template
+        idx = source.find("{")
+        self.prefix = source if idx == -1 else source[:idx]
+
+    def render(self, **variables) -> str:
+        return self.template.render(**variables)
+
+
+class PromptRegistry:
+    """
+    Loads and compiles every template in the prompts directory once per process.
+
+    Templates are Jinja2. Lookups stat the file at most every `reload_interval` seconds
+    and recompile it when it changed on disk, so edits apply without a restart.
+    """
+
+    def __init__(self, prompt_dir: Optional[str] = None, config_file: str = "config/config.yaml"):
+        prompt_config = load_config(config_file).get("prompts", {})
+        self.prompt_dir = Path(prompt_dir or prompt_config.get("prompt_dir", "config/prompts"))
+        self.reload_interval = prompt_config.get("reload_interval_seconds", 2.0)
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        for path in sorted(self.prompt_dir.glob("*.txt")):
+            self._load(path)
+        logger.debug("Loaded %d prompt templates from %s", len(self._templates), self.prompt_dir)
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(path.resolve())
+
+    def _load(self, path: Path) -> PromptTemplate:
+        template = PromptTemplate(path, path.read_text(encoding="utf-8"), path.stat().st_mtime)
+        key = self._key(path)
+        self._templates[key] = template
+        self._checked[key] = time.monotonic()
+        return template
+
+    def _resolve(self, name_or_path: str) -> Path:
+        path = Path(name_or_path)
+        if path.suffix != ".txt":
+            path = self.prompt_dir / f"{name_or_path}.txt"
+        return path
+
+    def get(self, name_or_path: str) -> PromptTemplate:
+        """
+        Returns a compiled template by path (e.g. "config/prompts/analyzer_prompt.txt")
+        or by name (e.g. "analyzer_prompt").
+        """
+        path = self._resolve(name_or_path)
+        key = self._key(path)
+
+        with self._lock:
+            template = self._templates.get(key)
+            now = time.monotonic()
+            if template is not None and now - self._checked.get(key, 0) < self.reload_interval:
+                return template
+
+            if not path.exists():
+                raise FileNotFoundError(f"Prompt template not found at {path}")
+
+            self._checked[key] = now
+            if template is None or path.stat().st_mtime != template.mtime:
+                if template is not None:
+                    logger.info("Reloading changed prompt template: %s", path)
+                template = self._load(path)
+            return template
+
+    def render(self, name_or_path: str, **variables) -> str:
+        return self.get(name_or_path).render(**variables)
+
+    def versions(self) -> Dict[str, str]:
+        """Content hashes of every template in the prompts directory, by name."""
+        for path in self.prompt_dir.glob("*.txt"):
+            self.get(str(path))
+        with self._lock:
+            return {template.name: template.version for template in self._templates.values()}
+
+    def version(self, name_or_path: str) -> str:
+        """Content hash of a template, for use in cache keys; 'missing' if it does not exist."""
+        try:
+            return self.get(name_or_path).version
+        except FileNotFoundError:
+            return "missing"
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Returns the process-wide prompt registry, loading it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PromptRegistry()
+        return _registry
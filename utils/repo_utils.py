@@ -1,11 +1,22 @@
 import os
+import shutil
 import subprocess
 from pathlib import Path
+from typing import Optional
 from urllib.parse import urlparse
 
+from utils.cancellation import CancelToken, SessionCancelled, cancellation_scope, current_token, run_cancellable
+from utils.config_loader import load_config
+from utils.profiling import phase
+
+@phase("clone")
 def clone_if_remote(repo_input: str, base_clone_dir: str = "~/projects") -> str:
     """
     Clones a repo if it's a GitHub URL; otherwise returns the local path.
+
+    With `repo_parser.remote_source: git_objects` the clone is a shallow bare one
+    (`<name>.git`, no working tree); parse_repository reads it from the object store.
+
     Args:
         repo_input: Either a full URL or a local path.
         base_clone_dir: Where to clone if needed.
@@ -17,15 +28,61 @@ def clone_if_remote(repo_input: str, base_clone_dir: str = "~/projects") -> str:
     if repo_input.startswith("http://") or repo_input.startswith("https://"):
         parsed = urlparse(repo_input)
         repo_name = Path(parsed.path).stem # e.g., 'gemini-cli-main' from URL
-        clone_path = os.path.expanduser(f"{base_clone_dir}/{repo_name}")
+        bare = load_config().get("repo_parser", {}).get("remote_source", "checkout") == "git_objects"
+        clone_path = os.path.expanduser(f"{base_clone_dir}/{repo_name}" + (".git" if bare else ""))
         if Path(clone_path).exists():
             print(f"Repo already exists locally: {clone_path}")
             return clone_path
         
         print(f"Cloning repo from {repo_input} to {clone_path}...")
-        subprocess.run(["git", "clone",repo_input,  clone_path], check=True)
+        if bare:
+            # Only the HEAD commit's objects: one packfile, no checkout
+            args = ["git", "clone", "--bare", "--depth", "1", "--single-branch", repo_input, clone_path]
+        else:
+            args = ["git", "clone", repo_input, clone_path]
+        try:
+            # Killed as soon as the session is cancelled or runs past its deadline
+            run_cancellable(args)
+        except BaseException:
+            # Never leave a partial clone behind to be mistaken for a complete one
+            shutil.rmtree(clone_path, ignore_errors=True)
+            raise
         return clone_path
     else:
         # Assume it's already a local path
         return os.path.expanduser(repo_input)
 
+
+
+def normalize_repo_id(repo_input: str) -> str:
+    """
+    Returns a stable identifier for a repository input.
+    URLs lose their trailing slash and '.git' suffix; local paths are made absolute.
+    """
+    repo_input = repo_input.strip()
+    if repo_input.startswith("http://") or repo_input.startswith("https://"):
+        repo_id = repo_input.rstrip("/")
+        if repo_id.endswith(".git"):
+            repo_id = repo_id[:-len(".git")]
+        return repo_id
+    return os.path.abspath(os.path.expanduser(repo_input))
+
+
+def resolve_commit(repo_input: str, timeout_seconds: float = 10) -> Optional[str]:
+    """
+    Returns the commit sha a repository input currently points at: the remote HEAD for URLs
+    (without cloning), the checked-out HEAD for local git repos; None when it cannot be resolved.
+    """
+    repo_input = repo_input.strip()
+    if repo_input.startswith("http://") or repo_input.startswith("https://"):
+        args = ["git", "ls-remote", repo_input, "HEAD"]
+    else:
+        args = ["git", "-C", os.path.expanduser(repo_input), "rev-parse", "HEAD"]
+    try:
+        # Narrows the session's token: cancelling the session still kills the lookup
+        with cancellation_scope(CancelToken(deadline_seconds=timeout_seconds, parent=current_token())):
+            result = run_cancellable(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    except (OSError, subprocess.CalledProcessError, SessionCancelled):
+        return None
+    output = result.stdout.split()
+    return output[0] if output else None
@@ -0,0 +1,269 @@
+"""
+Columnar export of stored session results for offline analytics.
+
+One row per comparison of a finished session: repo ids and commits, trends as lists,
+confidence rating, per-node timings and the text outputs. Rows are written in row groups
+(Parquet) or record batches (Arrow IPC) of `result_export.row_group_size`, decoding one
+session at a time, so memory stays bounded by a row group whatever the range.
+
+Incremental exports write only sessions not exported before, as a new part file in the
+export directory; the ids already exported are kept in `_exported.json` there. Read the
+directory as one dataset (e.g. `pyarrow.dataset.dataset(dir)` or DuckDB's `read_parquet('dir/*.parquet')`).
+
+Needs pyarrow, which is only imported here.
+
+Usage:
+    python3 main.py export [--since 2026-01-01] [--until 2026-02-01] [--format parquet|arrow]
+    python3 main.py export --since 2026-01-01 --file january.parquet     # one standalone file
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+from utils.result_store import ResultStore
+
+logger = get_logger(__name__)
+
+STATE_FILE = "_exported.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+EXPORTED_STATUSES = ("completed",)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def export_schema():
+    pa = _pyarrow()
+    text = pa.large_string()
+    return pa.schema([
+        ("session_id", pa.string()),
+        ("finished_at", pa.timestamp("us", tz="UTC")),
+        ("status", pa.string()),
+        ("user_query", text),
+        ("primary_repo", pa.string()),
+        ("primary_commit", pa.string()),
+        ("comparison_repo", pa.string()),
+        ("comparison_commit", pa.string()),
+        ("primary_trends", pa.list_(pa.string())),
+        ("comparison_trends", pa.list_(pa.string())),
+        ("confidence_rating", pa.string()),
+        ("node_timings", pa.map_(pa.string(), pa.float64())),
+        ("partial", pa.bool_()),
+        ("analysis_result", text),
+        ("fact_check_result", text),
+        ("final_summary", text),
+        ("aggregate_query_result", text),
+    ])
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """ISO date or datetime; naive values are taken as UTC. Raises ValueError when unparsable."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_trends(trends: Optional[str]) -> List[str]:
+    """Tags of a trends text ("Category: tag, tag" lines, under an optional header) as a list."""
+    tags: List[str] = []
+    for line in (trends or "").splitlines():
+        _, sep, names = line.partition(":")
+        for tag in (names if sep else "").split(","):
+            tag = tag.strip().strip("*-").strip()
+            if tag and tag not in tags:
+                tags.append(tag)
+    return tags
+
+
+def select_sessions(
+    store: ResultStore,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    exclude: Optional[Set[str]] = None
+) -> List[Tuple[datetime, str]]:
+    """(finished, session id) of finished sessions in [since, until), oldest first, from the index alone."""
+    selected = []
+    for session_id in store:
+        meta = store.meta(session_id)
+        if meta is None or meta.get("status") not in EXPORTED_STATUSES or session_id in (exclude or ()):
+            continue
+        finished = parse_timestamp(meta.get("updated_at"))
+        if finished is None or (since and finished < since) or (until and finished >= until):
+            continue
+        selected.append((finished, session_id))
+    selected.sort()
+    return selected
+
+
+def session_rows(session_id: str, entry: Dict[str, Any], finished: datetime) -> Iterator[Dict[str, Any]]:
+    finished = parse_timestamp(entry.get("finished_at")) or finished
+    for result in entry.get("results", []):
+        yield {
+            "session_id": session_id,
+            "finished_at": finished,
+            "status": entry.get("status"),
+            "user_query": entry.get("user_query"),
+            "primary_repo": result.get("primary_repo_id"),
+            "primary_commit": result.get("primary_commit"),
+            "comparison_repo": result.get("comparison_repo_id") or result.get("comparison_repo"),
+            "comparison_commit": result.get("comparison_commit"),
+            "primary_trends": parse_trends(result.get("aggregated_trends")),
+            "comparison_trends": parse_trends(result.get("comparison_trends")),
+            "confidence_rating": result.get("confidence_rating"),
+            "node_timings": list((result.get("node_timings") or {}).items()),
+            "partial": bool(result.get("partial", False)),
+            "analysis_result": result.get("analysis_result"),
+            "fact_check_result": result.get("fact_check_result"),
+            "final_summary": result.get("final_summary"),
+            "aggregate_query_result": entry.get("aggregate_query_result"),
+        }
+
+
+def _open_writer(path: Path, fmt: str, schema, compression: str):
+    pa = _pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(str(path), schema, compression=compression)
+    if fmt == "arrow":
+        return pa.ipc.new_file(str(path), schema)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def write_sessions(
+    store: ResultStore,
+    sessions: List[Tuple[datetime, str]],
+    path: Path,
+    fmt: str = "parquet",
+    row_group_size: int = 1000,
+    compression: str = "zstd"
+) -> Tuple[int, List[str]]:
+    """
+    Streams the sessions' rows to one file, a row group at a time. The file is written
+    under a temporary name and only appears complete; nothing is written without rows.
+
+    Returns:
+        Tuple[int, List[str]]: Rows written and the ids of the sessions they came from.
+    """
+    pa = _pyarrow()
+    schema = export_schema()
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    writer = None
+    rows: List[Dict[str, Any]] = []
+    written = 0
+    exported: List[str] = []
+
+    def flush() -> None:
+        nonlocal writer, written
+        if writer is None:
+            writer = _open_writer(tmp_path, fmt, schema, compression)
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        written += len(rows)
+        rows.clear()
+
+    try:
+        for finished, session_id in sessions:
+            entry = store.get(session_id)
+            if entry is None:
+                continue
+            rows.extend(session_rows(session_id, entry, finished))
+            exported.append(session_id)
+            if len(rows) >= row_group_size:
+                flush()
+        if rows:
+            flush()
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, path)
+    return written, exported
+
+
+class ResultExporter:
+    """Exports finished sessions from the result store: as incremental parts of an export directory, or to one file."""
+
+    def __init__(self, store: Optional[ResultStore] = None, export_dir: Optional[str] = None,
+                 config_file: str = "config/config.yaml"):
+        export_config = load_config(config_file).get("result_export", {})
+        self.store = store or ResultStore(config_file=config_file)
+        self.export_dir = Path(export_dir or export_config.get("dir", "output/exports"))
+        self.format = export_config.get("format", "parquet")
+        self.row_group_size = export_config.get("row_group_size", 1000)
+        self.compression = export_config.get("compression", "zstd")
+
+    def _state_path(self) -> Path:
+        return self.export_dir / STATE_FILE
+
+    def exported_sessions(self) -> Set[str]:
+        path = self._state_path()
+        return set(json.loads(path.read_text(encoding="utf-8"))["sessions"]) if path.exists() else set()
+
+    def _save_state(self, sessions: Set[str]) -> None:
+        tmp_path = self.export_dir / f".{STATE_FILE}.tmp"
+        tmp_path.write_text(json.dumps({"sessions": sorted(sessions)}), encoding="utf-8")
+        os.replace(tmp_path, self._state_path())
+
+    def _format(self, fmt: Optional[str]) -> str:
+        fmt = fmt or self.format
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        return fmt
+
+    def export(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+               fmt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Appends the finished sessions in [since, until) that this directory does not hold yet,
+        as a new part file.
+
+        Args:
+            since, until (Optional[datetime]): Range of session finish times; open when None.
+            fmt (Optional[str]): "parquet" or "arrow"; falls back to config.
+
+        Returns:
+            Dict: The part written (None when there was nothing new), its row and session counts.
+        """
+        fmt = self._format(fmt)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        done = self.exported_sessions()
+        sessions = select_sessions(self.store, since, until, exclude=done)
+
+        path = self.export_dir / f"part-{time.strftime('%Y%m%dT%H%M%S')}-{len(done)}{FORMATS[fmt]}"
+        rows, exported = write_sessions(self.store, sessions, path, fmt, self.row_group_size, self.compression)
+        if exported:
+            self._save_state(done | set(exported))
+        logger.info("Exported %d rows from %d sessions to %s", rows, len(exported), path if rows else "(nothing new)")
+        return {"path": str(path) if rows else None, "rows": rows, "sessions": len(exported)}
+
+    def export_file(self, path: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    fmt: Optional[str] = None) -> Dict[str, Any]:
+        """Writes every finished session in [since, until) to one standalone file, outside the incremental state."""
+        fmt = self._format(fmt)
+        sessions = select_sessions(self.store, since, until)
+        rows, exported = write_sessions(self.store, sessions, Path(path), fmt, self.row_group_size, self.compression)
+        return {"path": path if rows else None, "rows": rows, "sessions": len(exported)}
+
+
+def export_main(args: argparse.Namespace) -> int:
+    """Runs `python3 main.py export ...` from its parsed arguments (since/until already parsed)."""
+    exporter = ResultExporter(export_dir=args.output)
+    if args.file:
+        report = exporter.export_file(args.file, args.since, args.until, args.format)
+    else:
+        report = exporter.export(args.since, args.until, args.format)
+    print(json.dumps(report, indent=2))
+    return 0
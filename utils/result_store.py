@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.config_loader import load_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.json"
+
+# Optional fast codecs; both ship as transitive dependencies (langgraph, langsmith)
+try:
+    import ormsgpack
+except ImportError:
+    ormsgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def encode_entry(entry: Dict[str, Any], level: int = 3) -> bytes:
+    """
+    Serializes a session entry to a compact blob: msgpack + zstd when available,
+    JSON + zlib otherwise. A two-byte header records which, so either can be decoded later.
+    """
+    if ormsgpack is not None:
+        serializer, payload = b"m", ormsgpack.packb(entry)
+    else:
+        serializer, payload = b"j", json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return serializer + b"z" + zstandard.ZstdCompressor(level=level).compress(payload)
+    return serializer + b"d" + zlib.compress(payload, min(level * 2, 9))
+
+
+def decode_entry(blob: bytes) -> Dict[str, Any]:
+    serializer, compression, body = blob[:1], blob[1:2], blob[2:]
+    if compression == b"z":
+        if zstandard is None:
+            raise RuntimeError("Result blob is zstd-compressed but zstandard is not installed.")
+        payload = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        payload = zlib.decompress(body)
+    if serializer == b"m":
+        if ormsgpack is None:
+            raise RuntimeError("Result blob is msgpack-encoded but ormsgpack is not installed.")
+        return ormsgpack.unpackb(payload)
+    return json.loads(payload)
+
+
+class ResultStore:
+    """
+    Session results, serialized once per update and persisted under `result_store.dir`.
+
+    Each session is one blob file plus a line in a small JSON index holding its status,
+    ETag (hash of the blob) and sizes, so status checks and unchanged polls never decode
+    a blob. Recently written or read blobs are also kept in memory.
+
+    Supports the dict operations the API uses on its session table (get, [], in).
+    Listeners added with `subscribe` are called with (session_id, entry) after every
+    update that changes an entry, e.g. to push completion notifications.
+    """
+
+    def __init__(self, store_dir: Optional[str] = None, config_file: str = "config/config.yaml"):
+        store_config = load_config(config_file).get("result_store", {})
+        self.store_dir = Path(store_dir or store_config.get("dir", "output/results"))
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.level = store_config.get("compression_level", 3)
+        self.memory_entries = store_config.get("memory_entries", 256)
+
+        self._lock = threading.RLock()
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        index_path = self.store_dir / INDEX_FILE
+        self._index: Dict[str, Dict[str, Any]] = (
+            json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+        )
+
+    def _blob_path(self, session_id: str) -> Path:
+        return self.store_dir / f"{session_id}.bin"
+
+    def _remember(self, session_id: str, blob: bytes) -> None:
+        self._blobs[session_id] = blob
+        self._blobs.move_to_end(session_id)
+        while len(self._blobs) > self.memory_entries:
+            self._blobs.popitem(last=False)
+
+    def _write_index(self) -> None:
+        tmp_path = self.store_dir / f".{INDEX_FILE}.tmp"
+        tmp_path.write_text(json.dumps(self._index), encoding="utf-8")
+        os.replace(tmp_path, self.store_dir / INDEX_FILE)
+
+    def put(self, session_id: str, entry: Dict[str, Any]) -> str:
+        """Stores a session entry; returns its ETag."""
+        blob = encode_entry(entry, self.level)
+        etag = hashlib.sha256(blob).hexdigest()[:16]
+        with self._lock:
+            if self._index.get(session_id, {}).get("etag") == etag:
+                return etag
+            tmp_path = self._blob_path(session_id).with_suffix(".tmp")
+            tmp_path.write_bytes(blob)
+            os.replace(tmp_path, self._blob_path(session_id))
+            self._remember(session_id, blob)
+            self._index[session_id] = {
+                "etag": etag,
+                "status": entry.get("status"),
+                "num_results": len(entry.get("results", [])),
+                "stored_bytes": len(blob),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self._write_index()
+        # Outside the lock: listeners may read the store or hand off to other threads
+        for listener in list(self._listeners):
+            try:
+                listener(session_id, entry)
+            except Exception:
+                logger.exception("Result store listener failed for session %s", session_id)
+        return etag
+
+    def subscribe(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Calls listener(session_id, entry) after each stored change to an entry."""
+        self._listeners.append(listener)
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            if session_id not in self._index:
+                return default
+            blob = self._blobs.get(session_id)
+            if blob is None:
+                blob = self._blob_path(session_id).read_bytes()
+            self._remember(session_id, blob)
+        return decode_entry(blob)
+
+    def put_artifact(self, session_id: str, name: str, payload: Dict[str, Any]) -> None:
+        """Stores a named side file of a session (e.g. its profile) next to its results blob."""
+        path = self.store_dir / f"{session_id}.{name}.bin"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(encode_entry(payload, self.level))
+        os.replace(tmp_path, path)
+
+    def get_artifact(self, session_id: str, name: str) -> Optional[Dict[str, Any]]:
+        path = self.store_dir / f"{session_id}.{name}.bin"
+        return decode_entry(path.read_bytes()) if path.exists() else None
+
+    def meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Index record (status, etag, sizes) without decoding the results."""
+        with self._lock:
+            meta = self._index.get(session_id)
+            return dict(meta) if meta is not None else None
+
+    def __setitem__(self, session_id: str, entry: Dict[str, Any]) -> None:
+        self.put(session_id, entry)
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        entry = self.get(session_id)
+        if entry is None:
+            raise KeyError(session_id)
+        return entry
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)